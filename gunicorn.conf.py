@@ -0,0 +1,41 @@
+"""
+Configuração do gunicorn para produção (veja wsgi.py):
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Cada worker atende a API com várias threads; só um deles (o líder, eleito por lock de
+arquivo em core/leader_lease.py) roda o agendador e o worker do outbox.
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from config.config import Config
+
+bind = f"{Config.SERVER_HOST}:{Config.SERVER_PORT}"
+workers = Config.WEB_WORKERS
+worker_class = "gthread"
+threads = Config.WEB_THREADS
+timeout = Config.WEB_TIMEOUT
+# A aplicação é importada uma vez no mestre e compartilhada (copy-on-write) pelos workers
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Conexões abertas pelo mestre (init_db) não podem ser usadas por dois processos:
+    # o worker descarta o pool herdado sem fechá-las e abre as suas
+    from core.db import engine
+    engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    from app.app import start_background_services
+    if start_background_services(worker.wsgi):
+        worker.log.info("Worker %s é o líder: agendador e outbox iniciados", worker.pid)
+
+
+def worker_exit(server, worker):
+    if getattr(worker, "wsgi", None) is not None:
+        from app.app import stop_background_services
+        stop_background_services(worker.wsgi)
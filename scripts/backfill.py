@@ -0,0 +1,73 @@
+"""
+Carga histórica do arquivo de notícias da Câmara Municipal do Recife.
+Percorre a paginação da listagem e grava os itens em lotes (sem pergunta e sem envio
+à API externa); se for interrompido, a próxima execução continua do último checkpoint.
+Com --reformulate, reformula ao final com o Gemini as notícias ainda sem pergunta,
+respeitando a cota (se ela se esgotar, as restantes ficam para a próxima execução);
+com --deliver, também enfileira o envio delas à API externa.
+
+Uso:
+    python scripts/backfill.py [--max-pages N] [--concurrency N] [--batch-size N] [--restart] [--reformulate [--deliver]]
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import argparse
+import time
+from config.config import Config
+from core.db import init_db
+from services.backfill_service import BackfillService
+from services.news_service import NewsService
+
+# Rodadas seguidas sem nenhuma pergunta nova antes de desistir (cota ou circuito do Gemini)
+MAX_IDLE_ROUNDS = 3
+
+
+def reformulate_pending(deliver: bool) -> int:
+    """
+    Reformula as notícias sem pergunta até acabarem ou o Gemini parar de responder.
+    Retorna quantas ficaram pendentes.
+    """
+    service = NewsService()
+    idle_rounds = 0
+    while True:
+        result = service.reformulate_pending(deliver=deliver)
+        print(f"Reformuladas: {result['reformulated']}; pendentes: {result['remaining']}")
+        if not result["remaining"]:
+            return 0
+        idle_rounds = 0 if result["reformulated"] else idle_rounds + 1
+        if idle_rounds >= MAX_IDLE_ROUNDS:
+            return result["remaining"]
+        if idle_rounds:
+            # Aguarda o circuito fechar / a cota reabastecer antes de tentar de novo
+            time.sleep(Config.GEMINI_BREAKER_RESET_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga histórica do arquivo de notícias")
+    parser.add_argument("--max-pages", type=int, default=None, help="Número máximo de páginas nesta execução")
+    parser.add_argument("--concurrency", type=int, default=Config.BACKFILL_CONCURRENCY, help="Páginas buscadas em paralelo")
+    parser.add_argument("--batch-size", type=int, default=Config.BACKFILL_BATCH_SIZE, help="Itens por inserção em lote")
+    parser.add_argument("--restart", action="store_true", help="Ignora o checkpoint e recomeça do fim do arquivo")
+    parser.add_argument("--reformulate", action="store_true", help="Reformula com o Gemini as notícias sem pergunta")
+    parser.add_argument("--deliver", action="store_true", help="Com --reformulate, envia as notícias reformuladas à API externa")
+    args = parser.parse_args()
+    if args.deliver and not args.reformulate:
+        parser.error("--deliver requer --reformulate")
+
+    Config.setup_logging()
+    init_db()
+    service = BackfillService(batch_size=args.batch_size, concurrency=args.concurrency)
+    result = service.run(max_pages=args.max_pages, resume=not args.restart)
+    status = "concluído" if result["done"] else f"pausado (próxima página: {result['next_page']})"
+    print(f"Backfill {status}: {result['inserted']} itens inseridos")
+
+    if args.reformulate:
+        remaining = reformulate_pending(deliver=args.deliver)
+        if remaining:
+            print(f"{remaining} notícias continuam sem pergunta; execute novamente mais tarde")
+
+
+if __name__ == "__main__":
+    main()
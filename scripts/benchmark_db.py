@@ -0,0 +1,83 @@
+"""
+Benchmark dos perfis de armazenamento (core/db.py): compara o perfil "default"
+(padrões do driver) com o "tuned" (PRAGMAs do SQLite / pre-ping e timeout no Postgres).
+
+Mede inserções com um commit por notícia (como no processamento incremental),
+inserções em lote (upsert_many, como no backfill) e a leitura paginada da listagem.
+
+Uso:
+    python scripts/benchmark_db.py [--url DATABASE_URL] [--rows N] [--batch-rows N]
+
+Sem --url, cada perfil usa um arquivo SQLite temporário. Com --url, as tabelas do
+banco informado são recriadas a cada perfil: não use o banco de produção.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import argparse
+import tempfile
+import time
+from sqlalchemy.orm import sessionmaker
+from core.db import Base, PROFILES, create_db_engine
+from core.news_repository import NewsRepository
+import models.models  # registra as tabelas
+
+
+def run_profile(url: str, profile: str, rows: int, batch_rows: int, page_size: int) -> dict:
+    engine = create_db_engine(url, profile=profile)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    repo = NewsRepository(session=session)
+    try:
+        started = time.perf_counter()
+        for n in range(rows):
+            repo.create(source_title=f"Notícia {n}", source_url=f"https://exemplo.com/unitaria/{n}", author=f"Secretaria {n % 10}")
+        single = rows / (time.perf_counter() - started)
+
+        batch = [
+            {"source_title": f"Notícia {n}", "source_url": f"https://exemplo.com/lote/{n}", "author": f"Secretaria {n % 10}"}
+            for n in range(batch_rows)
+        ]
+        started = time.perf_counter()
+        repo.upsert_many(batch)
+        bulk = batch_rows / (time.perf_counter() - started)
+
+        session.expire_all()
+        started = time.perf_counter()
+        pages, after_id = 0, None
+        while True:
+            page = repo.list(limit=page_size, after_id=after_id)
+            session.expunge_all()
+            pages += 1
+            if len(page) < page_size:
+                break
+            after_id = page[-1].id
+        listing = pages / (time.perf_counter() - started)
+        return {"single": single, "bulk": bulk, "pages": listing}
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos perfis de armazenamento")
+    parser.add_argument("--url", default=None, help="DATABASE_URL de teste (padrão: SQLite temporário)")
+    parser.add_argument("--rows", type=int, default=500, help="Inserções com um commit cada")
+    parser.add_argument("--batch-rows", type=int, default=20000, help="Linhas inseridas em lote")
+    parser.add_argument("--page-size", type=int, default=100, help="Itens por página na leitura")
+    args = parser.parse_args()
+
+    print(f"{'perfil':<10}{'insert/s (commit)':>20}{'insert/s (lote)':>18}{'páginas/s':>12}")
+    print("-" * 60)
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = args.url or f"sqlite:///{os.path.join(tmp, f'bench_{profile}.db')}"
+            result = run_profile(url, profile, args.rows, args.batch_rows, args.page_size)
+        print(f"{profile:<10}{result['single']:>20.0f}{result['bulk']:>18.0f}{result['pages']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
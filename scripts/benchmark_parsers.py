@@ -0,0 +1,76 @@
+"""
+Micro-benchmark dos backends de análise da listagem de notícias.
+Compara o método antigo (DOM completo com html.parser + soup.select) com os backends
+de clients/listing_parsers.py sobre páginas salvas do portal.
+
+Uso:
+    python scripts/benchmark_parsers.py [pagina.html ...] [--repeat N]
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import argparse
+import time
+from bs4 import BeautifulSoup
+from src.clients.listing_parsers import PARSERS
+
+DEFAULT_PAGE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', 'camara_listing.html')
+
+
+def full_dom_baseline(html: str) -> list:
+    """
+    Implementação anterior: monta o DOM inteiro e depois seleciona os artigos.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    items = []
+    for article in soup.select("article.news-item"):
+        title_tag = article.select_one("h4.title a")
+        if title_tag:
+            items.append((title_tag.get_text(strip=True), title_tag.get("href", "")))
+    return items
+
+
+def bench(func, html: str, repeat: int) -> float:
+    """
+    Retorna o melhor tempo médio (ms) por análise entre 3 rodadas.
+    """
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func(html)
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos parsers da listagem")
+    parser.add_argument("pages", nargs="*", default=[DEFAULT_PAGE], help="Páginas HTML salvas do portal")
+    parser.add_argument("--repeat", type=int, default=50, help="Análises por rodada")
+    args = parser.parse_args()
+
+    for page in args.pages:
+        with open(page, encoding="utf-8") as fh:
+            html = fh.read()
+        print(f"\nPágina: {page} ({len(html) / 1024:.1f} KiB)")
+        print(f"{'backend':<24}{'ms/página':>12}{'itens':>8}{'ganho':>8}")
+        print("-" * 52)
+
+        baseline_ms = bench(full_dom_baseline, html, args.repeat)
+        print(f"{'DOM completo (antigo)':<24}{baseline_ms:>12.3f}{len(full_dom_baseline(html)):>8}{'1.0x':>8}")
+
+        for name, parser_cls in PARSERS.items():
+            try:
+                backend = parser_cls()
+            except ImportError:
+                print(f"{name:<24}{'não instalado':>12}")
+                continue
+            elapsed_ms = bench(lambda h: list(backend.iter_articles(h)), html, args.repeat)
+            count = len(list(backend.iter_articles(html)))
+            print(f"{name:<24}{elapsed_ms:>12.3f}{count:>8}{baseline_ms / elapsed_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark da serialização da listagem de notícias (GET /api/news/): compara o caminho
+anterior (objetos NewsItem + marshal do flask-restx + json) com o atual (linhas sem
+objetos ORM + news_row_to_dict + utils/serialization.py), e o custo do gzip por cima.
+
+Mede linhas serializadas por segundo, percorrendo todas as páginas da tabela.
+
+Uso:
+    python scripts/benchmark_serialization.py [--rows N] [--page-size N] [--rounds N]
+
+O banco é um arquivo SQLite temporário, populado a cada execução.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import argparse
+import gzip
+import json
+import tempfile
+import time
+from flask_restx import marshal
+from sqlalchemy.orm import sessionmaker
+from core.db import Base, create_db_engine
+from core.news_repository import NewsRepository
+from api.news_controller import NEWS_FIELDS, news_model, news_row_to_dict, news_to_dict
+from utils.serialization import dumps, orjson
+from config.config import Config
+
+
+def legacy_page(repo: NewsRepository, limit: int, after_id):
+    items = repo.list(limit=limit, after_id=after_id, fields=NEWS_FIELDS)
+    data = marshal([news_to_dict(it) for it in items], news_model, mask=",".join(NEWS_FIELDS))
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return body, [it.id for it in items]
+
+
+def rows_page(repo: NewsRepository, limit: int, after_id):
+    rows = repo.list_rows(NEWS_FIELDS, limit=limit, after_id=after_id)
+    return dumps([news_row_to_dict(row) for row in rows]), [row.id for row in rows]
+
+
+def measure(session, page, page_size: int, rounds: int, compress: bool = False) -> float:
+    repo = NewsRepository(session=session)
+    serialized = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        after_id = None
+        while True:
+            body, ids = page(repo, page_size, after_id)
+            if compress:
+                gzip.compress(body, compresslevel=Config.RESPONSE_GZIP_LEVEL, mtime=0)
+            # Como entre requisições: nenhum objeto fica na sessão para a próxima página
+            session.expunge_all()
+            serialized += len(ids)
+            if len(ids) < page_size:
+                break
+            after_id = ids[-1]
+    return serialized / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da serialização da listagem de notícias")
+    parser.add_argument("--rows", type=int, default=20000, help="Notícias na tabela")
+    parser.add_argument("--page-size", type=int, default=Config.NEWS_PAGE_SIZE, help="Itens por página")
+    parser.add_argument("--rounds", type=int, default=3, help="Vezes que a tabela inteira é percorrida")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench_serialization.db')}")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        try:
+            NewsRepository(session=session).upsert_many(
+                {
+                    "source_title": f"Câmara aprova projeto número {n} sobre mobilidade urbana",
+                    "source_url": f"https://exemplo.com/noticias/{n}",
+                    "author": f"Secretaria {n % 10}",
+                    "question_title": f"Você apoia o projeto número {n} sobre mobilidade urbana?",
+                }
+                for n in range(args.rows)
+            )
+            results = [
+                ("antes (ORM + marshal + json)", measure(session, legacy_page, args.page_size, args.rounds)),
+                ("depois (linhas + codificador)", measure(session, rows_page, args.page_size, args.rounds)),
+                ("depois + gzip", measure(session, rows_page, args.page_size, args.rounds, compress=True)),
+            ]
+        finally:
+            session.close()
+            engine.dispose()
+
+    print(f"codificador JSON: {'orjson' if orjson is not None else 'json (orjson não instalado)'}")
+    print(f"{'caminho':<32}{'linhas/s':>12}{'ganho':>8}")
+    print("-" * 52)
+    baseline = results[0][1]
+    for name, rate in results:
+        print(f"{name:<32}{rate:>12.0f}{rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
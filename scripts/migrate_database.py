@@ -1,22 +1,124 @@
 """
-Script de migração para adicionar a coluna 'author' à tabela news_items.
-Execute este script uma vez para atualizar o banco de dados existente.
+Script de migração do banco de dados existente:
+ - adiciona a coluna 'author' à tabela news_items;
+ - cria o índice de source_url usado pelo processamento incremental;
+ - adiciona as colunas url_key (URL normalizada, única) e title_hash, preenche as
+   linhas existentes, remove as notícias duplicadas (mantém a mais antiga) e cria os índices;
+ - cria os índices compostos usados pela paginação e pelos filtros da listagem;
+ - alarga question_title para VARCHAR(128) em bancos que impõem o tamanho (Postgres, MySQL);
+ - regrava external_response antigo (texto str(dict)) como JSON, comprimindo os grandes.
+Pode ser executado mais de uma vez: cada passo verifica se já foi aplicado.
 """
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+import ast
+import json
 import sqlite3
 from src.config.config import Config
+from src.utils.utils import normalize_url, title_hash
+from src.models.types import COMPRESSED_PREFIX, encode_json_payload
+
+def migrate_external_response(conn):
+    """
+    Converte external_response gravado como texto livre para o formato de CompressedJSON.
+    """
+    cursor = conn.cursor()
+    rows = cursor.execute(
+        "SELECT id, external_response FROM news_items WHERE external_response IS NOT NULL AND external_response NOT LIKE ?",
+        (COMPRESSED_PREFIX + "%",),
+    ).fetchall()
+    updates = []
+    for item_id, stored in rows:
+        try:
+            value = json.loads(stored)
+        except ValueError:
+            try:
+                # Formato antigo: repr de um dict Python
+                value = ast.literal_eval(stored)
+            except (ValueError, SyntaxError):
+                value = stored
+        encoded = encode_json_payload(value)
+        if encoded != stored:
+            updates.append((encoded, item_id))
+    cursor.executemany("UPDATE news_items SET external_response = ? WHERE id = ?", updates)
+    conn.commit()
+    print(f"external_response convertido para JSON em {len(updates)} notícias.")
+
+def migrate_unique_keys(conn):
+    """
+    Preenche url_key/title_hash, remove duplicatas e cria o índice único de url_key.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(news_items)")
+    columns = [column[1] for column in cursor.fetchall()]
+    for name, ddl in (("url_key", "VARCHAR(1024)"), ("title_hash", "VARCHAR(64)")):
+        if name not in columns:
+            print(f"Adicionando coluna '{name}' à tabela news_items...")
+            cursor.execute(f"ALTER TABLE news_items ADD COLUMN {name} {ddl}")
+
+    rows = cursor.execute(
+        "SELECT id, source_title, source_url FROM news_items WHERE url_key IS NULL OR title_hash IS NULL ORDER BY id"
+    ).fetchall()
+    cursor.executemany(
+        "UPDATE news_items SET url_key = ?, title_hash = ? WHERE id = ?",
+        [(normalize_url(url), title_hash(title or ""), item_id) for item_id, title, url in rows],
+    )
+    print(f"Chaves calculadas para {len(rows)} notícias.")
+
+    duplicates = [row[0] for row in cursor.execute(
+        "SELECT id FROM news_items n WHERE url_key IS NOT NULL AND id > "
+        "(SELECT MIN(id) FROM news_items m WHERE m.url_key = n.url_key)"
+    ).fetchall()]
+    if duplicates:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'outbox_messages'")
+        has_outbox = cursor.fetchone() is not None
+        for item_id in duplicates:
+            if has_outbox:
+                cursor.execute("DELETE FROM outbox_messages WHERE news_id = ?", (item_id,))
+            cursor.execute("DELETE FROM news_items WHERE id = ?", (item_id,))
+    print(f"Notícias duplicadas removidas: {len(duplicates)}")
+
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_news_items_url_key ON news_items (url_key)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_news_items_title_hash ON news_items (title_hash)")
+    conn.commit()
+    print("Índices 'ix_news_items_url_key' (único) e 'ix_news_items_title_hash' verificados.")
+
+def migrate_question_title_length(url: str):
+    """
+    Alarga news_items.question_title de VARCHAR(64) para VARCHAR(128): as perguntas têm até
+    96 caracteres. O SQLite não impõe o tamanho de VARCHAR, então só os outros bancos precisam do ALTER.
+    """
+    from sqlalchemy import create_engine, text
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    engine = create_engine(url)
+    statements = {
+        "postgresql": "ALTER TABLE news_items ALTER COLUMN question_title TYPE VARCHAR(128)",
+        "mysql": "ALTER TABLE news_items MODIFY question_title VARCHAR(128) NULL",
+    }
+    statement = statements.get(engine.dialect.name)
+    if statement is None:
+        print(f"Banco {engine.dialect.name}: alargue question_title para VARCHAR(128) manualmente, se necessário.")
+        return
+    with engine.begin() as connection:
+        connection.execute(text(statement))
+    engine.dispose()
+    print("Coluna 'question_title' alargada para VARCHAR(128).")
 
 def migrate_database():
     """
-    Adiciona a coluna 'author' à tabela news_items se ela não existir.
+    Aplica os passos de migração que ainda não foram executados.
     """
     # Determina o caminho do banco de dados
     db_path = Config.DATABASE_URL
     if db_path and db_path.startswith("sqlite:///"):
         db_path = db_path.replace("sqlite:///", "")
+    elif db_path:
+        # Os demais passos são específicos do SQLite
+        migrate_question_title_length(db_path)
+        return True
     else:
         # Fallback para um banco SQLite local
         db_path = "news_portal.db"
@@ -39,6 +141,24 @@ def migrate_database():
         else:
             print("Coluna 'author' já existe na tabela.")
         
+        # Índice usado para reconhecer notícias já armazenadas pela URL de origem
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_news_items_source_url ON news_items (source_url)")
+        conn.commit()
+        print("Índice 'ix_news_items_source_url' verificado.")
+        
+        # Unicidade por URL normalizada e hash do título
+        migrate_unique_keys(conn)
+        
+        # Índices da listagem paginada, na ordem (fetched_at, id) da página, com e sem filtro por autor
+        cursor.execute("DROP INDEX IF EXISTS ix_news_items_author_fetched_at")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_news_items_author_fetched_at_id ON news_items (author, fetched_at, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_news_items_fetched_at_id ON news_items (fetched_at, id)")
+        conn.commit()
+        print("Índices 'ix_news_items_author_fetched_at_id' e 'ix_news_items_fetched_at_id' verificados.")
+        
+        # Respostas da API externa em JSON (comprimido acima do limite configurado)
+        migrate_external_response(conn)
+        
         # Verifica a estrutura atual da tabela
         cursor.execute("PRAGMA table_info(news_items)")
         columns_info = cursor.fetchall()
@@ -2,12 +2,22 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from flask_restx import Api, Resource, fields, Namespace
-from flask import request
+from flask_restx import Api, Resource, fields, Namespace, inputs, marshal, reqparse
+from flask import Response, request
 from core.news_repository import NewsRepository
+from core.outbox_repository import OutboxRepository
 from services.news_service import NewsService
+from services.bulk_import_service import BulkImportService
+from services.export_service import FORMATS, NewsExporter
+from services.job_service import get_job_manager
+from api.read_cache import cached_read
+from clients.http_transport import get_transport
+from clients.gemini_client import GeminiClient
 from models.schemas import NewsItemCreate, NewsItemUpdate
+from config.config import Config
 from pydantic import ValidationError
+import json
+from sqlalchemy.exc import IntegrityError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -48,6 +58,21 @@ news_update_model = api.model('NewsItemUpdate', {
     'author': fields.String(description='Autor/Secretaria')
 })
 
+bulk_error_model = api.model('BulkImportError', {
+    'line': fields.Integer(description='Linha do NDJSON (ou posição no array, a partir de 1)'),
+    'message': fields.String(description='Motivo da rejeição'),
+    'details': fields.Raw(description='Erros de validação')
+})
+
+bulk_result_model = api.model('BulkImportResult', {
+    'received': fields.Integer(description='Registros lidos'),
+    'created': fields.Integer(description='Notícias criadas'),
+    'duplicates': fields.Integer(description='Registros ignorados por URL já existente'),
+    'failed': fields.Integer(description='Registros rejeitados'),
+    'errors': fields.List(fields.Nested(bulk_error_model), description='Detalhes dos primeiros registros rejeitados'),
+    'aborted': fields.String(description='Presente se o corpo ficou ilegível e a leitura foi interrompida')
+})
+
 error_model = api.model('Error', {
     'error': fields.String(required=True, description='Tipo do erro'),
     'message': fields.String(description='Mensagem de erro'),
@@ -59,6 +84,95 @@ success_model = api.model('Success', {
     'message': fields.String(description='Mensagem de sucesso')
 })
 
+job_model = api.model('Job', {
+    'id': fields.String(required=True, description='ID do job'),
+    'name': fields.String(description='Processamento executado'),
+    'status': fields.String(description='queued, running, succeeded ou failed'),
+    'created_at': fields.DateTime(description='Enfileirado em'),
+    'started_at': fields.DateTime(description='Início da execução'),
+    'finished_at': fields.DateTime(description='Fim da execução'),
+    'duration': fields.Float(description='Duração em segundos (até agora, se ainda estiver rodando)'),
+    'stages': fields.Raw(description='Segundos gastos em cada etapa (fetch, dedupe, reformulate, persist, deliver)'),
+    'attached': fields.Integer(description='Disparos que se anexaram a este job em andamento'),
+    'result': fields.Raw(description='Resultado do processamento'),
+    'error': fields.String(description='Mensagem de erro, se falhou')
+})
+
+NEWS_FIELDS = tuple(news_model.keys())
+
+def news_fields(value):
+    """
+    Lista de campos separados por vírgula, ex.: "id,source_title,question_title".
+    """
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in NEWS_FIELDS]
+    if unknown or not names:
+        raise ValueError(f"Campos inválidos: {', '.join(unknown) or value!r}. Use: {', '.join(NEWS_FIELDS)}")
+    return names
+
+news_fields.__schema__ = {'type': 'string', 'format': 'csv'}
+
+def _external_response_text(value):
+    # Gravado como JSON; a API mantém o contrato de campo texto
+    if value is not None and not isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def news_to_dict(it, selected=NEWS_FIELDS) -> dict:
+    """
+    Serializa só os campos pedidos, sem tocar nas colunas que não foram carregadas.
+    """
+    result = {}
+    for name in selected:
+        value = getattr(it, name)
+        if name == 'fetched_at' and value is not None:
+            value = value.isoformat()
+        elif name == 'external_response':
+            value = _external_response_text(value)
+        result[name] = value
+    return result
+
+def news_row_to_dict(row, selected=NEWS_FIELDS) -> dict:
+    """
+    Caminho rápido das leituras: converte uma linha de NewsRepository.list_rows/get_row
+    direto no formato de news_model, sem marshal. fetched_at continua datetime e é
+    escrito em ISO 8601 pelo codificador (utils/serialization.py), como o fields.DateTime.
+    """
+    result = {name: getattr(row, name) for name in selected}
+    if 'external_response' in result:
+        result['external_response'] = _external_response_text(result['external_response'])
+    return result
+
+# Parâmetros de paginação e filtro da listagem
+list_parser = reqparse.RequestParser()
+list_parser.add_argument('limit', type=inputs.int_range(1, Config.NEWS_PAGE_MAX_SIZE), location='args',
+                         default=Config.NEWS_PAGE_SIZE, help=f'Itens por página (1 a {Config.NEWS_PAGE_MAX_SIZE})')
+list_parser.add_argument('after_id', type=inputs.positive, location='args',
+                         help='Cursor: último id da página anterior (cabeçalho X-Next-After-Id)')
+list_parser.add_argument('author', type=str, location='args', help='Filtra pelo autor/secretaria')
+list_parser.add_argument('fetched_from', type=inputs.datetime_from_iso8601, location='args',
+                         help='Extraídas a partir desta data/hora (ISO 8601, inclusive)')
+list_parser.add_argument('fetched_to', type=inputs.datetime_from_iso8601, location='args',
+                         help='Extraídas antes desta data/hora (ISO 8601, exclusive)')
+list_parser.add_argument('fields', type=news_fields, location='args',
+                         help=f'Campos a retornar, separados por vírgula (padrão: todos): {", ".join(NEWS_FIELDS)}')
+
+# Parâmetros da exportação: mesmos filtros da listagem, sem paginação
+export_parser = list_parser.copy()
+export_parser.remove_argument('limit')
+export_parser.remove_argument('after_id')
+export_parser.add_argument('format', type=str, choices=tuple(FORMATS), location='args', default='ndjson',
+                           help='Formato do arquivo: ndjson ou csv')
+export_parser.add_argument('gzip', type=inputs.boolean, location='args', default=False,
+                           help='Entrega o arquivo comprimido (.gz)')
+
+# Parâmetros da busca textual
+search_parser = reqparse.RequestParser()
+search_parser.add_argument('q', type=str, location='args', required=True, help='Termos da busca (acentos e caixa são ignorados)')
+search_parser.add_argument('limit', type=inputs.int_range(1, Config.SEARCH_PAGE_MAX_SIZE), location='args',
+                           default=Config.SEARCH_PAGE_SIZE, help=f'Resultados por página (1 a {Config.SEARCH_PAGE_MAX_SIZE})')
+search_parser.add_argument('offset', type=inputs.natural, location='args', default=0, help='Resultados a pular')
+
 # Inicialização dos serviços
 repo = NewsRepository()
 service = NewsService(repository=repo)
@@ -66,24 +180,35 @@ service = NewsService(repository=repo)
 @news_ns.route('/')
 class NewsList(Resource):
     @news_ns.doc('list_news')
-    @news_ns.marshal_list_with(news_model)
+    @news_ns.expect(list_parser)
+    @news_ns.response(200, 'Success', [news_model])
     def get(self):
         """
         Lista todas as notícias
         
-        Retorna uma lista com todas as notícias processadas pelo sistema.
+        Retorna as notícias processadas pelo sistema, da mais recente para a mais antiga,
+        em páginas. Para a próxima página, envie em `after_id` o valor do cabeçalho
+        X-Next-After-Id (ausente na última página). Com `fields`, só as colunas pedidas
+        são lidas do banco e retornadas. Suporta If-None-Match (ETag).
         """
-        items = repo.list()
-        result = [ {
-            "id": it.id,
-            "source_title": it.source_title,
-            "question_title": it.question_title,
-            "source_url": it.source_url,
-            "author": it.author,
-            "fetched_at": it.fetched_at.isoformat() if it.fetched_at else None,
-            "external_response": it.external_response
-        } for it in items]
-        return result
+        return cached_read(self._page)
+
+    @staticmethod
+    def _page():
+        args = list_parser.parse_args()
+        selected = args['fields'] or NEWS_FIELDS
+        rows = repo.list_rows(
+            selected,
+            limit=args['limit'],
+            after_id=args['after_id'],
+            author=args['author'],
+            fetched_from=args['fetched_from'],
+            fetched_to=args['fetched_to'],
+        )
+        headers = {}
+        if len(rows) == args['limit']:
+            headers['X-Next-After-Id'] = str(rows[-1].id)
+        return [news_row_to_dict(row, selected) for row in rows], 200, headers
 
     @news_ns.doc('create_news')
     @news_ns.expect(news_create_model)
@@ -99,33 +224,89 @@ class NewsList(Resource):
         except ValidationError as e:
             return {"error": "validation", "message": "Dados inválidos", "details": e.errors()}, 400
         
-        it = repo.create(source_title=payload.source_title, source_url=payload.source_url, author=payload.author)
+        try:
+            it = repo.create(source_title=payload.source_title, source_url=payload.source_url, author=payload.author)
+        except IntegrityError:
+            return {"error": "conflict", "message": "Já existe uma notícia com esta URL"}, 409
         return {"status": "created", "message": f"Notícia criada com ID {it.id}"}, 201
 
+@news_ns.route('/export')
+class NewsExport(Resource):
+    @news_ns.doc('export_news')
+    @news_ns.expect(export_parser)
+    @news_ns.produces(['application/x-ndjson', 'text/csv', 'application/gzip'])
+    def get(self):
+        """
+        Exporta todas as notícias
+        
+        Envia o histórico completo (com os mesmos filtros da listagem) em NDJSON ou CSV,
+        em streaming, da notícia mais antiga para a mais recente. Com `gzip=true`, o
+        arquivo é entregue comprimido.
+        """
+        args = export_parser.parse_args()
+        exporter = NewsExporter(
+            fmt=args['format'],
+            fields=args['fields'] or NEWS_FIELDS,
+            filters={
+                'author': args['author'],
+                'fetched_from': args['fetched_from'],
+                'fetched_to': args['fetched_to'],
+            },
+            gzip=args['gzip'],
+        )
+        return Response(
+            exporter.stream(),
+            mimetype=exporter.mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{exporter.filename}"'},
+        )
+
+@news_ns.route('/search')
+class NewsSearch(Resource):
+    @news_ns.doc('search_news')
+    @news_ns.expect(search_parser)
+    @news_ns.marshal_list_with(news_model)
+    def get(self):
+        """
+        Busca notícias por texto
+        
+        Procura os termos no título original e na pergunta reformulada, ignorando
+        acentos e caixa, e retorna os resultados mais relevantes primeiro.
+        """
+        args = search_parser.parse_args()
+        items = repo.search(args['q'], limit=args['limit'], offset=args['offset'], fields=NEWS_FIELDS)
+        return [news_to_dict(it) for it in items]
+
+@news_ns.route('/bulk')
+class NewsBulk(Resource):
+    @news_ns.doc('bulk_create_news', consumes=['application/x-ndjson', 'application/json'])
+    @news_ns.response(200, 'Resumo da importação', bulk_result_model)
+    def post(self):
+        """
+        Importa notícias em lote
+        
+        Aceita NDJSON (um objeto por linha) ou um array JSON de objetos no formato de
+        criação. O corpo é lido como stream e gravado em blocos; registros inválidos
+        são reportados pela linha sem interromper a importação.
+        """
+        return BulkImportService(repository=repo).import_stream(request.stream)
+
 @news_ns.route('/<int:item_id>')
 @news_ns.param('item_id', 'ID da notícia')
 class NewsItem(Resource):
     @news_ns.doc('get_news')
-    @news_ns.marshal_with(news_model)
+    @news_ns.response(200, 'Success', news_model)
     def get(self, item_id):
         """
         Busca uma notícia por ID
         
-        Retorna os detalhes de uma notícia específica.
+        Retorna os detalhes de uma notícia específica. Suporta If-None-Match (ETag).
         """
-        it = repo.get(item_id)
-        if not it:
-            return {"error": "not found", "message": "Notícia não encontrada"}, 404
-        
-        return {
-            "id": it.id,
-            "source_title": it.source_title,
-            "question_title": it.question_title,
-            "source_url": it.source_url,
-            "author": it.author,
-            "fetched_at": it.fetched_at.isoformat() if it.fetched_at else None,
-            "external_response": it.external_response
-        }
+        def produce():
+            row = repo.get_row(item_id, NEWS_FIELDS)
+            if row is None:
+                return {"error": "not found", "message": "Notícia não encontrada"}, 404, {}
+            return news_row_to_dict(row), 200, {}
+        return cached_read(produce)
 
     @news_ns.doc('update_news')
     @news_ns.expect(news_update_model)
@@ -179,23 +360,70 @@ class HealthCheck(Resource):
         """
         return {"status": "ok", "message": "Aplicação funcionando normalmente"}
 
+@system_ns.route('/http-stats')
+class HttpStats(Resource):
+    @system_ns.doc('http_stats')
+    def get(self):
+        """
+        Estatísticas do transporte HTTP
+        
+        Retorna, por host, o número de requisições, erros, novas tentativas e latências.
+        """
+        return get_transport().stats()
+
+@system_ns.route('/gemini')
+class GeminiStatus(Resource):
+    @system_ns.doc('gemini_status')
+    def get(self):
+        """
+        Estado do cliente Gemini
+        
+        Retorna o estado do circuit breaker, o orçamento restante do limitador de
+        requisições e as estatísticas do cache de perguntas. "degraded" indica que as
+        perguntas estão sendo geradas localmente, sem o Gemini.
+        """
+        return GeminiClient().status()
+
+@system_ns.route('/outbox')
+class OutboxStatus(Resource):
+    @system_ns.doc('outbox_status')
+    def get(self):
+        """
+        Estado do outbox de entregas
+        
+        Retorna quantas entregas para a API externa estão pendentes, em envio, enviadas ou abandonadas.
+        """
+        return OutboxRepository().counts_by_status()
+
 @system_ns.route('/trigger')
 class ManualTrigger(Resource):
     @system_ns.doc('manual_trigger')
-    @system_ns.marshal_with(success_model)
+    @system_ns.marshal_with(job_model, code=202, description='Job enfileirado (ou já em andamento)')
     def post(self):
         """
         Executa processamento manual
         
-        Executa manualmente o processamento da primeira notícia mais recente.
+        Enfileira o processamento de todas as notícias novas do portal (pipeline em
+        etapas) e responde na hora com o job; o andamento é consultado em
+        /api/system/jobs/{job_id}. Se já houver um processamento em andamento (manual ou
+        agendado, em qualquer worker), o disparo se anexa a ele (mesmo id).
         """
-        try:
-            result = service.process_latest_first_item()
-            return {
-                "status": "ok", 
-                "message": "Processamento executado com sucesso",
-                "result": result
-            }
-        except Exception as e:
-            logger.exception("Manual trigger failed")
-            return {"error": "processing_failed", "message": str(e)}, 500
+        job, _ = get_job_manager().submit('process_new_items', service.process_new_items)
+        return job.to_dict(), 202, {'Location': api.url_for(JobStatus, job_id=job.id)}
+
+@system_ns.route('/jobs/<string:job_id>')
+@system_ns.param('job_id', 'ID do job')
+class JobStatus(Resource):
+    @system_ns.doc('job_status')
+    @system_ns.response(200, 'Success', job_model)
+    @system_ns.response(404, 'Job não encontrado', error_model)
+    def get(self, job_id):
+        """
+        Estado de um job
+        
+        Retorna o estado, o tempo gasto em cada etapa e, ao terminar, o resultado ou o erro.
+        """
+        job = get_job_manager().get(job_id)
+        if job is None:
+            return {"error": "not found", "message": "Job não encontrado"}, 404
+        return marshal(job.to_dict(), job_model)
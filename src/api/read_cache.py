@@ -0,0 +1,174 @@
+"""
+Respostas condicionais e cache em memória para os endpoints de leitura de notícias.
+
+O ETag é forte e deriva da versão de news_items (core/table_version.py) e da URL
+completa da requisição: enquanto nada for gravado, a mesma URL produz os mesmos bytes.
+Um If-None-Match igual é respondido com 304 sem consultar o banco, e as demais
+repetições saem do LRU de respostas já serializadas.
+
+O corpo é comprimido (gzip, ou br se o pacote brotli estiver instalado) conforme o
+Accept-Encoding. Cada variante tem seu próprio ETag (sufixo "-gzip"/"-br"), é
+comprimida uma única vez por versão e fica guardada junto com o corpo original.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+from flask import Response, request
+from core.table_version import news_version
+from utils.serialization import dumps
+from config.config import Config
+import logging
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def _gzip(body: bytes) -> bytes:
+    # mtime fixo: os mesmos bytes de entrada geram sempre a mesma variante (ETag forte)
+    return gzip.compress(body, compresslevel=Config.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=Config.RESPONSE_BROTLI_QUALITY)
+
+
+# Em ordem de preferência, usada quando o cliente aceita mais de uma com a mesma qualidade
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {}
+if brotli is not None:
+    ENCODERS["br"] = _brotli
+ENCODERS["gzip"] = _gzip
+
+
+@dataclass
+class CachedBody:
+    version: int
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        """
+        Corpo na codificação pedida (None = sem compressão), comprimido na primeira vez.
+        """
+        if encoding is None:
+            return self.body
+        data = self.encoded.get(encoding)
+        if data is None:
+            data = self.encoded[encoding] = ENCODERS[encoding](self.body)
+        return data
+
+
+class ResponseLRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: int) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedBody):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "max_entries": self.max_entries}
+
+
+response_cache = ResponseLRU(Config.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def make_etag(version: int, key: str) -> str:
+    return hashlib.sha256(f"{version}\x1f{key}".encode("utf-8")).hexdigest()[:32]
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def negotiate_encoding(size: int) -> Optional[str]:
+    """
+    Melhor codificação aceita pelo cliente (maior q; empate decidido pela ordem de
+    ENCODERS), ou None para corpos pequenos demais ou sem compressão aceitável.
+    """
+    if not Config.RESPONSE_COMPRESSION_ENABLED or size < Config.RESPONSE_COMPRESS_MIN_BYTES:
+        return None
+    accepted = request.accept_encodings
+    best = max(ENCODERS, key=accepted.quality)
+    return best if accepted.quality(best) > 0 else None
+
+
+def _respond(entry: CachedBody, etag: Optional[str]) -> Response:
+    encoding = negotiate_encoding(len(entry.body))
+    response = Response(entry.variant(encoding), status=200, mimetype="application/json", headers=entry.headers)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if Config.RESPONSE_COMPRESSION_ENABLED:
+        response.vary.add("Accept-Encoding")
+    if etag is not None:
+        response.set_etag(variant_etag(etag, encoding))
+        # O cliente pode guardar a resposta, mas deve revalidar (If-None-Match) a cada uso
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def cached_read(produce: Callable[[], Tuple[object, int, Dict[str, str]]]):
+    """
+    Executa `produce` (que retorna dados, status e cabeçalhos) só quando a resposta para
+    esta URL não está em cache na versão atual da tabela. Respostas com status diferente
+    de 200 não são guardadas e são devolvidas como vieram.
+    """
+    if not Config.RESPONSE_CACHE_ENABLED:
+        data, status, headers = produce()
+        if status != 200:
+            return data, status, headers
+        return _respond(CachedBody(version=0, body=dumps(data), headers=dict(headers)), etag=None)
+
+    version = news_version.current()
+    key = request.full_path
+    etag = make_etag(version, key)
+    # Qualquer variante com a versão atual ainda é válida; o 304 repete o ETag recebido
+    for candidate in [etag, *(variant_etag(etag, encoding) for encoding in ENCODERS)]:
+        if request.if_none_match.contains(candidate):
+            not_modified = Response(status=304)
+            not_modified.set_etag(candidate)
+            if Config.RESPONSE_COMPRESSION_ENABLED:
+                not_modified.vary.add("Accept-Encoding")
+            return not_modified
+
+    entry = response_cache.get(key, version)
+    if entry is None:
+        data, status, headers = produce()
+        if status != 200:
+            return data, status, headers
+        entry = CachedBody(version=version, body=dumps(data), headers=dict(headers))
+        response_cache.put(key, entry)
+    return _respond(entry, etag)
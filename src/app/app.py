@@ -6,9 +6,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from flask import Flask, jsonify
 from flask_cors import CORS
 from api.news_controller import api
-from core.db import init_db
+from core.db import init_db, ScopedSession
+from core.leader_lease import LeaderLease
 from services.scheduler_service import SchedulerService
 from services.news_service import NewsService
+from services.outbox_worker import OutboxDeliveryWorker
+from services.job_service import get_job_manager
 from clients.news_fetcher import RssNewsFetcher, HtmlListFetcher
 from clients.recife_portal_fetcher import RecifePortalFetcher
 from clients.gemini_client import GeminiClient
@@ -19,7 +22,12 @@ from config.config import Config
 Config.setup_logging()
 logger = logging.getLogger(__name__)
 
-def create_app():
+def create_app(start_background: bool = True):
+    """
+    Cria a aplicação. Com start_background=False (servidor de produção, wsgi.py), o
+    agendador e o worker do outbox não são iniciados aqui, e sim em cada worker depois
+    do fork, por start_background_services (gunicorn.conf.py).
+    """
     # Valida configurações
     Config.validate_config()
     
@@ -35,17 +43,27 @@ def create_app():
     # Registra a API com Swagger
     api.init_app(app)
 
+    # Cada requisição usa a sessão da sua thread; ao final ela é descartada
+    @app.teardown_appcontext
+    def remove_session(exc=None):
+        ScopedSession.remove()
+
+    # Entregas para a API externa saem do outbox em segundo plano
+    external = ExternalClient()
+    outbox_worker = OutboxDeliveryWorker(external=external)
+
     # instantiate services for scheduler/manual trigger
     news_service = NewsService(
         repository=None,
         fetcher=RecifePortalFetcher(),  # Fetcher específico para o portal do Recife
         gemini=GeminiClient(),
-        external=ExternalClient()
+        external=external,
+        outbox_worker=outbox_worker
     )
+    app.extensions["portal"] = {"news_service": news_service, "outbox_worker": outbox_worker}
 
-    scheduler = SchedulerService()
-    # schedule weekly Monday 9am
-    scheduler.start_weekly_monday_9am(news_service.process_latest_first_item)
+    if start_background:
+        start_background_services(app)
 
     # Rotas de compatibilidade (mantidas para não quebrar integrações existentes)
     @app.route("/healthz", methods=["GET"])
@@ -54,15 +72,44 @@ def create_app():
 
     @app.route("/trigger", methods=["POST"])
     def manual_trigger():
-        try:
-            result = news_service.process_latest_first_item()
-            return jsonify({"status":"ok", "result": result})
-        except Exception as e:
-            logger.exception("Manual trigger failed")
-            return jsonify({"status":"error", "message": str(e)}), 500
+        # Mesmo job (single-flight) de POST /api/system/trigger; o estado fica em /api/system/jobs/<id>
+        job, _ = get_job_manager().submit("process_new_items", news_service.process_new_items)
+        return jsonify(job.to_dict()), 202, {"Location": f"/api/system/jobs/{job.id}"}
 
     return app
 
+def start_background_services(app) -> bool:
+    """
+    Inicia o agendador e o worker do outbox se este processo for o líder
+    (core/leader_lease.py). Retorna False nos demais processos, que só atendem a API.
+    """
+    services = app.extensions["portal"]
+    lease = LeaderLease()
+    if not lease.acquire():
+        logger.info("Processo %d não é o líder; agendador e outbox rodam em outro processo", os.getpid())
+        return False
+    services["lease"] = lease
+    services["outbox_worker"].start()
+    scheduler = SchedulerService()
+    # Coleta com intervalo adaptativo (processa todas as notícias novas desde a última execução);
+    # passa pelo gerenciador de jobs, então não roda ao mesmo tempo que um disparo manual
+    news_service = services["news_service"]
+    scheduler.start_adaptive_polling(lambda: get_job_manager().run("process_new_items", news_service.process_new_items))
+    services["scheduler"] = scheduler
+    return True
+
+def stop_background_services(app):
+    """
+    Para o agendador e o worker do outbox (se este processo for o líder) e libera a liderança.
+    """
+    services = app.extensions.get("portal", {})
+    lease = services.pop("lease", None)
+    if lease is None:
+        return
+    services.pop("scheduler").shutdown()
+    services["outbox_worker"].stop()
+    lease.release()
+
 if __name__ == "__main__":
     app = create_app()
     app.run(host=Config.SERVER_HOST, port=Config.SERVER_PORT, debug=True)
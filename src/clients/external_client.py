@@ -2,22 +2,45 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-import requests
 from config.config import Config
-from typing import Dict, Any
+from clients.http_transport import HttpTransport, get_transport
+from typing import Dict, Any, Optional
+import requests
+
+# Respostas de erro que podem dar certo numa nova tentativa (além de 5xx)
+RETRYABLE_STATUSES = frozenset({408, 425, 429})
+
+
+class DeliveryRejected(requests.HTTPError):
+    """A API externa recusou o envio (4xx): repetir a mesma mensagem não adianta."""
+
 
 class ExternalClient:
-    def __init__(self, base_url: str = None):
+    def __init__(self, base_url: str = None, http: Optional[HttpTransport] = None):
         self.base_url = base_url or Config.EXTERNAL_API_URL
+        self.http = http or get_transport()
 
-    def send_question(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def send_question(self, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Sends data to external API. Returns external API response (json or text).
+        Any non-2xx response is an error: requests.HTTPError on 408/425/429/5xx, so the
+        caller can retry later, and DeliveryRejected on other statuses (400, 401, 422...),
+        which will not succeed on retry. The
+        Idempotency-Key header lets the API discard repeated deliveries, so only requests
+        that carry it are retried by the transport (EXTERNAL_MAX_RETRIES).
         """
         # A API externa espera 'texto' como query parameter
         params = {"texto": payload.get("texto", "")}
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
         
-        resp = requests.post(self.base_url, params=params, json=payload, timeout=10)
+        retries = Config.EXTERNAL_MAX_RETRIES if idempotency_key else 0
+        resp = self.http.post(
+            self.base_url, params=params, json=payload, headers=headers, timeout=10, max_retries=retries,
+        )
+        if resp.status_code in RETRYABLE_STATUSES or resp.status_code >= 500:
+            raise requests.HTTPError(f"API externa respondeu {resp.status_code}", response=resp)
+        if not 200 <= resp.status_code < 300:
+            raise DeliveryRejected(f"API externa recusou o envio ({resp.status_code}): {resp.text[:200]}", response=resp)
         try:
             return resp.json()
         except ValueError:
@@ -0,0 +1,181 @@
+"""
+Cache persistente das perguntas geradas pelo Gemini.
+A chave combina o título normalizado, o limite de caracteres e a versão do prompt,
+então mudar o prompt invalida automaticamente as entradas antigas.
+
+Dois níveis: um LRU em memória (acertos em microssegundos, sem I/O) na frente de
+uma tabela SQLite em disco, que sobrevive a reinícios e é limitada por tamanho
+(remoção LRU pela coluna last_access) e, opcionalmente, por idade (TTL).
+Os acessos servidos pela memória são gravados em last_access de uma vez, antes da remoção.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from config.config import Config
+from utils.utils import normalize_title
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReformulationCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        memory_entries: int = 1024,
+    ):
+        self.path = path or Config.GEMINI_CACHE_PATH
+        self.max_entries = max_entries or Config.GEMINI_CACHE_MAX_ENTRIES
+        ttl = Config.GEMINI_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.ttl_seconds = ttl if ttl and ttl > 0 else None
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._pending_touches: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        self._conn  # cria a tabela já na construção
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Uma conexão SQLite não pode atravessar um fork(): com o gunicorn pré-carregando a
+        # aplicação, o cache é criado no mestre, e cada worker abre a sua própria conexão
+        if self._connection_pid != os.getpid():
+            self._connection = self._connect()
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reformulations ("
+            " key TEXT PRIMARY KEY,"
+            " question TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_reformulations_last_access ON reformulations (last_access)")
+        return conn
+
+    @staticmethod
+    def make_key(text: str, max_chars: int, prompt_version: str) -> str:
+        raw = f"{prompt_version}\x1f{max_chars}\x1f{normalize_title(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, question: str, created_at: float):
+        self._memory[key] = (question, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._memory.move_to_end(key)
+                self._pending_touches[key] = now
+                self.hits += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            row = self._conn.execute(
+                "SELECT question, created_at FROM reformulations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            question, created_at = row
+            if self._expired(created_at, now):
+                self._conn.execute("DELETE FROM reformulations WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE reformulations SET last_access = ? WHERE key = ?", (now, key))
+            self._remember(key, question, created_at)
+            self.hits += 1
+            return question
+
+    def put(self, key: str, question: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reformulations (key, question, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, question, now, now),
+            )
+            self._remember(key, question, now)
+            self._evict()
+
+    def _evict(self):
+        if self._pending_touches:
+            self._conn.executemany(
+                "UPDATE reformulations SET last_access = ? WHERE key = ?",
+                [(ts, key) for key, ts in self._pending_touches.items()],
+            )
+            self._pending_touches.clear()
+        count = self._conn.execute("SELECT COUNT(*) FROM reformulations").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        evicted = self._conn.execute(
+            "SELECT key FROM reformulations ORDER BY last_access ASC LIMIT ?", (excess,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM reformulations WHERE key = ?", evicted)
+        for (key,) in evicted:
+            self._memory.pop(key, None)
+        self.evictions += len(evicted)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM reformulations").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "size": size,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM reformulations")
+            self._memory.clear()
+            self._pending_touches.clear()
+
+
+_default_cache: Optional[ReformulationCache] = None
+_default_lock = threading.Lock()
+
+
+def get_reformulation_cache() -> Optional[ReformulationCache]:
+    """
+    Cache compartilhado do processo, ou None se desativado por configuração.
+    """
+    global _default_cache
+    if not Config.GEMINI_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ReformulationCache()
+        return _default_cache
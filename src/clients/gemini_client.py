@@ -14,42 +14,302 @@ import os
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-import requests
 from config.config import Config
-from typing import Optional
+from clients.http_transport import HttpTransport, get_transport
+from clients.gemini_cache import ReformulationCache, get_reformulation_cache
+from clients.resilience import CircuitBreaker, CircuitOpenError, RateLimitExceeded, TokenBucket
+from typing import Dict, List, Optional
+import json
+import logging
+import random
+import threading
+import time
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompt below changes: cached questions from older prompts are ignored.
+PROMPT_VERSION = "v1"
+
+# Default for GeminiClient(cache=...): the shared cache; pass None to disable caching
+_SHARED_CACHE = object()
+
+_guards_lock = threading.Lock()
+_rate_limiter: Optional[TokenBucket] = None
+_circuit_breaker: Optional[CircuitBreaker] = None
+
+
+def get_rate_limiter() -> TokenBucket:
+    """
+    Process-wide token bucket sized to the Gemini quota (shared by every GeminiClient).
+    """
+    global _rate_limiter
+    with _guards_lock:
+        if _rate_limiter is None:
+            _rate_limiter = TokenBucket(
+                rate=Config.GEMINI_RATE_LIMIT_PER_MINUTE / 60.0,
+                capacity=Config.GEMINI_RATE_LIMIT_BURST,
+            )
+        return _rate_limiter
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    Process-wide circuit breaker for the Gemini endpoint (shared by every GeminiClient).
+    """
+    global _circuit_breaker
+    with _guards_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker(
+                failure_threshold=Config.GEMINI_BREAKER_FAILURES,
+                reset_timeout=Config.GEMINI_BREAKER_RESET_SECONDS,
+            )
+        return _circuit_breaker
 
 
 class GeminiClient:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        http: Optional[HttpTransport] = None,
+        cache: Optional[ReformulationCache] = _SHARED_CACHE,
+        rate_limiter: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
         self.api_key = api_key or Config.GEMINI_API_KEY
+        self.http = http or get_transport()
+        self.cache = get_reformulation_cache() if cache is _SHARED_CACHE else cache
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.breaker = breaker or get_circuit_breaker()
         # NOTE: you may want to perform OAuth2/service-account flows here.
 
     def reformulate_to_question(self, text: str, max_chars: int = 96) -> str:
         """
-        Sends a request to the generative model asking for a question-format title, <= max_chars.
-        The prompt is explicit and enforces the constraint. We also fallback to programmatic truncation.
+        Returns a question-format title <= max_chars, served from the reformulation cache
+        when the same (normalized) title was already reformulated with the current prompt.
+        Raises ValueError when the model returns an empty or degenerate question, which is
+        never cached (without a TTL it would be served forever).
         """
-        if not self.api_key:
-            raise RuntimeError("GEMINI_API_KEY not configured")
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(text, max_chars, PROMPT_VERSION)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
 
-        prompt = (
-            f"Transforme o título abaixo em uma PERGUNTA de SIM ou NÃO (em português), com no máximo {max_chars} "
+        question = self._reformulate_remote(text, max_chars)
+        if not self._is_usable(question):
+            raise ValueError(f"Gemini returned an unusable question: {question!r}")
+        if key is not None:
+            self.cache.put(key, question)
+        return question
+
+    def reformulate_many(
+        self, titles: List[str], max_chars: int = 96, batch_size: Optional[int] = None,
+    ) -> List[Optional[str]]:
+        """
+        Reformulates several titles, returning the questions in the same order.
+        Cache hits are served locally; the misses are packed batch_size at a time into a
+        single generateContent call that returns JSON. Every question goes through the same
+        max_chars / question-mark safety net; a malformed batch answer falls back to per-item
+        calls, while a failed call is not retried item by item.
+        Errors are handled per chunk: titles that could not be reformulated come back as
+        None (so the caller can fall back locally) and everything already resolved is kept.
+        Once the circuit is open or the request budget is exhausted, no further calls are made.
+        """
+        batch_size = max(1, batch_size or Config.GEMINI_BATCH_SIZE)
+        results: Dict[int, Optional[str]] = {}
+        pending: Dict[str, List[int]] = {}  # distinct title -> positions in the input
+
+        for pos, title in enumerate(titles):
+            if self.cache is not None:
+                cached = self.cache.get(self.cache.make_key(title, max_chars, PROMPT_VERSION))
+                if cached is not None:
+                    results[pos] = cached
+                    continue
+            pending.setdefault(title, []).append(pos)
+
+        distinct = list(pending)
+        for start in range(0, len(distinct), batch_size):
+            chunk = distinct[start:start + batch_size]
+            try:
+                questions = self._reformulate_chunk(chunk, max_chars)
+            except (CircuitOpenError, RateLimitExceeded) as e:
+                logger.warning(f"Gemini indisponível ({e}); {len(distinct) - start} títulos sem pergunta")
+                break
+            for title, question in zip(chunk, questions):
+                for pos in pending[title]:
+                    results[pos] = question
+
+        return [results.get(pos) for pos in range(len(titles))]
+
+    def _reformulate_chunk(self, chunk: List[str], max_chars: int) -> List[Optional[str]]:
+        """
+        One batch call for the chunk; per-item calls only when the batch answer is malformed
+        (not one usable question per title). A failed call (HTTP error, timeout) leaves the
+        rest of the chunk as None instead of repeating it item by item against the same
+        outage. CircuitOpenError / RateLimitExceeded propagate.
+        """
+        if len(chunk) > 1:
+            try:
+                questions = self._reformulate_batch(chunk, max_chars)
+            except (CircuitOpenError, RateLimitExceeded):
+                raise
+            except Exception as e:
+                logger.warning(f"Falha na chamada em lote do Gemini ({e}); {len(chunk)} títulos sem pergunta")
+                return [None] * len(chunk)
+            if questions is not None:
+                if self.cache is not None:
+                    for title, question in zip(chunk, questions):
+                        self.cache.put(self.cache.make_key(title, max_chars, PROMPT_VERSION), question)
+                return questions
+
+        questions: List[Optional[str]] = []
+        for title in chunk:
+            try:
+                questions.append(self.reformulate_to_question(title, max_chars))
+            except (CircuitOpenError, RateLimitExceeded):
+                raise
+            except ValueError as e:
+                # Resposta vazia ou degenerada: só este título fica sem pergunta
+                logger.warning(f"Falha ao reformular '{title}' ({e})")
+                questions.append(None)
+            except Exception as e:
+                logger.warning(f"Falha ao reformular '{title}' ({e}); {len(chunk) - len(questions)} títulos sem pergunta")
+                questions.extend([None] * (len(chunk) - len(questions)))
+                break
+        return questions
+
+    @staticmethod
+    def _instructions(max_chars: int, subject: str = "o título abaixo") -> str:
+        """
+        Instructions shared by the single and batch prompts (covered by PROMPT_VERSION).
+        """
+        return (
+            f"Transforme {subject} em uma PERGUNTA de SIM ou NÃO (em português), com no máximo {max_chars} "
             "caracteres incluindo espaços. A pergunta deve soar natural e engajadora, como se fosse feita para "
             "consultar a opinião pública sobre o tema — usando expressões como 'você concorda', 'você conhece', "
-            "'acha importante', etc. Retorne apenas a pergunta, sem pontuação extra antes ou depois.\n\n"
+            "'acha importante', etc."
+        )
+
+    def _reformulate_remote(self, text: str, max_chars: int) -> str:
+        """
+        Sends a request to the generative model asking for a question-format title, <= max_chars.
+        The prompt is explicit and enforces the constraint. We also fallback to programmatic truncation.
+        """
+        prompt = (
+            f"{self._instructions(max_chars)} Retorne apenas a pergunta, sem pontuação extra antes ou depois.\n\n"
             f"Título: {text}\n\nPergunta:"
         )
+        text_out = self._generate(prompt, max_output_tokens=60)
+        return self._enforce_question(text_out.strip(), max_chars)
+
+    def _reformulate_batch(self, titles: List[str], max_chars: int) -> Optional[List[str]]:
+        """
+        Reformulates several titles in one call. Returns None when the model output
+        is not a JSON list with exactly one question per title.
+        """
+        numbered = "\n".join(f"{i}. {title}" for i, title in enumerate(titles, 1))
+        prompt = (
+            f"{self._instructions(max_chars, subject='cada título abaixo')} Cada pergunta sem pontuação extra "
+            "antes ou depois.\n\n"
+            f"Responda somente com um array JSON de {len(titles)} objetos no formato "
+            '{"id": <número do título>, "pergunta": "<pergunta>"}, na mesma ordem dos títulos.\n\n'
+            f"Títulos:\n{numbered}"
+        )
+        text_out = self._generate(prompt, max_output_tokens=60 * len(titles), response_mime_type="application/json")
+
+        try:
+            data = json.loads(text_out)
+            by_id = {int(entry["id"]): str(entry["pergunta"]) for entry in data}
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Resposta em lote do Gemini inválida ({e}); reformulando item a item")
+            return None
+        if sorted(by_id) != list(range(1, len(titles) + 1)):
+            logger.warning("Resposta em lote do Gemini incompleta; reformulando item a item")
+            return None
+        questions = [self._enforce_question(by_id[i].strip(), max_chars) for i in range(1, len(titles) + 1)]
+        if not all(self._is_usable(question) for question in questions):
+            logger.warning("Resposta em lote do Gemini com perguntas vazias; reformulando item a item")
+            return None
+        return questions
+
+    def status(self) -> Dict[str, object]:
+        """
+        Breaker state, remaining request budget and cache counters, for monitoring.
+        """
+        breaker = self.breaker.snapshot()
+        return {
+            "degraded": breaker["state"] != CircuitBreaker.CLOSED,
+            "circuit_breaker": breaker,
+            "rate_limiter": self.rate_limiter.snapshot(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def _generate(self, prompt: str, max_output_tokens: int, response_mime_type: Optional[str] = None) -> str:
+        """
+        Calls generateContent and returns the text of the first candidate.
+        Fails fast (without touching the network) while the circuit is open or when
+        the rate limiter has no budget within GEMINI_RATE_LIMIT_MAX_WAIT seconds,
+        so callers can go straight to their local fallback. Connection errors, 429 and
+        5xx are retried up to GEMINI_MAX_RETRIES times, each attempt with its own token.
+        """
+        if not self.api_key:
+            raise RuntimeError("GEMINI_API_KEY not configured")
 
         # URL correta da API do Google Gemini
         url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={self.api_key}"
         headers = {"Content-Type": "application/json"}
+        generation_config = {"maxOutputTokens": max_output_tokens, "temperature": 0.7}
+        if response_mime_type:
+            generation_config["responseMimeType"] = response_mime_type
         payload = {
             "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {"maxOutputTokens": 60, "temperature": 0.7},
+            "generationConfig": generation_config,
         }
 
-        resp = requests.post(url, json=payload, headers=headers, timeout=20)
-        resp.raise_for_status()
+        # Retries are done here, not by the transport, so every HTTP attempt goes through
+        # the breaker and takes its own token: the bucket keeps matching the real quota
+        attempt = 0
+        while True:
+            # The breaker is checked before waiting for budget, so an open circuit fails fast
+            # and no token is spent on a request that is not sent
+            reservation = self.breaker.reserve()
+            if reservation is None:
+                raise CircuitOpenError("Gemini circuit open; skipping remote call")
+            if not self.rate_limiter.acquire(timeout=Config.GEMINI_RATE_LIMIT_MAX_WAIT):
+                # A half-open trial that never went out must not wedge the breaker
+                self.breaker.cancel(reservation)
+                raise RateLimitExceeded("Gemini request budget exhausted")
+
+            try:
+                resp = self.http.post(url, json=payload, headers=headers, timeout=Config.GEMINI_TIMEOUT, max_retries=0)
+                resp.raise_for_status()
+            except requests.HTTPError as e:
+                # Only throttling and server errors say something about the service health
+                status = e.response.status_code if e.response is not None else None
+                if status is None or status == 429 or status >= 500:
+                    self.breaker.record_failure()
+                    if attempt < Config.GEMINI_MAX_RETRIES:
+                        attempt += 1
+                        self._sleep_before_retry(attempt, e.response)
+                        continue
+                else:
+                    self.breaker.record_success()
+                raise
+            except requests.ConnectionError:
+                self.breaker.record_failure()
+                if attempt < Config.GEMINI_MAX_RETRIES:
+                    attempt += 1
+                    self._sleep_before_retry(attempt)
+                    continue
+                raise
+            except requests.RequestException:
+                # Read timeouts are not retried, so the wait is not doubled
+                self.breaker.record_failure()
+                raise
+            break
+        self.breaker.record_success()
         data = resp.json()
 
         # Parsing da resposta da API do Google Gemini
@@ -66,9 +326,32 @@ class GeminiClient:
 
         if not text_out:
             text_out = data.get("text", "") or ""
-        question = text_out.strip()
+        return text_out
 
-        # Safety net: trim and ensure max_chars. Try to keep whole words.
+    @staticmethod
+    def _sleep_before_retry(attempt: int, response=None):
+        """
+        Exponential backoff with full jitter, honouring Retry-After when the server sends it.
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        try:
+            delay = float(retry_after) if retry_after else random.uniform(0, Config.HTTP_BACKOFF_FACTOR * (2 ** attempt))
+        except ValueError:
+            delay = random.uniform(0, Config.HTTP_BACKOFF_FACTOR * (2 ** attempt))
+        time.sleep(min(Config.HTTP_BACKOFF_MAX, delay))
+
+    @staticmethod
+    def _is_usable(question: str) -> bool:
+        """
+        False for empty or degenerate model output (e.g. "?" after _enforce_question).
+        """
+        return sum(ch.isalnum() for ch in question) >= 3
+
+    @staticmethod
+    def _enforce_question(question: str, max_chars: int) -> str:
+        """
+        Safety net: trim and ensure max_chars. Try to keep whole words.
+        """
         if len(question) > max_chars:
             # try to cut at last space before limit
             short = question[:max_chars]
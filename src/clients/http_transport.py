@@ -0,0 +1,220 @@
+"""
+Camada de transporte HTTP compartilhada por todos os clientes externos.
+Mantém uma sessão requests por host (pool de conexões com keep-alive), aplica
+timeouts padrão, repete requisições em 429/5xx com backoff exponencial e jitter
+e registra estatísticas de latência por host. POST não é repetido, a menos que quem
+chama peça (max_retries) por saber que a chamada é idempotente.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from config.config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HostStats:
+    """
+    Estatísticas de latência de um host. As percentis usam apenas as amostras mais recentes.
+    """
+
+    def __init__(self, window: int = 256):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_status: Optional[int] = None
+        self._recent = deque(maxlen=window)
+
+    def record(self, elapsed_ms: float, status: Optional[int]):
+        self.requests += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_status = status
+        self._recent.append(elapsed_ms)
+        if status is None or status >= 500:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        recent = sorted(self._recent)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))]
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total_ms / self.requests, 2) if self.requests else 0.0,
+            "p50_ms": round(percentile(0.50), 2),
+            "p95_ms": round(percentile(0.95), 2),
+            "max_ms": round(self.max_ms, 2),
+            "last_status": self.last_status,
+        }
+
+
+class HttpTransport:
+    """
+    Cliente HTTP com uma sessão (e um pool de conexões) por host.
+    É seguro compartilhar uma instância entre threads.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_factor: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+    ):
+        self.pool_maxsize = pool_maxsize or Config.HTTP_POOL_MAXSIZE
+        self.timeout = timeout or Config.HTTP_TIMEOUT
+        self.max_retries = Config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_factor = Config.HTTP_BACKOFF_FACTOR if backoff_factor is None else backoff_factor
+        self.backoff_max = Config.HTTP_BACKOFF_MAX if backoff_max is None else backoff_max
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def _session_for(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # As repetições são feitas aqui, não pelo urllib3, para registrar cada tentativa
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+                self._stats.setdefault(host, HostStats())
+            return session
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Backoff exponencial com "full jitter"; respeita Retry-After quando informado.
+        """
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        ceiling = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def request(self, method: str, url: str, max_retries: Optional[int] = None, **kwargs) -> requests.Response:
+        """
+        Executa a requisição repetindo em erros de conexão e nos status de RETRY_STATUSES.
+        Timeouts de leitura não são repetidos para não duplicar o tempo de espera.
+        """
+        host = urlsplit(url).netloc
+        session = self._session_for(host)
+        stats = self._stats[host]
+        retries = self.max_retries if max_retries is None else max_retries
+        kwargs.setdefault("timeout", self.timeout)
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                resp = session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    stats.record(elapsed_ms, None)
+                if attempt >= retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Falha de conexão com {host} ({e}); nova tentativa em {delay:.2f}s")
+            else:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    stats.record(elapsed_ms, resp.status_code)
+                if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return resp
+                delay = self._backoff(attempt, resp.headers.get("Retry-After"))
+                logger.warning(f"{host} respondeu {resp.status_code}; nova tentativa em {delay:.2f}s")
+                resp.close()
+
+            attempt += 1
+            with self._lock:
+                stats.retries += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, max_retries: int = 0, **kwargs) -> requests.Response:
+        # POST não é idempotente: repetir pode duplicar o efeito no servidor
+        return self.request("POST", url, max_retries=max_retries, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {host: s.snapshot() for host, s in self._stats.items()}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class HostThrottle:
+    """
+    Limita requisições concorrentes por host e espaça o início de requisições
+    consecutivas ao mesmo host por um intervalo mínimo (atraso de cortesia).
+    """
+
+    def __init__(self, per_host_limit: int, min_interval: float = 0.0):
+        self.per_host_limit = max(1, per_host_limit)
+        self.min_interval = max(0.0, min_interval)
+        self._semaphores: Dict[str, threading.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.Semaphore(self.per_host_limit))
+        semaphore.acquire()
+        try:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+        finally:
+            semaphore.release()
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """
+    Retorna o transporte compartilhado do processo, criando-o na primeira chamada.
+    """
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
@@ -0,0 +1,142 @@
+"""
+Backends de análise da listagem de notícias da Câmara Municipal do Recife.
+Todos extraem apenas os blocos article.news-item, sem montar o DOM do restante da página.
+Os backends lxml e selectolax são opcionais; sem eles usa-se o html.parser do BeautifulSoup.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Dict, Iterator, Optional, Tuple, Type
+from bs4 import BeautifulSoup, SoupStrainer
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ListingParser(ABC):
+    name = ""
+
+    @abstractmethod
+    def iter_articles(self, html: str) -> Iterator[Tuple[str, str]]:
+        """
+        Gera tuplas (título, href) de cada article.news-item, na ordem do documento.
+        O href é devolvido como está no HTML (pode ser relativo).
+        """
+        pass
+
+
+class SoupListingParser(ListingParser):
+    """
+    html.parser do BeautifulSoup com SoupStrainer: só os elementos <article> entram na árvore.
+    """
+    name = "html.parser"
+
+    def iter_articles(self, html: str) -> Iterator[Tuple[str, str]]:
+        # Durante a análise o atributo class ainda é a string crua ("news-item tileItem ...")
+        strainer = SoupStrainer("article", class_=lambda value: bool(value) and "news-item" in value.split())
+        soup = BeautifulSoup(html, "html.parser", parse_only=strainer)
+        for article in soup.find_all("article", class_="news-item"):
+            title_tag = article.select_one("h4.title a")
+            if title_tag:
+                yield title_tag.get_text(strip=True), title_tag.get("href", "")
+
+
+class LxmlListingParser(ListingParser):
+    """
+    lxml em modo iterparse: processa cada <article> ao fechar a tag e descarta o que já foi lido.
+    """
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree
+        self._etree = etree
+
+    @staticmethod
+    def _has_class(elem, cls: str) -> bool:
+        return cls in (elem.get("class") or "").split()
+
+    def iter_articles(self, html: str) -> Iterator[Tuple[str, str]]:
+        data = html.encode("utf-8") if isinstance(html, str) else html
+        context = self._etree.iterparse(BytesIO(data), events=("end",), tag="article", html=True, encoding="utf-8")
+        for _, article in context:
+            if self._has_class(article, "news-item"):
+                for h4 in article.iter("h4"):
+                    if not self._has_class(h4, "title"):
+                        continue
+                    link = next(h4.iter("a"), None)
+                    if link is not None:
+                        title = "".join(text.strip() for text in link.itertext())
+                        yield title, link.get("href", "")
+                        break
+            # Libera o artigo e os irmãos anteriores já processados
+            article.clear()
+            while article.getprevious() is not None:
+                del article.getparent()[0]
+
+
+class SelectolaxListingParser(ListingParser):
+    """
+    selectolax (Modest/Lexbor): parser em C com seletores CSS nativos.
+    O selectolax não filtra durante a análise, então só o trecho do HTML entre o primeiro
+    <article e o último </article> é entregue ao parser; cabeçalho, menus e rodapé ficam de fora.
+    """
+    name = "selectolax"
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser as HTMLParser
+        except ImportError:
+            # Versões antigas (< 0.3) só têm o backend Modest
+            from selectolax.parser import HTMLParser
+        self._parser_cls = HTMLParser
+
+    @staticmethod
+    def _articles_span(html: str) -> str:
+        lowered = html.lower()
+        start = lowered.find("<article")
+        end = lowered.rfind("</article>")
+        if start < 0 or end < start:
+            return ""
+        return html[start:end + len("</article>")]
+
+    def iter_articles(self, html: str) -> Iterator[Tuple[str, str]]:
+        if isinstance(html, bytes):
+            html = html.decode("utf-8", errors="replace")
+        span = self._articles_span(html)
+        if not span:
+            return
+        tree = self._parser_cls(span)
+        for article in tree.css("article.news-item"):
+            link = article.css_first("h4.title a")
+            if link is not None:
+                yield link.text(deep=True, separator="", strip=True), link.attributes.get("href") or ""
+
+
+PARSERS: Dict[str, Type[ListingParser]] = {
+    SelectolaxListingParser.name: SelectolaxListingParser,
+    LxmlListingParser.name: LxmlListingParser,
+    SoupListingParser.name: SoupListingParser,
+}
+
+
+def get_listing_parser(name: Optional[str] = "auto") -> ListingParser:
+    """
+    Instancia o backend pedido. "auto" escolhe o mais rápido disponível;
+    se o backend pedido não estiver instalado, usa html.parser.
+    """
+    name = (name or "auto").lower()
+    candidates = list(PARSERS) if name == "auto" else [name]
+    for candidate in candidates:
+        parser_cls = PARSERS.get(candidate)
+        if parser_cls is None:
+            logger.warning(f"Parser de listagem desconhecido: {candidate}")
+            continue
+        try:
+            return parser_cls()
+        except ImportError:
+            if name != "auto":
+                logger.warning(f"Parser '{candidate}' não instalado; usando html.parser")
+    return SoupListingParser()
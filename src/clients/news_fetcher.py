@@ -8,9 +8,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from abc import ABC, abstractmethod
 from typing import Optional, Tuple
-import requests
 from bs4 import BeautifulSoup
 from config.config import Config
+from clients.http_transport import HttpTransport, get_transport
 
 class NewsFetcher(ABC):
     @abstractmethod
@@ -19,11 +19,12 @@ class NewsFetcher(ABC):
         pass
 
 class RssNewsFetcher(NewsFetcher):
-    def __init__(self, portal_url: str = None):
+    def __init__(self, portal_url: str = None, http: Optional[HttpTransport] = None):
         self.portal_url = portal_url or Config.NEWS_PORTAL_URL
+        self.http = http or get_transport()
 
     def fetch_latest_list(self) -> list:
-        resp = requests.get(self.portal_url, timeout=10)
+        resp = self.http.get(self.portal_url, timeout=10)
         resp.raise_for_status()
         soup = BeautifulSoup(resp.content, "xml")
         items = []
@@ -36,12 +37,13 @@ class RssNewsFetcher(NewsFetcher):
         return items
 
 class HtmlListFetcher(NewsFetcher):
-    def __init__(self, portal_url: str = None, list_selector: str = ".article"):
+    def __init__(self, portal_url: str = None, list_selector: str = ".article", http: Optional[HttpTransport] = None):
         self.portal_url = portal_url or Config.NEWS_PORTAL_URL
         self.list_selector = list_selector
+        self.http = http or get_transport()
 
     def fetch_latest_list(self) -> list:
-        resp = requests.get(self.portal_url, timeout=10)
+        resp = self.http.get(self.portal_url, timeout=10)
         resp.raise_for_status()
         soup = BeautifulSoup(resp.text, "html.parser")
         items = []
@@ -7,10 +7,15 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from abc import ABC, abstractmethod
-from typing import Optional, Tuple, List, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Tuple, List, Dict, Iterable, Iterator
 import requests
+import soupsieve
 from bs4 import BeautifulSoup
 from config.config import Config
+from clients.response_cache import ResponseCache, CachedResponse
+from clients.http_transport import HttpTransport, HostThrottle, get_transport
+from clients.listing_parsers import ListingParser, get_listing_parser
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,59 +26,168 @@ class RecifePortalFetcher:
     Extrai notícias da estrutura HTML específica do portal da Câmara.
     """
     
-    def __init__(self, portal_url: str = None):
+    # Seletores da página de detalhes, em ordem de prioridade
+    DATE_SELECTORS = [
+        ".news-date",
+        ".publication-date",
+        ".date",
+        "time",
+        "[datetime]"
+    ]
+    CONTENT_SELECTORS = [
+        ".news-content",
+        ".article-content",
+        ".summary",
+        ".excerpt"
+    ]
+    
+    _DATE_PATTERNS = [soupsieve.compile(sel) for sel in DATE_SELECTORS]
+    _CONTENT_PATTERNS = [soupsieve.compile(sel) for sel in CONTENT_SELECTORS]
+    # Um único seletor combinado: o documento é percorrido uma só vez
+    _DETAILS_PATTERN = soupsieve.compile(", ".join(DATE_SELECTORS + CONTENT_SELECTORS))
+    
+    def __init__(
+        self,
+        portal_url: str = None,
+        cache: Optional[ResponseCache] = None,
+        http: Optional[HttpTransport] = None,
+        parser: Optional[ListingParser] = None,
+    ):
         self.portal_url = portal_url or Config.NEWS_PORTAL_URL
+        self.http = http or get_transport()
+        self.parser = parser or get_listing_parser(Config.LISTING_PARSER)
+        if cache is None and Config.HTTP_CACHE_ENABLED:
+            cache = ResponseCache(Config.HTTP_CACHE_DIR)
+        self.cache = cache
         
     def fetch_latest_list(self) -> List[Tuple[str, str, str]]:
         """
         Retorna uma lista de tuplas (título, url, autor) das notícias mais recentes.
         Ordem: mais recente primeiro.
+
+        Usa requisição condicional (If-None-Match / If-Modified-Since) quando há
+        resposta em cache; se o portal responder 304, devolve os itens já extraídos
+        sem baixar nem analisar o HTML novamente.
+        """
+        items = list(self.iter_latest_items())
+        logger.info(f"Encontradas {len(items)} notícias no portal da Câmara")
+        return items
+    
+    def iter_latest_items(self) -> Iterator[Tuple[str, str, str]]:
+        """
+        Gera as tuplas (título, url, autor) da listagem à medida que o HTML é analisado,
+        da mais recente para a mais antiga. O consumidor pode interromper a iteração
+        (ex.: ao encontrar uma notícia já armazenada) sem pagar pelo restante da análise.
+        """
+        html, entry = self._fetch_listing_html()
+        if html is None:
+            yield from entry.items
+            return
+        
+        items = []
+        try:
+            for item in self._iter_listing(html):
+                items.append(item)
+                yield item
+        except Exception as e:
+            logger.error(f"Erro inesperado ao processar HTML: {e}")
+            raise RuntimeError(f"Erro ao processar conteúdo do portal: {e}")
+        
+        # Listagem analisada até o fim: os próximos 304 dispensam a análise
+        if entry is not None:
+            entry.items = items
+            entry.body = None
+            self.cache.store(entry)
+    
+    def _fetch_listing_html(self) -> Tuple[Optional[str], Optional[CachedResponse]]:
+        """
+        Baixa a listagem com requisição condicional.
+        Retorna (html, entrada de cache a completar). html é None quando o portal respondeu
+        304 e os itens em cache já estão completos.
         """
         try:
-            resp = requests.get(self.portal_url, timeout=10)
+            cached = self.cache.load(self.portal_url) if self.cache else None
+            headers = cached.conditional_headers() if cached else {}
+
+            resp = self.http.get(self.portal_url, headers=headers, timeout=10)
+            if resp.status_code == 304 and cached is not None:
+                logger.info("Portal não modificado (304); usando a listagem do cache")
+                if cached.items is not None:
+                    return None, cached
+                return cached.body, cached
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
-            
-            items = []
-            
-            # Busca por todas as notícias na estrutura específica da Câmara
-            news_articles = soup.select("article.news-item")
-            
-            for article in news_articles[:20]:  # Limita a 20 notícias
-                try:
-                    # Extrai o título e URL do h4.title > a
-                    title_tag = article.select_one("h4.title a")
-                    title = ""
-                    url = ""
-                    
-                    if title_tag:
-                        title = title_tag.get_text(strip=True)
-                        url = title_tag.get("href", "")
-                        
-                        # Converte URL relativa para absoluta se necessário
-                        if url.startswith("/"):
-                            url = self._make_absolute_url(url)
-                    
-                    # Para o portal da Câmara, não há autor específico nas notícias
-                    # O autor seria "Câmara Municipal do Recife" por padrão
-                    author = "Câmara Municipal do Recife"
-                    
-                    if title and title.strip():
-                        items.append((title.strip(), url, author.strip()))
-                        
-                except Exception as e:
-                    logger.warning(f"Erro ao processar notícia: {e}")
-                    continue
-            
-            logger.info(f"Encontradas {len(items)} notícias no portal da Câmara")
-            return items
             
         except requests.RequestException as e:
             logger.error(f"Erro ao buscar notícias: {e}")
             raise RuntimeError(f"Falha ao conectar com o portal: {e}")
-        except Exception as e:
-            logger.error(f"Erro inesperado ao processar HTML: {e}")
-            raise RuntimeError(f"Erro ao processar conteúdo do portal: {e}")
+        
+        html = resp.text
+        entry = None
+        if self.cache:
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+            if etag or last_modified:
+                # O HTML fica guardado até que a análise chegue ao fim
+                entry = CachedResponse(url=self.portal_url, etag=etag, last_modified=last_modified, body=html)
+                self.cache.store(entry)
+            elif cached is not None:
+                # Servidor deixou de enviar validadores: a entrada antiga não serve mais
+                self.cache.invalidate(self.portal_url)
+        return html, entry
+    
+    def listing_page_url(self, page: int) -> str:
+        """
+        URL da página `page` (0 = mais recente) da paginação da listagem.
+        O portal usa paginação por deslocamento (Plone: ?b_start:int=20).
+        """
+        if page <= 0:
+            return self.portal_url
+        offset = page * Config.NEWS_PORTAL_PAGE_SIZE
+        separator = "&" if "?" in self.portal_url else "?"
+        return f"{self.portal_url}{separator}{Config.NEWS_PORTAL_PAGE_PARAM}={offset}"
+    
+    def fetch_listing_page(self, page: int) -> List[Tuple[str, str, str]]:
+        """
+        Busca uma página do arquivo da listagem. Não usa o cache condicional:
+        páginas antigas são lidas uma única vez durante a carga histórica.
+        """
+        url = self.listing_page_url(page)
+        try:
+            resp = self.http.get(url, timeout=10)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            logger.error(f"Erro ao buscar página {page} da listagem: {e}")
+            raise RuntimeError(f"Falha ao conectar com o portal: {e}")
+        return list(self._iter_listing(resp.text, limit=None))
+    
+    def _iter_listing(self, html: str, limit: Optional[int] = 20) -> Iterator[Tuple[str, str, str]]:
+        """
+        Gera as tuplas (título, url, autor) do HTML da listagem de notícias.
+        """
+        count = 0
+        
+        # Apenas os blocos article.news-item são analisados (ver clients/listing_parsers.py)
+        for title, url in self.parser.iter_articles(html):
+            try:
+                # Converte URL relativa para absoluta se necessário
+                if url.startswith("/"):
+                    url = self._make_absolute_url(url)
+                
+                # Para o portal da Câmara, não há autor específico nas notícias
+                # O autor seria "Câmara Municipal do Recife" por padrão
+                author = "Câmara Municipal do Recife"
+                
+                if not (title and title.strip()):
+                    continue
+                    
+            except Exception as e:
+                logger.warning(f"Erro ao processar notícia: {e}")
+                continue
+            
+            yield title.strip(), url, author.strip()
+            count += 1
+            if limit and count >= limit:  # Por padrão, limita a 20 notícias
+                break
     
     def _make_absolute_url(self, relative_url: str) -> str:
         """
@@ -92,43 +206,69 @@ class RecifePortalFetcher:
         Retorna um dicionário com informações extras se disponíveis.
         """
         try:
-            resp = requests.get(url, timeout=10)
+            resp = self.http.get(url, timeout=10)
             resp.raise_for_status()
             soup = BeautifulSoup(resp.text, "html.parser")
-            
-            details = {}
-            
-            # Busca por data de publicação
-            date_selectors = [
-                ".news-date",
-                ".publication-date", 
-                ".date",
-                "time",
-                "[datetime]"
-            ]
-            
-            for selector in date_selectors:
-                date_elem = soup.select_one(selector)
-                if date_elem:
-                    details["date"] = date_elem.get_text(strip=True)
-                    break
-            
-            # Busca por conteúdo/resumo
-            content_selectors = [
-                ".news-content",
-                ".article-content",
-                ".summary",
-                ".excerpt"
-            ]
-            
-            for selector in content_selectors:
-                content_elem = soup.select_one(selector)
-                if content_elem:
-                    details["content"] = content_elem.get_text(strip=True)[:500]  # Limita a 500 chars
-                    break
-            
-            return details
+            return self._extract_details(soup)
             
         except Exception as e:
             logger.warning(f"Erro ao buscar detalhes da notícia {url}: {e}")
             return {}
+    
+    def fetch_details_many(
+        self,
+        urls: Iterable[str],
+        max_workers: Optional[int] = None,
+        per_host_limit: Optional[int] = None,
+        politeness_delay: Optional[float] = None,
+    ) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """
+        Busca os detalhes de várias notícias em paralelo.
+        Gera tuplas (url, detalhes) à medida que cada página termina, não na ordem de entrada.
+        O número de requisições simultâneas por host e o intervalo mínimo entre elas
+        são limitados para não sobrecarregar o portal.
+        """
+        urls = list(dict.fromkeys(u for u in urls if u))
+        if not urls:
+            return
+        throttle = HostThrottle(
+            per_host_limit or Config.DETAILS_PER_HOST_LIMIT,
+            Config.DETAILS_POLITENESS_DELAY if politeness_delay is None else politeness_delay,
+        )
+
+        def fetch(url: str) -> Dict[str, str]:
+            with throttle.slot(url):
+                return self.fetch_news_details(url)
+
+        workers = min(max_workers or Config.DETAILS_MAX_WORKERS, len(urls))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="news-details") as executor:
+            futures = {executor.submit(fetch, url): url for url in urls}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                # Consumidor interrompeu a iteração: descarta o que ainda não começou
+                for future in futures:
+                    future.cancel()
+    
+    def _extract_details(self, soup: BeautifulSoup) -> Dict[str, str]:
+        """
+        Extrai data e conteúdo em uma única varredura do documento.
+        Respeita a prioridade de DATE_SELECTORS/CONTENT_SELECTORS e, dentro do mesmo
+        seletor, o primeiro elemento na ordem do documento (como select_one).
+        """
+        best = {}
+        for elem in self._DETAILS_PATTERN.select(soup):
+            for key, patterns in (("date", self._DATE_PATTERNS), ("content", self._CONTENT_PATTERNS)):
+                current = best.get(key, (len(patterns), None))[0]
+                for priority, pattern in enumerate(patterns[:current]):
+                    if pattern.match(elem):
+                        best[key] = (priority, elem)
+                        break
+        
+        details = {}
+        if "date" in best:
+            details["date"] = best["date"][1].get_text(strip=True)
+        if "content" in best:
+            details["content"] = best["content"][1].get_text(strip=True)[:500]  # Limita a 500 chars
+        return details
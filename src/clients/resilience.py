@@ -0,0 +1,150 @@
+"""
+Primitivas de resiliência para clientes externos: limitador token bucket e circuit breaker.
+Ambas são seguras entre threads e expõem um snapshot do estado para monitoramento.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RateLimitExceeded(RuntimeError):
+    """Sem orçamento de requisições disponível dentro do tempo de espera permitido."""
+
+
+class CircuitOpenError(RuntimeError):
+    """O circuito está aberto: o serviço remoto é considerado indisponível."""
+
+
+class TokenBucket:
+    """
+    Reabastece `rate` tokens por segundo até `capacity` (tamanho máximo de rajada).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0, timeout: float = 0.0) -> bool:
+        """
+        Consome `tokens`, esperando no máximo `timeout` segundos pelo reabastecimento.
+        Retorna False (sem consumir) se o orçamento não ficar disponível a tempo.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate if self.rate > 0 else float("inf")
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "available": round(self.available(), 2),
+            "capacity": self.capacity,
+            "rate_per_minute": round(self.rate * 60, 2),
+        }
+
+
+class CircuitBreaker:
+    """
+    closed -> open após `failure_threshold` falhas consecutivas;
+    open -> half_open depois de `reset_timeout` segundos, liberando uma única requisição de teste;
+    half_open -> closed no sucesso do teste, ou de volta a open na falha.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def reserve(self) -> Optional[str]:
+        """
+        Como allow_request, mas informa o que foi reservado: CLOSED (requisição normal),
+        HALF_OPEN (a requisição de teste) ou None (negada).
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == self.CLOSED:
+                return self.CLOSED
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return self.HALF_OPEN
+            return None
+
+    def allow_request(self) -> bool:
+        return self.reserve() is not None
+
+    def cancel(self, reservation: Optional[str]):
+        """
+        Desfaz uma reserva cuja requisição não chegou a ser enviada (ex.: sem orçamento no
+        limitador): a requisição de teste do half-open volta a ficar disponível.
+        """
+        if reservation != self.HALF_OPEN:
+            return
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (now - self._opened_at)), 2)
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "retry_in_seconds": retry_in,
+            }
@@ -0,0 +1,105 @@
+"""
+Cache em disco de respostas HTTP para requisições condicionais (ETag / Last-Modified).
+Guarda, por URL, os validadores da última resposta e os itens já extraídos dela
+(ou o HTML, enquanto a análise não tiver sido concluída), permitindo reaproveitar
+o resultado quando o servidor responde 304 Not Modified.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import hashlib
+import json
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # Itens extraídos da resposta; None enquanto a listagem não foi analisada até o fim
+    items: Optional[List[Tuple[str, ...]]] = None
+    body: Optional[str] = None
+
+    @property
+    def usable(self) -> bool:
+        return self.items is not None or self.body is not None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """
+        Cabeçalhos para revalidar a resposta em cache junto ao servidor.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Armazena um arquivo JSON por URL no diretório informado.
+    Falhas de leitura/escrita nunca interrompem a busca: o cache é apenas uma otimização.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path_for(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load(self, url: str) -> Optional[CachedResponse]:
+        path = self._path_for(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de resposta ilegível para {url}: {e}")
+            return None
+        if data.get("url") != url:
+            return None
+        items = data.get("items")
+        entry = CachedResponse(
+            url=url,
+            etag=data.get("etag"),
+            last_modified=data.get("last_modified"),
+            items=[tuple(item) for item in items] if items is not None else None,
+            body=data.get("body"),
+        )
+        return entry if entry.usable else None
+
+    def store(self, entry: CachedResponse) -> None:
+        """
+        Grava a entrada de forma atômica (arquivo temporário + rename).
+        """
+        data = {
+            "url": entry.url,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "items": [list(item) for item in entry.items] if entry.items is not None else None,
+            "body": entry.body,
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, ensure_ascii=False)
+            os.replace(tmp_path, self._path_for(entry.url))
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar cache de resposta para {entry.url}: {e}")
+
+    def invalidate(self, url: str) -> None:
+        try:
+            os.remove(self._path_for(url))
+        except FileNotFoundError:
+            pass
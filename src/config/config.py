@@ -1,5 +1,7 @@
 import os
 import logging
+import multiprocessing
+import tempfile
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente do arquivo .env
@@ -15,26 +17,167 @@ class Config:
     # CONFIGURAÇÕES DO BANCO DE DADOS
     # =============================================================================
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./news.db")
+    # Pool de conexões compartilhado pelas threads (requisições, agendador, worker do outbox)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # external_response é gravado como JSON e comprimido (zlib) a partir deste tamanho; 0 = nunca
+    EXTERNAL_RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("EXTERNAL_RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+    # Perfil de armazenamento: "tuned" (PRAGMAs abaixo no SQLite, pre-ping/timeout no Postgres) ou "default"
+    DB_PROFILE = os.getenv("DB_PROFILE", "tuned")
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negativo = KiB (64 MiB)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # Postgres; 0 = sem limite
     
     # =============================================================================
     # CONFIGURAÇÕES DO PORTAL DE NOTÍCIAS
     # =============================================================================
     NEWS_PORTAL_URL = os.getenv("NEWS_PORTAL_URL", "https://www.recife.pe.leg.br/comunicacao/noticias")
+    # Cache em disco da listagem (requisições condicionais com ETag/Last-Modified)
+    HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "./.cache/http")
+    # Paginação da listagem (parâmetro de deslocamento e itens por página)
+    NEWS_PORTAL_PAGE_PARAM = os.getenv("NEWS_PORTAL_PAGE_PARAM", "b_start:int")
+    NEWS_PORTAL_PAGE_SIZE = int(os.getenv("NEWS_PORTAL_PAGE_SIZE", "20"))
+    # Carga histórica (backfill) do arquivo de notícias
+    BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "200"))
+    BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "4"))
+    BACKFILL_CHECKPOINT_PATH = os.getenv("BACKFILL_CHECKPOINT_PATH", "./.cache/backfill_checkpoint.json")
+    # Máximo de notícias novas processadas por execução incremental
+    INGEST_MAX_NEW_ITEMS = int(os.getenv("INGEST_MAX_NEW_ITEMS", "20"))
+    # Pipeline de processamento (fetch -> dedupe -> order -> reformulate -> persist -> deliver):
+    # tamanho das filas entre as etapas e threads por etapa (na reformulação, lotes de
+    # GEMINI_BATCH_SIZE títulos enviados ao mesmo tempo); espera máxima, em segundos, para
+    # completar um lote antes de processá-lo incompleto
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+    PIPELINE_DEDUPE_WORKERS = int(os.getenv("PIPELINE_DEDUPE_WORKERS", "2"))
+    PIPELINE_REFORMULATE_WORKERS = int(os.getenv("PIPELINE_REFORMULATE_WORKERS", "4"))
+    PIPELINE_DELIVER_WORKERS = int(os.getenv("PIPELINE_DELIVER_WORKERS", "4"))
+    PIPELINE_BATCH_WAIT = float(os.getenv("PIPELINE_BATCH_WAIT", "0.5"))
+    # Backend de análise da listagem: auto, selectolax, lxml ou html.parser
+    LISTING_PARSER = os.getenv("LISTING_PARSER", "auto")
+    # Busca paralela das páginas de detalhes
+    DETAILS_MAX_WORKERS = int(os.getenv("DETAILS_MAX_WORKERS", "8"))
+    DETAILS_PER_HOST_LIMIT = int(os.getenv("DETAILS_PER_HOST_LIMIT", "4"))
+    DETAILS_POLITENESS_DELAY = float(os.getenv("DETAILS_POLITENESS_DELAY", "0.2"))
+    
+    # =============================================================================
+    # CONFIGURAÇÕES DO TRANSPORTE HTTP
+    # =============================================================================
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+    HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+    HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
     
     # =============================================================================
     # CONFIGURAÇÕES DE APIs EXTERNAS
     # =============================================================================
     EXTERNAL_API_URL = os.getenv("EXTERNAL_API_URL")
+    # Novas tentativas do transporte por envio (só com chave de idempotência; o outbox já repete)
+    EXTERNAL_MAX_RETRIES = int(os.getenv("EXTERNAL_MAX_RETRIES", "1"))
+    # Entrega assíncrona via outbox: envios simultâneos, lote por varredura, intervalo entre
+    # varreduras (s), tentativas antes de desistir, backoff (s) e reserva de uma mensagem em envio (s)
+    OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "5"))
+    OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+    OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
     
     # =============================================================================
     # CONFIGURAÇÕES DE IA (GEMINI)
     # =============================================================================
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    # Tempo máximo por chamada e novas tentativas (cada uma consome um token do limitador)
+    GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "8"))
+    GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "1"))
+    # Limitador token bucket (cota de requisições) e circuit breaker
+    GEMINI_RATE_LIMIT_PER_MINUTE = float(os.getenv("GEMINI_RATE_LIMIT_PER_MINUTE", "15"))
+    GEMINI_RATE_LIMIT_BURST = float(os.getenv("GEMINI_RATE_LIMIT_BURST", "5"))
+    GEMINI_RATE_LIMIT_MAX_WAIT = float(os.getenv("GEMINI_RATE_LIMIT_MAX_WAIT", "2"))
+    GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "3"))
+    GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "60"))
+    # Títulos enviados por chamada em reformulate_many
+    GEMINI_BATCH_SIZE = int(os.getenv("GEMINI_BATCH_SIZE", "10"))
+    # Cache persistente das perguntas geradas (0 em GEMINI_CACHE_TTL_SECONDS = sem expiração)
+    GEMINI_CACHE_ENABLED = os.getenv("GEMINI_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    GEMINI_CACHE_PATH = os.getenv("GEMINI_CACHE_PATH", "./.cache/gemini_cache.sqlite3")
+    GEMINI_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "10000"))
+    GEMINI_CACHE_TTL_SECONDS = float(os.getenv("GEMINI_CACHE_TTL_SECONDS", "0"))
+    
+    # =============================================================================
+    # CONFIGURAÇÕES DA API
+    # =============================================================================
+    # Itens por página em GET /api/news/ (padrão e máximo aceito em ?limit=)
+    NEWS_PAGE_SIZE = int(os.getenv("NEWS_PAGE_SIZE", "100"))
+    NEWS_PAGE_MAX_SIZE = int(os.getenv("NEWS_PAGE_MAX_SIZE", "500"))
+    # Cache de respostas das leituras (ETag + LRU em memória); a versão da tabela é relida
+    # do banco no máximo a cada RESPONSE_CACHE_VERSION_TTL segundos
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+    RESPONSE_CACHE_VERSION_TTL = float(os.getenv("RESPONSE_CACHE_VERSION_TTL", "1.0"))
+    # Compressão das leituras negociada por Accept-Encoding (br só com o pacote brotli),
+    # aplicada a corpos a partir de RESPONSE_COMPRESS_MIN_BYTES
+    RESPONSE_COMPRESSION_ENABLED = os.getenv("RESPONSE_COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+    RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+    RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+    # Busca textual (GET /api/news/search): resultados por página (padrão e máximo)
+    SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+    SEARCH_PAGE_MAX_SIZE = int(os.getenv("SEARCH_PAGE_MAX_SIZE", "100"))
+    # Exportação (GET /api/news/export): linhas lidas do banco e enviadas por vez
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    # Importação em lote (POST /api/news/bulk): registros por gravação, erros detalhados na
+    # resposta e tamanho máximo de cada registro
+    BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+    BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "100"))
+    BULK_MAX_RECORD_BYTES = int(os.getenv("BULK_MAX_RECORD_BYTES", str(1024 * 1024)))
+    # Processamentos disparados pela API (POST /api/system/trigger): jobs simultâneos
+    # e quantos jobs terminados ficam consultáveis em /api/system/jobs/<id>
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))
+    # Estado dos jobs no banco, compartilhado pelos workers: prazo da reserva de um job em
+    # execução (renovada pelo processo que o roda) e intervalo de consulta de quem aguarda
+    # um job de outro processo (segundos)
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
     
     # =============================================================================
     # CONFIGURAÇÕES DO AGENDADOR
     # =============================================================================
     SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE", "America/Sao_Paulo")
+    # Coleta com intervalo adaptativo (segundos): volta ao mínimo quando encontra notícias
+    # novas e multiplica pelo fator (até o máximo) quando o portal não mudou; jitter é a
+    # variação aleatória (fração do intervalo) e as horas de silêncio ("22:00-06:00") adiam a coleta
+    SCHEDULER_POLL_MIN_INTERVAL = float(os.getenv("SCHEDULER_POLL_MIN_INTERVAL", "300"))
+    SCHEDULER_POLL_MAX_INTERVAL = float(os.getenv("SCHEDULER_POLL_MAX_INTERVAL", "21600"))
+    SCHEDULER_POLL_BACKOFF_FACTOR = float(os.getenv("SCHEDULER_POLL_BACKOFF_FACTOR", "2.0"))
+    SCHEDULER_POLL_JITTER = float(os.getenv("SCHEDULER_POLL_JITTER", "0.1"))
+    SCHEDULER_QUIET_HOURS = os.getenv("SCHEDULER_QUIET_HOURS", "")
+    # Job store persistente (padrão: o próprio banco da aplicação) e atraso máximo, em
+    # segundos, para ainda rodar uma coleta perdida (0 = sem limite)
+    SCHEDULER_JOBSTORE_URL = os.getenv("SCHEDULER_JOBSTORE_URL", "")
+    SCHEDULER_MISFIRE_GRACE_SECONDS = int(os.getenv("SCHEDULER_MISFIRE_GRACE_SECONDS", "0"))
+    # Arquivo de lock da eleição do líder: com vários workers (gunicorn), só o processo que
+    # obtiver o lock roda o agendador e o worker do outbox
+    SCHEDULER_LEADER_LOCK_FILE = os.getenv(
+        "SCHEDULER_LEADER_LOCK_FILE", os.path.join(tempfile.gettempdir(), "leitura_portal_scheduler.lock")
+    )
+    
+    # =============================================================================
+    # CONFIGURAÇÕES DO SERVIDOR DE PRODUÇÃO (gunicorn.conf.py)
+    # =============================================================================
+    # Processos (padrão: 2 x núcleos + 1), threads por processo e timeout de requisição
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0")) or multiprocessing.cpu_count() * 2 + 1
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "4"))
+    WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "60"))
     
     # =============================================================================
     # CONFIGURAÇÕES DE DESENVOLVIMENTO
@@ -2,14 +2,137 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker, declarative_base, scoped_session
+from sqlalchemy.pool import QueuePool, StaticPool
 from config.config import Config
 
-engine = create_engine(Config.DATABASE_URL, connect_args={"check_same_thread": False})
+PROFILES = ("tuned", "default")
+
+
+def normalize_database_url(url: str) -> str:
+    """
+    Aceita o esquema postgres:// (Heroku, Render...), que o SQLAlchemy 1.4 não reconhece.
+    """
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    """
+    PRAGMAs do perfil SQLite ajustado; valores vazios na configuração são omitidos.
+    WAL permite leituras concorrentes com uma escrita, e synchronous=NORMAL em WAL
+    só sincroniza o disco nos checkpoints, não a cada commit.
+    """
+    pragmas = {
+        "journal_mode": Config.SQLITE_JOURNAL_MODE,
+        "synchronous": Config.SQLITE_SYNCHRONOUS,
+        "mmap_size": Config.SQLITE_MMAP_SIZE,
+        "cache_size": Config.SQLITE_CACHE_SIZE,
+        "busy_timeout": Config.SQLITE_BUSY_TIMEOUT_MS,
+        "foreign_keys": "ON",
+    }
+    return {name: str(value) for name, value in pragmas.items() if str(value).strip()}
+
+
+def _engine_kwargs(url: str, profile: str) -> dict:
+    """
+    Pool de conexões dimensionado pela configuração.
+    SQLite em arquivo também usa QueuePool (o padrão do SQLAlchemy 1.4 abre uma conexão por sessão).
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        kwargs = {"connect_args": {"check_same_thread": False}}
+        if make_url(url).database in (None, "", ":memory:"):
+            # Banco em memória só existe dentro de uma conexão: todas as threads compartilham a mesma
+            kwargs["poolclass"] = StaticPool
+            return kwargs
+        kwargs["poolclass"] = QueuePool
+    else:
+        kwargs = {"pool_recycle": Config.DB_POOL_RECYCLE}
+        if profile == "tuned":
+            kwargs["pool_pre_ping"] = Config.DB_POOL_PRE_PING
+            if make_url(url).get_backend_name() == "postgresql" and Config.DB_STATEMENT_TIMEOUT_MS > 0:
+                # Limite por comando aplicado pelo servidor a cada conexão do pool (libpq/psycopg2)
+                kwargs["connect_args"] = {"options": f"-c statement_timeout={Config.DB_STATEMENT_TIMEOUT_MS}"}
+    kwargs.update(
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+    )
+    return kwargs
+
+
+def create_db_engine(url: Optional[str] = None, profile: Optional[str] = None) -> Engine:
+    """
+    Cria o engine para DATABASE_URL com o perfil de armazenamento escolhido pelo banco:
+    SQLite recebe os PRAGMAs de sqlite_pragmas() em cada nova conexão; Postgres recebe
+    pre-ping e statement_timeout. O perfil "default" usa apenas os padrões do driver.
+    """
+    url = normalize_database_url(url or Config.DATABASE_URL)
+    profile = profile or Config.DB_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"DB_PROFILE inválido: {profile} (use {', '.join(PROFILES)})")
+
+    db_engine = create_engine(url, **_engine_kwargs(url, profile))
+    if db_engine.dialect.name == "sqlite":
+
+        @event.listens_for(db_engine, "connect")
+        def begin_writes_immediately(dbapi_connection, connection_record):
+            # O sqlite3 abre a transação só antes do primeiro INSERT/UPDATE/DELETE; com IMMEDIATE
+            # ela já nasce com a trava de escrita, obtida respeitando o busy_timeout. No modo
+            # DEFERRED, um INSERT em news_items lê a configuração do FTS5 antes de travar e
+            # recebe "database is locked" na hora se outra conexão estiver escrevendo.
+            dbapi_connection.isolation_level = "IMMEDIATE"
+    if profile == "tuned" and db_engine.dialect.name == "sqlite":
+        pragmas = sqlite_pragmas()
+
+        @event.listens_for(db_engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+    return db_engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Uma sessão por thread (requisição Flask, job do agendador, worker); removida ao fim de cada escopo
+ScopedSession = scoped_session(SessionLocal)
 Base = declarative_base()
 
 def init_db():
     import models.models  # ensure models are registered
+    from core.search_index import ensure_search_index
+    from core.table_version import ensure_table_version, news_version
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        ensure_search_index(connection)
+        ensure_table_version(connection)
+    news_version.invalidate()
+
+@contextmanager
+def session_scope():
+    """
+    Escopo de sessão para código fora de uma requisição (jobs, threads, scripts):
+    a sessão da thread atual é descartada ao sair, devolvendo a conexão ao pool.
+    """
+    try:
+        yield ScopedSession()
+    finally:
+        ScopedSession.remove()
+
+def with_session_scope(func):
+    """
+    Decorador equivalente a session_scope() para funções executadas pelo agendador.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with session_scope():
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,122 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy.exc import IntegrityError
+from core.db import SessionLocal
+from models.models import JobRecord
+from utils.utils import utcnow
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_ERROR = "Processo que executava o job parou de renovar a reserva"
+
+
+class JobRepository:
+    """
+    Estado dos jobs em segundo plano na tabela background_jobs, compartilhada pelos workers.
+    Cada operação usa uma sessão própria e curta: as chamadas vêm de threads de requisição
+    e de jobs, que não devem ter a sua transação confirmada ou desfeita por aqui.
+    """
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+
+    def create(self, job_id: str, name: str, status: str, created_at: datetime, lease_until: datetime) -> bool:
+        """
+        Registra o job como o ativo do seu nome. Retorna False se outro job ativo com o
+        mesmo nome já existe (o índice único de active_name rejeita a inserção).
+        """
+        self.release_expired(name)
+        with self._session_factory() as session:
+            session.add(JobRecord(
+                id=job_id, name=name, active_name=name, status=status,
+                created_at=created_at, lease_until=lease_until, attached=0,
+            ))
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                return False
+        return True
+
+    def attach(self, name: str) -> Optional[JobRecord]:
+        """
+        Conta um disparo anexado ao job ativo `name` e o retorna (None se nenhum estiver ativo).
+        """
+        with self._session_factory(expire_on_commit=False) as session:
+            updated = (
+                session.query(JobRecord)
+                .filter(JobRecord.active_name == name)
+                .update({JobRecord.attached: JobRecord.attached + 1}, synchronize_session=False)
+            )
+            session.commit()
+            if not updated:
+                return None
+            return session.query(JobRecord).filter(JobRecord.active_name == name).first()
+
+    def save(self, job_id: str, values: Dict[str, Any], release: bool = False):
+        """
+        Grava o andamento do job; com `release`, ele deixa de ser o ativo do seu nome.
+        """
+        if release:
+            values = dict(values, active_name=None, lease_until=None)
+        with self._session_factory() as session:
+            session.query(JobRecord).filter(JobRecord.id == job_id).update(values, synchronize_session=False)
+            session.commit()
+
+    def renew(self, stages_by_id: Dict[str, Dict[str, float]], lease_until: datetime):
+        """
+        Estende a reserva dos jobs ainda ativos deste processo e grava as etapas já medidas.
+        """
+        if not stages_by_id:
+            return
+        with self._session_factory() as session:
+            for job_id, stages in stages_by_id.items():
+                (
+                    session.query(JobRecord)
+                    .filter(JobRecord.id == job_id, JobRecord.active_name.isnot(None))
+                    .update({"lease_until": lease_until, "stages": stages}, synchronize_session=False)
+                )
+            session.commit()
+
+    def release_expired(self, name: Optional[str] = None) -> int:
+        """
+        Marca como falhos os jobs ativos cuja reserva venceu (o processo que os rodava
+        terminou sem concluí-los), liberando o nome para um novo job.
+        """
+        now = utcnow()
+        with self._session_factory() as session:
+            query = session.query(JobRecord).filter(JobRecord.active_name.isnot(None), JobRecord.lease_until < now)
+            if name is not None:
+                query = query.filter(JobRecord.active_name == name)
+            released = query.update(
+                {"active_name": None, "lease_until": None, "status": JobRecord.FAILED, "error": EXPIRED_ERROR, "finished_at": now},
+                synchronize_session=False,
+            )
+            session.commit()
+        if released:
+            logger.warning("%d job(s) abandonado(s) marcado(s) como falho(s)", released)
+        return released
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        with self._session_factory(expire_on_commit=False) as session:
+            return session.query(JobRecord).filter(JobRecord.id == job_id).first()
+
+    def prune(self, keep: int):
+        """
+        Mantém só os `keep` jobs terminados mais recentes; os ativos nunca são removidos.
+        """
+        with self._session_factory() as session:
+            old_ids = [
+                job_id for (job_id,) in session.query(JobRecord.id)
+                .filter(JobRecord.active_name.is_(None), JobRecord.finished_at.isnot(None))
+                .order_by(JobRecord.finished_at.desc(), JobRecord.created_at.desc())
+                .offset(keep)
+                .all()
+            ]
+            if old_ids:
+                session.query(JobRecord).filter(JobRecord.id.in_(old_ids)).delete(synchronize_session=False)
+                session.commit()
@@ -0,0 +1,66 @@
+"""
+Eleição do processo líder entre os workers do servidor (gunicorn): só o líder roda o
+agendador e o worker do outbox, para que o job semanal não dispare uma vez por worker.
+
+A liderança é um lock exclusivo (flock) sobre um arquivo, mantido enquanto o processo
+viver. Se o líder morrer, o sistema operacional libera o lock e o próximo worker a
+iniciar (o substituto criado pelo gunicorn) assume. Todos os workers precisam ver o
+mesmo arquivo, ou seja, rodar na mesma máquina.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from typing import Optional
+from config.config import Config
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    # Sem flock (Windows): um único processo, que é sempre o líder
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or Config.SCHEDULER_LEADER_LOCK_FILE
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """
+        Tenta obter a liderança sem bloquear. Retorna True se este processo é o líder.
+        """
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            self._file = True
+            return True
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Registra o pid do líder, útil para diagnóstico
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        self._file = lock_file
+        logger.info("Processo %d assumiu a liderança (%s)", os.getpid(), self.path)
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+        self._file = None
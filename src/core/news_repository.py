@@ -2,35 +2,406 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from core.db import SessionLocal
-from models.models import NewsItem
-from typing import List, Optional
+from core.db import ScopedSession
+from sqlalchemy import and_, case, insert, or_, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, load_only
+from models.models import NewsItem, OutboxMessage
+from core.search_index import FTS_TABLE, PG_DOCUMENT, PG_TS_CONFIG, fts5_query
+from core.table_version import bump_table_version
+from utils.utils import normalize_url, title_hash, utcnow
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import json
+
+# Linhas por comando em upsert_many (limite de variáveis por comando do SQLite)
+UPSERT_CHUNK_SIZE = 500
+
+
+def news_row(
+    source_title: str,
+    source_url: Optional[str] = None,
+    author: Optional[str] = None,
+    question_title: Optional[str] = None,
+    **_ignored,
+) -> Dict[str, Any]:
+    """
+    Linha completa de news_items, com as chaves de unicidade calculadas.
+    """
+    return {
+        "source_title": source_title,
+        "source_url": source_url,
+        "author": author,
+        "question_title": question_title,
+        "url_key": normalize_url(source_url),
+        "title_hash": title_hash(source_title),
+    }
+
+def _as_utc(value: datetime) -> datetime:
+    """
+    fetched_at é gravado pelo banco em UTC; datas com fuso são convertidas antes da comparação.
+    """
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _apply_filters(query, author: Optional[str], fetched_from: Optional[datetime], fetched_to: Optional[datetime]):
+    if author is not None:
+        query = query.filter(NewsItem.author == author)
+    if fetched_from is not None:
+        query = query.filter(NewsItem.fetched_at >= _as_utc(fetched_from))
+    if fetched_to is not None:
+        query = query.filter(NewsItem.fetched_at < _as_utc(fetched_to))
+    return query
+
 
 class NewsRepository:
-    def __init__(self):
-        self._session = SessionLocal()
+    """
+    Sem estado próprio: cada chamada usa a sessão da thread atual (ScopedSession),
+    então uma única instância pode ser compartilhada entre threads. A sessão é
+    descartada ao fim da requisição (teardown do Flask) ou do job (session_scope).
+    Uma sessão explícita pode ser passada para agrupar operações na mesma transação.
+    """
+    def __init__(self, session: Optional[Session] = None):
+        self._explicit_session = session
+
+    @property
+    def _session(self) -> Session:
+        return self._explicit_session if self._explicit_session is not None else ScopedSession()
 
     def create(self, source_title: str, source_url: Optional[str] = None, author: Optional[str] = None) -> NewsItem:
-        item = NewsItem(source_title=source_title, source_url=source_url, author=author)
+        """
+        Cria a notícia. Levanta IntegrityError se a URL (normalizada) já estiver armazenada.
+        """
+        item = NewsItem(**news_row(source_title, source_url, author))
         self._session.add(item)
-        self._session.commit()
+        bump_table_version(self._session)
+        try:
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
         self._session.refresh(item)
         return item
 
-    def get(self, item_id: int) -> Optional[NewsItem]:
-        return self._session.query(NewsItem).filter(NewsItem.id == item_id).first()
+    def _dialect(self) -> str:
+        return self._session.get_bind().dialect.name
+
+    def _insert_ignoring_duplicates(self):
+        """
+        INSERT ... ON CONFLICT (url_key) DO NOTHING no dialeto do banco em uso,
+        ou None nos bancos sem essa sintaxe (veja _insert_or_skip).
+        """
+        dialect = self._dialect()
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            return None
+        return dialect_insert(NewsItem).on_conflict_do_nothing(index_elements=["url_key"])
+
+    def _insert_or_skip(self, row: Dict[str, Any]) -> Optional[int]:
+        """
+        Caminho portátil: insere uma linha em um SAVEPOINT e retorna o id, ou None se o
+        índice único rejeitar a URL; o restante da transação não é afetado.
+        """
+        try:
+            with self._session.begin_nested():
+                result = self._session.execute(insert(NewsItem).values(**row))
+        except IntegrityError:
+            return None
+        return result.inserted_primary_key[0]
+
+    def insert_if_absent(
+        self,
+        source_title: str,
+        source_url: Optional[str] = None,
+        author: Optional[str] = None,
+        question_title: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Insere a notícia já completa, sem commit, e retorna o id; ou None se a URL já existir.
+        A verificação de duplicata é o próprio INSERT (índice único em url_key).
+        Usado dentro de um UnitOfWork, que faz o commit único da operação.
+        """
+        row = news_row(source_title, source_url, author, question_title)
+        statement = self._insert_ignoring_duplicates()
+        if statement is None:
+            news_id = self._insert_or_skip(row)
+        else:
+            result = self._session.execute(statement.values(**row))
+            # rowcount (e não lastrowid) indica se a linha foi mesmo inserida
+            news_id = result.inserted_primary_key[0] if result.rowcount == 1 else None
+        if news_id is None:
+            return None
+        bump_table_version(self._session)
+        return news_id
+
+    def list_without_question(self, limit: int) -> List[Any]:
+        """
+        Linhas (id, source_title, source_url, author) ainda sem pergunta (ex.: gravadas pelo
+        backfill), da mais antiga para a mais recente.
+        """
+        return (
+            self._row_query(["id", "source_title", "source_url", "author"])
+            .filter(NewsItem.question_title.is_(None))
+            .order_by(NewsItem.id.asc())
+            .limit(limit)
+            .all()
+        )
+
+    def count_without_question(self) -> int:
+        return self._session.query(NewsItem.id).filter(NewsItem.question_title.is_(None)).count()
+
+    def set_question_title(self, news_id: int, question_title: str) -> bool:
+        """
+        Grava a pergunta de uma notícia que ainda não tinha, sem commit (uso em UnitOfWork).
+        Retorna False se outra execução já gravou a pergunta.
+        """
+        updated = (
+            self._session.query(NewsItem)
+            .filter(NewsItem.id == news_id)
+            .filter(NewsItem.question_title.is_(None))
+            .update({"question_title": question_title}, synchronize_session=False)
+        )
+        if updated:
+            bump_table_version(self._session)
+        return bool(updated)
+
+    def enqueue_delivery(self, news_id: int, payload: Dict[str, Any]) -> OutboxMessage:
+        """
+        Adiciona a mensagem de entrega ao outbox na transação corrente (sem commit):
+        ela só fica visível para o OutboxDeliveryWorker junto com a notícia.
+        """
+        message = OutboxMessage(
+            news_id=news_id,
+            payload=json.dumps(payload, ensure_ascii=False),
+            status=OutboxMessage.PENDING,
+            attempts=0,
+            next_attempt_at=utcnow(),
+        )
+        self._session.add(message)
+        self._session.flush()
+        return message
+
+    def create_many(self, rows: Iterable[Dict]) -> int:
+        """
+        Insere vários itens em uma única transação (um commit para o lote inteiro).
+        Cada linha é um dict com source_title e, opcionalmente, source_url, author e question_title.
+        Levanta IntegrityError se alguma URL já existir; veja upsert_many.
+        """
+        rows = [news_row(**row) for row in rows]
+        if not rows:
+            return 0
+        self._session.bulk_insert_mappings(NewsItem, rows)
+        bump_table_version(self._session)
+        self._session.commit()
+        return len(rows)
+
+    def upsert_many(self, rows: Iterable[Dict]) -> int:
+        """
+        Insere os itens ignorando os que já existem (mesma URL normalizada), com
+        INSERT ... ON CONFLICT DO NOTHING em SQLite e Postgres (nos demais bancos, linha
+        a linha com _insert_or_skip), e um único commit.
+        Retorna quantas linhas foram de fato inseridas.
+        """
+        rows = [news_row(**row) for row in rows]
+        statement = self._insert_ignoring_duplicates()
+        if statement is None:
+            inserted = sum(1 for row in rows if self._insert_or_skip(row) is not None)
+        else:
+            inserted = 0
+            for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+                result = self._session.execute(statement.values(chunk))
+                inserted += result.rowcount
+        if inserted:
+            bump_table_version(self._session)
+        if rows:
+            self._session.commit()
+        return inserted
+
+    def _query(self, fields: Optional[Sequence[str]] = None):
+        """
+        Consulta de NewsItem carregando só as colunas pedidas (o id sempre vem).
+        Sem `fields`, external_response fica adiado e só é lido se acessado.
+        """
+        query = self._session.query(NewsItem)
+        if fields:
+            query = query.options(load_only(*[getattr(NewsItem, name) for name in fields]))
+        return query
+
+    def _row_query(self, fields: Sequence[str]):
+        """
+        Consulta de linhas (tuplas nomeadas) só com as colunas pedidas: sem instanciar
+        NewsItem nem registrar objetos na sessão, o que barateia as leituras só para exibição.
+        """
+        return self._session.query(*[getattr(NewsItem, name) for name in fields])
+
+    def get(self, item_id: int, fields: Optional[Sequence[str]] = None) -> Optional[NewsItem]:
+        return self._query(fields).filter(NewsItem.id == item_id).first()
+
+    def get_row(self, item_id: int, fields: Sequence[str]) -> Optional[Any]:
+        """
+        Como get, mas retorna a linha com as colunas pedidas (veja _row_query).
+        """
+        return self._row_query(fields).filter(NewsItem.id == item_id).first()
+
+    def get_by_source_url(self, source_url: str) -> Optional[NewsItem]:
+        """
+        Busca pela URL de origem normalizada (índice único em url_key).
+        """
+        return self._session.query(NewsItem).filter(NewsItem.url_key == normalize_url(source_url)).first()
+
+    def get_by_source_title(self, source_title: str) -> Optional[NewsItem]:
+        """
+        Busca pelo hash do título normalizado (coluna indexada).
+        """
+        return self._session.query(NewsItem).filter(NewsItem.title_hash == title_hash(source_title)).first()
+
+    def list(
+        self,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        author: Optional[str] = None,
+        fetched_from: Optional[datetime] = None,
+        fetched_to: Optional[datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[NewsItem]:
+        """
+        Página de notícias, da mais recente para a mais antiga, ordenada por (fetched_at, id).
+        Paginação por cursor (keyset): `after_id` é o último id da página anterior e a
+        consulta continua logo depois de (fetched_at, id) dessa notícia, sem OFFSET.
+        A ordem é a dos índices compostos (author, fetched_at, id) e (fetched_at, id), que
+        também atendem aos filtros: cada página é uma leitura de intervalo do índice, sem
+        ordenação, então o custo não cresce com a profundidade da página nem com o número
+        de notícias do autor. O intervalo de datas é [from, to).
+        `fields` limita as colunas lidas (veja _query).
+        """
+        return self._page(self._query(fields), limit, after_id, author, fetched_from, fetched_to)
+
+    def list_rows(
+        self,
+        fields: Sequence[str],
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        author: Optional[str] = None,
+        fetched_from: Optional[datetime] = None,
+        fetched_to: Optional[datetime] = None,
+    ) -> List[Any]:
+        """
+        Mesma página de list, como linhas só com as colunas pedidas (veja _row_query).
+        O id é sempre incluído, pois é o cursor da próxima página.
+        """
+        if "id" not in fields:
+            fields = ["id", *fields]
+        return self._page(self._row_query(fields), limit, after_id, author, fetched_from, fetched_to)
+
+    @staticmethod
+    def _page(query, limit, after_id, author, fetched_from, fetched_to) -> List[Any]:
+        query = _apply_filters(query, author, fetched_from, fetched_to)
+        if after_id is not None:
+            # fetched_at da notícia do cursor (ou, se ela foi removida, da anterior a ela), como
+            # subconsulta: o valor é comparado no banco, no formato em que foi gravado
+            cursor_at = (
+                query.session.query(NewsItem.fetched_at)
+                .filter(NewsItem.id <= after_id)
+                .order_by(NewsItem.id.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
+            # O primeiro termo, redundante, é o limite da leitura de intervalo no índice
+            query = query.filter(NewsItem.fetched_at <= cursor_at, or_(
+                NewsItem.fetched_at < cursor_at,
+                and_(NewsItem.fetched_at == cursor_at, NewsItem.id < after_id),
+            ))
+        return query.order_by(NewsItem.fetched_at.desc(), NewsItem.id.desc()).limit(limit).all()
+
+    def iter_rows(
+        self,
+        fields: Sequence[str],
+        author: Optional[str] = None,
+        fetched_from: Optional[datetime] = None,
+        fetched_to: Optional[datetime] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Any]:
+        """
+        Percorre todas as notícias filtradas, da mais antiga para a mais recente, como
+        linhas (tuplas nomeadas) só com as colunas pedidas. Usa cursor no servidor
+        (stream_results; named cursor no Postgres) e busca `batch_size` linhas por vez,
+        então a memória não depende do tamanho do resultado.
+        Consumir até o fim (ou fechar o gerador) libera a conexão.
+        """
+        query = _apply_filters(self._row_query(fields), author, fetched_from, fetched_to)
+        # Mesma ordem dos índices da listagem, então nem com filtro o banco precisa ordenar
+        query = query.order_by(NewsItem.fetched_at.asc(), NewsItem.id.asc())
+        query = query.execution_options(stream_results=True).yield_per(batch_size)
+        yield from query
+
+    def search(self, query: str, limit: int = 20, offset: int = 0, fields: Optional[Sequence[str]] = None) -> List[NewsItem]:
+        """
+        Busca textual em source_title e question_title, ignorando acentos e caixa,
+        ordenada por relevância (títulos pesam mais que perguntas) e depois pela mais recente.
+        Usa o índice FTS5 (SQLite) ou GIN/tsvector (Postgres) de core/search_index.py;
+        nos demais bancos, cai para _like_search.
+        """
+        dialect = self._dialect()
+        if dialect == "sqlite":
+            match = fts5_query(query)
+            if not match:
+                return []
+            statement = text(
+                f"SELECT news_items.* FROM {FTS_TABLE}"
+                f" JOIN news_items ON news_items.id = {FTS_TABLE}.rowid"
+                f" WHERE {FTS_TABLE} MATCH :match"
+                f" ORDER BY bm25({FTS_TABLE}, 1.0, 0.5), news_items.id DESC"
+                " LIMIT :limit OFFSET :offset"
+            ).bindparams(match=match, limit=limit, offset=offset)
+        elif dialect == "postgresql":
+            if not query.strip():
+                return []
+            tsquery = f"websearch_to_tsquery('{PG_TS_CONFIG}'::regconfig, :query)"
+            statement = text(
+                f"SELECT news_items.* FROM news_items WHERE {PG_DOCUMENT} @@ {tsquery}"
+                f" ORDER BY ts_rank({PG_DOCUMENT}, {tsquery}) DESC, news_items.id DESC"
+                " LIMIT :limit OFFSET :offset"
+            ).bindparams(query=query, limit=limit, offset=offset)
+        else:
+            return self._like_search(query, limit, offset, fields)
+        return self._query(fields).from_statement(statement).all()
 
-    def list(self, limit: int = 100) -> List[NewsItem]:
-        return self._session.query(NewsItem).order_by(NewsItem.id.desc()).limit(limit).all()
+    def _like_search(self, query: str, limit: int, offset: int, fields: Optional[Sequence[str]]) -> List[NewsItem]:
+        """
+        Busca portátil sem índice: cada termo deve aparecer (ILIKE) no título ou na pergunta.
+        Ignora a caixa, mas não os acentos; notícias com todos os termos no título vêm
+        primeiro, depois a mais recente. Percorre a tabela inteira: só para bancos sem FTS.
+        """
+        terms = [term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") for term in query.split()]
+        if not terms:
+            return []
+        in_title = [NewsItem.source_title.ilike(f"%{term}%", escape="\\") for term in terms]
+        in_question = [NewsItem.question_title.ilike(f"%{term}%", escape="\\") for term in terms]
+        return (
+            self._query(fields)
+            .filter(and_(*[or_(title, question) for title, question in zip(in_title, in_question)]))
+            .order_by(case((and_(*in_title), 0), else_=1), NewsItem.id.desc())
+            .limit(limit)
+            .offset(offset)
+            .all()
+        )
 
     def update(self, item: NewsItem, **kwargs) -> NewsItem:
         for k, v in kwargs.items():
             if hasattr(item, k) and v is not None:
                 setattr(item, k, v)
+        bump_table_version(self._session)
         self._session.commit()
         self._session.refresh(item)
         return item
 
     def delete(self, item: NewsItem):
         self._session.delete(item)
+        bump_table_version(self._session)
         self._session.commit()
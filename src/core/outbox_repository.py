@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from datetime import datetime, timedelta
+from core.db import ScopedSession
+from sqlalchemy.orm import Session
+from models.models import NewsItem, OutboxMessage
+from core.table_version import bump_table_version
+from utils.utils import utcnow
+from sqlalchemy import func
+from typing import Any, Dict, List, Optional
+
+class OutboxRepository:
+    """
+    Operações do lado consumidor do outbox: reservar mensagens vencidas e registrar o resultado.
+    Usa a sessão da thread atual (ScopedSession), como o NewsRepository.
+    """
+    def __init__(self, session: Optional[Session] = None):
+        self._explicit_session = session
+
+    @property
+    def _session(self) -> Session:
+        return self._explicit_session if self._explicit_session is not None else ScopedSession()
+
+    def claim_due(self, limit: int, lease_seconds: float) -> List[OutboxMessage]:
+        """
+        Reserva até `limit` mensagens prontas para envio, passando-as para SENDING até o fim da reserva.
+        Mensagens em SENDING com reserva vencida (ex.: processo encerrado no meio do envio) voltam a ser elegíveis.
+        A reserva é condicional (UPDATE ... WHERE status/next_attempt_at inalterados), então dois
+        consumidores nunca ficam com a mesma mensagem.
+        """
+        now = utcnow()
+        candidates = (
+            self._session.query(OutboxMessage.id, OutboxMessage.status, OutboxMessage.next_attempt_at)
+            .filter(OutboxMessage.status.in_([OutboxMessage.PENDING, OutboxMessage.SENDING]))
+            .filter(OutboxMessage.next_attempt_at <= now)
+            .order_by(OutboxMessage.next_attempt_at)
+            .limit(limit)
+            .all()
+        )
+        lease_until = now + timedelta(seconds=lease_seconds)
+        claimed_ids = []
+        for msg_id, status, next_attempt_at in candidates:
+            updated = (
+                self._session.query(OutboxMessage)
+                .filter(OutboxMessage.id == msg_id)
+                .filter(OutboxMessage.status == status)
+                .filter(OutboxMessage.next_attempt_at == next_attempt_at)
+                .update({"status": OutboxMessage.SENDING, "next_attempt_at": lease_until}, synchronize_session=False)
+            )
+            if updated:
+                claimed_ids.append(msg_id)
+        self._session.commit()
+        if not claimed_ids:
+            return []
+        return self._session.query(OutboxMessage).filter(OutboxMessage.id.in_(claimed_ids)).all()
+
+    def claim(self, message_id: int, lease_seconds: float) -> Optional[OutboxMessage]:
+        """
+        Reserva uma mensagem específica, se ainda estiver pendente e vencida (entrega imediata
+        logo após a gravação). Retorna None se outro consumidor já a reservou.
+        """
+        now = utcnow()
+        updated = (
+            self._session.query(OutboxMessage)
+            .filter(OutboxMessage.id == message_id)
+            .filter(OutboxMessage.status == OutboxMessage.PENDING)
+            .filter(OutboxMessage.next_attempt_at <= now)
+            .update(
+                {"status": OutboxMessage.SENDING, "next_attempt_at": now + timedelta(seconds=lease_seconds)},
+                synchronize_session=False,
+            )
+        )
+        self._session.commit()
+        if not updated:
+            return None
+        return self._session.query(OutboxMessage).filter(OutboxMessage.id == message_id).first()
+
+    def mark_sent(self, message: OutboxMessage, external_response: Any):
+        message.status = OutboxMessage.SENT
+        message.attempts += 1
+        message.delivered_at = utcnow()
+        message.last_error = None
+        # UPDATE direto: não carrega a notícia só para gravar a resposta
+        self._session.query(NewsItem).filter(NewsItem.id == message.news_id).update(
+            {NewsItem.external_response: external_response}, synchronize_session=False
+        )
+        bump_table_version(self._session)
+        self._session.commit()
+
+    def mark_failed(self, message: OutboxMessage, error: str, retry_at: Optional[datetime]):
+        """
+        Registra a falha; sem `retry_at` a mensagem é dada como perdida (DEAD) e não volta à fila.
+        """
+        message.attempts += 1
+        message.last_error = error[:2000]
+        if retry_at is None:
+            message.status = OutboxMessage.DEAD
+        else:
+            message.status = OutboxMessage.PENDING
+            message.next_attempt_at = retry_at
+        self._session.commit()
+
+    def counts_by_status(self) -> Dict[str, int]:
+        rows = self._session.query(OutboxMessage.status, func.count(OutboxMessage.id)).group_by(OutboxMessage.status).all()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        """
+        Encerra o escopo: descarta a sessão da thread (ou fecha a sessão explícita).
+        """
+        if self._explicit_session is not None:
+            self._explicit_session.close()
+        else:
+            ScopedSession.remove()
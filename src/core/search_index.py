@@ -0,0 +1,101 @@
+"""
+Índice de busca textual sobre source_title e question_title, com acentos ignorados.
+
+SQLite: tabela virtual FTS5 de conteúdo externo (news_items_fts), tokenizador
+unicode61 com remove_diacritics, mantida por triggers em news_items.
+Postgres: índice GIN sobre to_tsvector com a configuração portuguese_unaccent
+(dicionário português + extensão unaccent); um índice de expressão dispensa triggers.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import re
+from typing import List
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from models.models import NewsItem
+import logging
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "news_items_fts"
+PG_TS_CONFIG = "portuguese_unaccent"
+PG_DOCUMENT = (
+    f"to_tsvector('{PG_TS_CONFIG}'::regconfig,"
+    " coalesce(news_items.source_title, '') || ' ' || coalesce(news_items.question_title, ''))"
+)
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    " source_title, question_title,"
+    " content='news_items', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON news_items BEGIN"
+    f" INSERT INTO {FTS_TABLE}(rowid, source_title, question_title)"
+    " VALUES (new.id, new.source_title, new.question_title); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON news_items BEGIN"
+    f" INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, source_title, question_title)"
+    " VALUES ('delete', old.id, old.source_title, old.question_title); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF source_title, question_title ON news_items BEGIN"
+    f" INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, source_title, question_title)"
+    " VALUES ('delete', old.id, old.source_title, old.question_title);"
+    f" INSERT INTO {FTS_TABLE}(rowid, source_title, question_title)"
+    " VALUES (new.id, new.source_title, new.question_title); END",
+]
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "DO $$ BEGIN"
+    f" IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{PG_TS_CONFIG}') THEN"
+    f" CREATE TEXT SEARCH CONFIGURATION {PG_TS_CONFIG} (COPY = portuguese);"
+    f" ALTER TEXT SEARCH CONFIGURATION {PG_TS_CONFIG}"
+    " ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;"
+    " END IF; END $$",
+    f"CREATE INDEX IF NOT EXISTS ix_news_items_search ON news_items USING GIN ({PG_DOCUMENT})",
+]
+
+
+def ensure_search_index(connection: Connection) -> bool:
+    """
+    Cria o índice de busca se ainda não existir (idempotente). No SQLite, um índice
+    recém-criado sobre uma tabela já populada é reconstruído a partir de news_items.
+    Retorna False se o banco não suportar a busca indexada.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        existed = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).first() is not None
+        for statement in SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        if not existed:
+            connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            logger.info("Índice de busca %s criado", FTS_TABLE)
+        return True
+    if dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.exec_driver_sql(statement)
+        return True
+    logger.warning("Busca textual indexada não suportada para o banco '%s'", dialect)
+    return False
+
+
+@event.listens_for(NewsItem.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    # A tabela FTS não faz parte do metadata: sem isto, sobreviveria a um drop_all
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def fts5_query(text: str) -> str:
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra entre aspas
+    (sem operadores), todas obrigatórias, e a última como prefixo.
+    """
+    terms: List[str] = re.findall(r"\w+", text)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
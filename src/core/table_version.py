@@ -0,0 +1,132 @@
+"""
+Versão da tabela news_items para validação de caches: cada unidade de trabalho que
+escreve na tabela incrementa um contador persistente (table_versions) uma única vez,
+logo após o seu commit, e a leitura desse contador é mantida em memória por alguns instantes.
+
+O incremento roda numa transação própria e curta, fora da transação da escrita: a linha
+do contador é compartilhada, e atualizá-la dentro de cada escrita faria escritores
+concorrentes (no Postgres) esperarem uns pelos outros até o commit.
+
+Escritas feitas neste processo invalidam a versão em memória logo após o commit;
+escritas de outros processos são percebidas em até Config.RESPONSE_CACHE_VERSION_TTL segundos.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from core.db import engine
+from models.models import TableVersion
+from config.config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+NEWS_TABLE = "news_items"
+_BUMPED_KEY = "table_versions_bumped"
+
+
+def bump_table_version(session: Session, name: str = NEWS_TABLE):
+    """
+    Marca a tabela como alterada na transação corrente da sessão. A versão é incrementada
+    uma vez após o commit (_bump_after_commit), por mais escritas que a transação faça;
+    um rollback descarta a marcação.
+    """
+    session.info.setdefault(_BUMPED_KEY, set()).add(name)
+
+
+def _increment(connection, name: str):
+    table = TableVersion.__table__
+    updated = connection.execute(
+        table.update().where(table.c.name == name).values(version=table.c.version + 1)
+    ).rowcount
+    if not updated:
+        connection.execute(table.insert().values(name=name, version=initial_version() + 1))
+
+
+def initial_version() -> int:
+    """
+    Valor inicial do contador. Parte do relógio (ms) para que uma tabela recriada
+    nunca repita versões já usadas em ETags.
+    """
+    return int(time.time() * 1000)
+
+
+def ensure_table_version(connection, name: str = NEWS_TABLE):
+    """
+    Cria a linha do contador se ainda não existir (chamado por init_db).
+    """
+    exists = connection.execute(
+        TableVersion.__table__.select().where(TableVersion.name == name)
+    ).first()
+    if exists is None:
+        connection.execute(TableVersion.__table__.insert().values(name=name, version=initial_version()))
+
+
+class VersionTracker:
+    """
+    Leitura em cache da versão de uma tabela, segura entre threads.
+    """
+
+    def __init__(self, name: str = NEWS_TABLE, ttl: Optional[float] = None):
+        self.name = name
+        self.ttl = Config.RESPONSE_CACHE_VERSION_TTL if ttl is None else ttl
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        # Incrementada a cada invalidate(): uma leitura iniciada antes dela não vai para o cache
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < self.ttl:
+                return self._version
+            generation = self._generation
+        started_at = time.monotonic()
+        with engine.connect() as connection:
+            row = connection.execute(
+                TableVersion.__table__.select().where(TableVersion.name == self.name)
+            ).first()
+        version = row.version if row is not None else 0
+        with self._lock:
+            if self._generation == generation:
+                # A idade conta desde o início da leitura, não do fim
+                self._version = version
+                self._checked_at = started_at
+        return version
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._version = None
+
+
+news_version = VersionTracker()
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    names = session.info.pop(_BUMPED_KEY, ())
+    if not names:
+        return
+    # A escrita já está visível: quem ler entre o commit e o incremento guarda no cache,
+    # sob a versão antiga, dados no máximo mais novos, que deixam de ser servidos em seguida
+    try:
+        with session.get_bind().begin() as connection:
+            for name in sorted(names):
+                _increment(connection, name)
+    except Exception:
+        logger.exception("Falha ao incrementar a versão de %s", ", ".join(sorted(names)))
+    if NEWS_TABLE in names:
+        news_version.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_bump(session, previous_transaction):
+    # O rollback de um savepoint não desfaz as escritas anteriores a ele na transação
+    if previous_transaction.parent is None:
+        session.info.pop(_BUMPED_KEY, None)
@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.db import SessionLocal
+from core.news_repository import NewsRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork:
+    """
+    Agrupa as escritas de uma operação em uma única transação.
+
+        with UnitOfWork() as uow:
+            news_id = uow.news.insert_if_absent(source_title=..., question_title=...)
+            uow.news.enqueue_delivery(news_id, payload)
+            uow.commit()
+
+    As chamadas remotas (portal, Gemini) devem acontecer antes de abrir o escopo:
+    a transação fica aberta só pelo tempo das inserções. Sem commit() explícito,
+    tudo é desfeito na saída, então nenhuma linha parcial chega a ficar visível.
+    Os objetos continuam legíveis após o commit (expire_on_commit=False), sem refresh.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        self.session = None
+        self.news = None
+        self._committed = False
+
+    def __enter__(self) -> "UnitOfWork":
+        self.session = self._session_factory(expire_on_commit=False)
+        self.news = NewsRepository(session=self.session)
+        self._committed = False
+        return self
+
+    def commit(self):
+        self.session.commit()
+        self._committed = True
+
+    def rollback(self):
+        self.session.rollback()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if not self._committed:
+                if exc_type is not None:
+                    logger.warning("Transação desfeita após erro: %s", exc)
+                self.session.rollback()
+        finally:
+            self.session.close()
+        return False
@@ -2,16 +2,99 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, func
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Text, ForeignKey, Index, func
+from sqlalchemy.orm import deferred
 from core.db import Base
+from models.types import CompressedJSON
 
 class NewsItem(Base):
     __tablename__ = "news_items"
 
     id = Column(Integer, primary_key=True, index=True)
     source_title = Column(String(512), nullable=False)
-    question_title = Column(String(64), nullable=True)
-    source_url = Column(String(1024), nullable=True)
+    question_title = Column(String(128), nullable=True)  # perguntas de até 96 caracteres, com folga
+    source_url = Column(String(1024), nullable=True, index=True)
+    # URL normalizada (utils.normalize_url): impede gravar a mesma notícia duas vezes
+    url_key = Column(String(1024), nullable=True, unique=True, index=True)
+    # sha256 do título normalizado, para itens sem URL
+    title_hash = Column(String(64), nullable=True, index=True)
     author = Column(String(256), nullable=True)  # Secretaria/Autor da notícia
     fetched_at = Column(DateTime(timezone=True), server_default=func.now())
-    external_response = Column(Text, nullable=True)
+    # JSON (comprimido se grande); carregado só quando pedido, a listagem não precisa dele
+    external_response = deferred(Column(CompressedJSON, nullable=True))
+
+    __table_args__ = (
+        # Paginação de GET /api/news/ em ordem (fetched_at, id), com ou sem filtro por autor
+        Index("ix_news_items_author_fetched_at_id", "author", "fetched_at", "id"),
+        Index("ix_news_items_fetched_at_id", "fetched_at", "id"),
+    )
+
+
+class OutboxMessage(Base):
+    """
+    Entrega pendente para a API externa, gravada na mesma transação da notícia.
+    Consumida pelo OutboxDeliveryWorker (services/outbox_worker.py).
+    """
+    __tablename__ = "outbox_messages"
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+
+    id = Column(Integer, primary_key=True)
+    news_id = Column(Integer, ForeignKey("news_items.id", ondelete="CASCADE"), nullable=False, index=True)
+    payload = Column(Text, nullable=False)  # JSON enviado à API externa
+    status = Column(String(16), nullable=False, default=PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)  # UTC; em SENDING, fim da reserva
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_messages_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+
+class TableVersion(Base):
+    """
+    Contador de alterações por tabela, incrementado uma vez após o commit de cada escrita.
+    Serve de base para os ETags e o cache de respostas da API (core/table_version.py).
+    """
+    __tablename__ = "table_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class JobRecord(Base):
+    """
+    Estado de um job em segundo plano (services/job_service.py), compartilhado pelos workers:
+    qualquer processo responde /api/system/jobs/<id>. active_name é o nome do job enquanto
+    ele está ativo e nulo depois; por ser único, há no máximo um job ativo por nome entre
+    todos os processos (single-flight).
+    """
+    __tablename__ = "background_jobs"
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    id = Column(String(32), primary_key=True)
+    name = Column(String(64), nullable=False)
+    active_name = Column(String(64), nullable=True, unique=True)
+    status = Column(String(16), nullable=False)
+    created_at = Column(DateTime, nullable=False)  # UTC
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    lease_until = Column(DateTime, nullable=True)  # UTC; renovado pelo processo que roda o job
+    stages = Column(CompressedJSON, nullable=True)  # segundos por etapa
+    attached = Column(Integer, nullable=False, default=0)
+    result = Column(CompressedJSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_background_jobs_finished_at", "finished_at"),
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional
+from typing import Any, Optional
 from datetime import datetime
 
 class NewsItemCreate(BaseModel):
@@ -19,7 +19,7 @@ class NewsItemRead(BaseModel):
     source_url: Optional[str]
     author: Optional[str]
     fetched_at: datetime
-    external_response: Optional[str]
+    external_response: Optional[Any]
 
     class Config:
         orm_mode = True
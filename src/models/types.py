@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import base64
+import json
+import zlib
+from typing import Any, Optional
+from sqlalchemy.types import Text, TypeDecorator
+from config.config import Config
+
+# Prefixo dos valores comprimidos: "z:" + base64(zlib(JSON))
+COMPRESSED_PREFIX = "z:"
+
+
+def encode_json_payload(value: Any, min_compress_bytes: Optional[int] = None) -> Optional[str]:
+    """
+    Serializa o valor como JSON compacto; acima de `min_compress_bytes`, comprime com zlib.
+    """
+    if value is None:
+        return None
+    min_compress_bytes = Config.EXTERNAL_RESPONSE_COMPRESS_MIN_BYTES if min_compress_bytes is None else min_compress_bytes
+    text = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+    raw = text.encode("utf-8")
+    if min_compress_bytes > 0 and len(raw) >= min_compress_bytes:
+        compressed = COMPRESSED_PREFIX + base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+        if len(compressed) < len(raw):
+            return compressed
+    return text
+
+
+def decode_json_payload(text: Optional[str]) -> Any:
+    """
+    Inverso de encode_json_payload. Valores antigos que não são JSON (ex.: str(dict))
+    são devolvidos como texto.
+    """
+    if text is None:
+        return None
+    if text.startswith(COMPRESSED_PREFIX):
+        try:
+            return json.loads(zlib.decompress(base64.b64decode(text[len(COMPRESSED_PREFIX):])))
+        except (ValueError, zlib.error):
+            return text
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+class CompressedJSON(TypeDecorator):
+    """
+    Coluna Text que guarda qualquer valor serializável em JSON, comprimido acima do limite
+    configurado. Continua compatível com linhas gravadas como texto simples.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_json_payload(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_json_payload(value)
@@ -0,0 +1,175 @@
+"""
+Carga histórica (backfill) do arquivo de notícias da Câmara Municipal do Recife.
+Percorre a paginação da listagem como um gerador, insere os itens em lotes e grava
+um checkpoint após cada lote para que uma execução interrompida possa ser retomada.
+
+O arquivo é lido da última página (a mais antiga) para a primeira, e cada página do
+item mais antigo para o mais recente: os ids continuam em ordem cronológica, como
+esperam a listagem e a exportação. Notícias publicadas durante a carga empurram itens
+para páginas já lidas; rode-a antes de ativar a coleta periódica.
+As linhas entram sem pergunta (question_title nulo) e não são enviadas à API externa;
+NewsService.reformulate_pending as reformula sob demanda (scripts/backfill.py --reformulate).
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from core.news_repository import NewsRepository
+from clients.recife_portal_fetcher import RecifePortalFetcher
+from clients.http_transport import HostThrottle
+from config.config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillService:
+    def __init__(
+        self,
+        repository: Optional[NewsRepository] = None,
+        fetcher: Optional[RecifePortalFetcher] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        checkpoint_path: Optional[str] = None,
+    ):
+        self.repo = repository or NewsRepository()
+        self.fetcher = fetcher or RecifePortalFetcher()
+        self.batch_size = batch_size or Config.BACKFILL_BATCH_SIZE
+        self.concurrency = max(1, concurrency or Config.BACKFILL_CONCURRENCY)
+        self.checkpoint_path = checkpoint_path or Config.BACKFILL_CHECKPOINT_PATH
+
+    def find_last_page(self) -> int:
+        """
+        Índice da última página não vazia do arquivo (-1 se não houver notícias).
+        Dobra o índice até achar uma página vazia e faz busca binária no intervalo:
+        cerca de 2·log2(N) requisições para N páginas.
+        """
+        throttle = HostThrottle(1, Config.DETAILS_POLITENESS_DELAY)
+
+        def has_items(page: int) -> bool:
+            with throttle.slot(self.fetcher.portal_url):
+                return bool(self.fetcher.fetch_listing_page(page))
+
+        if not has_items(0):
+            return -1
+        low, high = 0, 1
+        while has_items(high):
+            low, high = high, high * 2
+        # low tem itens e high está vazia
+        while high - low > 1:
+            middle = (low + high) // 2
+            if has_items(middle):
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def iter_pages(self, first_page: int, max_pages: Optional[int] = None) -> Iterator[Tuple[int, List[Tuple[str, str, str]]]]:
+        """
+        Gera (página, itens) de `first_page` até a página 0, em ordem decrescente.
+        Até `concurrency` páginas são buscadas adiantadas em paralelo; a memória usada
+        é limitada por essa janela, independentemente do tamanho do arquivo.
+        """
+        pages = range(first_page, -1, -1)
+        if max_pages:
+            pages = pages[:max_pages]
+        throttle = HostThrottle(self.concurrency, Config.DETAILS_POLITENESS_DELAY)
+
+        def fetch(page: int):
+            with throttle.slot(self.fetcher.portal_url):
+                return self.fetcher.fetch_listing_page(page)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="backfill") as executor:
+            upcoming = iter(pages)
+            pending = deque()
+            try:
+                while True:
+                    while len(pending) < self.concurrency:
+                        page = next(upcoming, None)
+                        if page is None:
+                            break
+                        pending.append((page, executor.submit(fetch, page)))
+                    if not pending:
+                        return
+                    page, future = pending.popleft()
+                    yield page, future.result()
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def run(self, max_pages: Optional[int] = None, resume: bool = True) -> Dict:
+        """
+        Executa a carga histórica. Com `resume`, continua da página anterior à do último
+        lote gravado. Itens cuja URL já existe no banco são ignorados pelo próprio INSERT
+        (upsert_many), então repetir páginas após uma falha não gera duplicatas.
+        """
+        checkpoint = self.load_checkpoint() if resume else None
+        if checkpoint and checkpoint.get("done"):
+            logger.info("Backfill já concluído (%d itens); use resume=False para recomeçar", checkpoint["inserted"])
+            return checkpoint
+        if checkpoint:
+            last_page, next_page, inserted = checkpoint["last_page"], checkpoint["next_page"], checkpoint["inserted"]
+        else:
+            last_page = self.find_last_page()
+            next_page, inserted = last_page, 0
+        logger.info("Backfill iniciado na página %d (última página do arquivo: %d)", next_page, last_page)
+
+        batch: List[Dict] = []
+        for page, items in self.iter_pages(next_page, max_pages):
+            if not items:
+                logger.warning("Página %d vazia durante o backfill", page)
+            # A listagem vem da mais recente para a mais antiga
+            batch.extend(
+                {"source_title": title, "source_url": url, "author": author} for title, url, author in reversed(items)
+            )
+            next_page = page - 1
+
+            # O lote só é gravado entre páginas: o checkpoint sempre aponta para uma página inteira
+            if len(batch) >= self.batch_size:
+                inserted += self.repo.upsert_many(batch)
+                self.save_checkpoint(last_page=last_page, next_page=next_page, inserted=inserted)
+                logger.info("Backfill: página %d, %d itens inseridos", page, inserted)
+                batch = []
+
+        inserted += self.repo.upsert_many(batch)
+        return self.save_checkpoint(last_page=last_page, next_page=next_page, inserted=inserted, done=next_page < 0)
+
+    def load_checkpoint(self) -> Optional[Dict]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Checkpoint de backfill ilegível, recomeçando do início: {e}")
+            return None
+        if data.get("portal_url") != self.fetcher.portal_url:
+            return None
+        if "last_page" not in data:
+            # Checkpoint do formato antigo (leitura da primeira para a última página)
+            logger.warning("Checkpoint de backfill em formato antigo, recomeçando do fim do arquivo")
+            return None
+        return data
+
+    def save_checkpoint(self, last_page: int, next_page: int, inserted: int, done: bool = False) -> Dict:
+        data = {
+            "portal_url": self.fetcher.portal_url,
+            "last_page": last_page,
+            "next_page": next_page,
+            "inserted": inserted,
+            "done": done,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        directory = os.path.dirname(os.path.abspath(self.checkpoint_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp_path, self.checkpoint_path)
+        return data
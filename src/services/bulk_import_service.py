@@ -0,0 +1,233 @@
+"""
+Importação em lote de notícias a partir de um corpo NDJSON (um objeto por linha)
+ou de um array JSON, lido do stream da requisição sem carregá-lo inteiro na memória.
+Cada registro é validado com NewsItemCreate; os válidos são gravados em blocos e os
+inválidos são reportados pela linha (ou posição no array), sem interromper o restante.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import codecs
+import io
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from core.news_repository import NewsRepository
+from models.schemas import NewsItemCreate
+from config.config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+_WHITESPACE = " \t\r\n"
+
+
+class RecordError(ValueError):
+    """Registro ilegível; reportado na sua linha sem interromper a importação."""
+
+
+class StreamError(ValueError):
+    """Corpo malformado a ponto de não ser possível localizar os próximos registros."""
+
+
+class _TextBuffer:
+    """
+    Janela de texto sobre um stream de bytes UTF-8; só guarda o trecho ainda não consumido.
+    """
+
+    def __init__(self, stream, max_record_bytes: int, initial: str = ""):
+        self._stream = stream
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._max_record_bytes = max_record_bytes
+        self.text = initial
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Lê mais um bloco do stream; retorna False no fim dos dados.
+        """
+        if self.eof:
+            return False
+        pending = self.text[self.pos:]
+        if len(pending) > self._max_record_bytes:
+            raise StreamError(f"Registro maior que {self._max_record_bytes} bytes")
+        chunk = self._stream.read(READ_SIZE)
+        self.eof = not chunk
+        try:
+            self.text = pending + self._decoder.decode(chunk, final=self.eof)
+        except UnicodeDecodeError as e:
+            raise StreamError(f"Corpo não está em UTF-8: {e}")
+        self.pos = 0
+        return not self.eof
+
+    def peek(self) -> Optional[str]:
+        """
+        Próximo caractere que não é espaço (sem consumi-lo), ou None no fim do stream.
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return None
+
+
+def _iter_json_array(buffer: _TextBuffer) -> Iterator[Tuple[int, Any]]:
+    decoder = json.JSONDecoder()
+    buffer.peek()
+    buffer.pos += 1  # '['
+    position = 0
+    if buffer.peek() == "]":
+        return
+    while True:
+        position += 1
+        if buffer.peek() is None:
+            raise StreamError("Array JSON incompleto")
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer.text, buffer.pos)
+                # Um valor que termina no fim da janela (ex.: número) pode continuar no próximo bloco
+                if end < len(buffer.text) or buffer.eof:
+                    break
+            except json.JSONDecodeError as e:
+                if buffer.eof:
+                    raise StreamError(f"JSON inválido no elemento {position}: {e.msg}")
+            buffer.fill()
+        buffer.pos = end
+        yield position, value
+        separator = buffer.peek()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise StreamError(f"Esperado ',' ou ']' após o elemento {position}")
+        buffer.pos += 1
+
+
+def _iter_ndjson(stream, max_record_bytes: int) -> Iterator[Tuple[int, Any]]:
+    for line_number, raw in enumerate(iter(lambda: stream.readline(max_record_bytes + 1), b""), start=1):
+        if len(raw) > max_record_bytes and not raw.endswith(b"\n"):
+            # Descarta o restante da linha longa demais
+            while raw and not raw.endswith(b"\n"):
+                raw = stream.readline(READ_SIZE)
+            yield line_number, RecordError(f"Linha maior que {max_record_bytes} bytes")
+            continue
+        if not raw.strip():
+            continue
+        try:
+            yield line_number, json.loads(raw)
+        except ValueError as e:
+            yield line_number, RecordError(f"JSON inválido: {e}")
+
+
+class _Prefixed:
+    """
+    Devolve ao stream os bytes lidos para detectar o formato.
+    """
+
+    def __init__(self, prefix: bytes, stream):
+        self._prefix = io.BytesIO(prefix)
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._prefix.read(size)
+        if size < 0 or len(data) < size:
+            data += self._stream.read(size - len(data) if size >= 0 else -1)
+        return data
+
+    def readline(self, limit: int = -1) -> bytes:
+        line = self._prefix.readline(limit)
+        if line.endswith(b"\n") or (limit >= 0 and len(line) >= limit):
+            return line
+        return line + self._stream.readline(limit - len(line) if limit >= 0 else -1)
+
+
+def iter_records(stream, max_record_bytes: Optional[int] = None) -> Iterator[Tuple[int, Any]]:
+    """
+    Gera (linha, registro) a partir do stream de bytes. O formato é detectado pelo
+    primeiro caractere: '[' indica um array JSON (a "linha" é a posição no array,
+    a partir de 1); caso contrário, NDJSON. Registros ilegíveis vêm como RecordError.
+    """
+    max_record_bytes = max_record_bytes or Config.BULK_MAX_RECORD_BYTES
+    leading = b""
+    first = stream.read(1)
+    while first and first in _WHITESPACE.encode():
+        leading += first
+        first = stream.read(1)
+    if not first:
+        return
+    if first == b"[":
+        yield from _iter_json_array(_TextBuffer(stream, max_record_bytes, initial="["))
+    else:
+        yield from _iter_ndjson(_Prefixed(leading + first, stream), max_record_bytes)
+
+
+class BulkImportService:
+    def __init__(
+        self,
+        repository: Optional[NewsRepository] = None,
+        chunk_size: Optional[int] = None,
+        max_errors: Optional[int] = None,
+    ):
+        self.repo = repository or NewsRepository()
+        self.chunk_size = chunk_size or Config.BULK_CHUNK_SIZE
+        self.max_errors = Config.BULK_MAX_ERRORS if max_errors is None else max_errors
+
+    def import_stream(self, stream) -> Dict[str, Any]:
+        """
+        Importa todos os registros do stream. A memória usada é limitada pelo tamanho
+        do bloco, não do corpo. Notícias cuja URL já existe contam como duplicatas.
+        Os erros detalhados são limitados a `max_errors`; `failed` conta todos.
+        """
+        result: Dict[str, Any] = {"received": 0, "created": 0, "duplicates": 0, "failed": 0, "errors": []}
+        chunk: List[Dict] = []
+        try:
+            for line, record in iter_records(stream):
+                result["received"] += 1
+                if isinstance(record, RecordError):
+                    self._record_error(result, line, str(record))
+                    continue
+                if not isinstance(record, dict):
+                    self._record_error(result, line, "Esperado um objeto JSON")
+                    continue
+                try:
+                    item = NewsItemCreate(**record)
+                except ValidationError as e:
+                    self._record_error(result, line, "Dados inválidos", e.errors())
+                    continue
+                chunk.append({
+                    "source_title": item.source_title,
+                    "source_url": str(item.source_url) if item.source_url else None,
+                    "author": item.author,
+                })
+                if len(chunk) >= self.chunk_size:
+                    self._write(chunk, result)
+                    chunk = []
+        except StreamError as e:
+            # Os registros lidos até aqui continuam válidos e são gravados
+            logger.warning("Importação em lote interrompida: %s", e)
+            result["aborted"] = str(e)
+        self._write(chunk, result)
+        logger.info(
+            "Importação em lote: %d recebidos, %d criados, %d duplicados, %d com erro",
+            result["received"], result["created"], result["duplicates"], result["failed"],
+        )
+        return result
+
+    def _write(self, chunk: List[Dict], result: Dict[str, Any]):
+        if not chunk:
+            return
+        created = self.repo.upsert_many(chunk)
+        result["created"] += created
+        result["duplicates"] += len(chunk) - created
+
+    def _record_error(self, result: Dict[str, Any], line: int, message: str, details=None):
+        result["failed"] += 1
+        if len(result["errors"]) < self.max_errors:
+            error = {"line": line, "message": message}
+            if details is not None:
+                error["details"] = details
+            result["errors"].append(error)
@@ -0,0 +1,113 @@
+"""
+Exportação completa das notícias em NDJSON ou CSV, gerada em blocos para respostas
+em streaming: a primeira parte sai assim que o primeiro lote é lido do banco e a
+memória usada não depende do número de linhas. Opcionalmente comprimida em gzip.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Sequence
+from core.db import SessionLocal
+from core.news_repository import NewsRepository
+from utils.serialization import dumps
+from config.config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (str, int, float)):
+        # external_response: mesmo contrato de texto da API
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class NewsExporter:
+    def __init__(self, fmt: str, fields: Sequence[str], filters: Optional[Dict[str, Any]] = None,
+                 gzip: bool = False, batch_size: Optional[int] = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato de exportação inválido: {fmt}")
+        self.fmt = fmt
+        self.fields = list(fields)
+        self.filters = filters or {}
+        self.gzip = gzip
+        self.batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+
+    @property
+    def mimetype(self) -> str:
+        return "application/gzip" if self.gzip else FORMATS[self.fmt]
+
+    @property
+    def filename(self) -> str:
+        return f"news.{self.fmt}" + (".gz" if self.gzip else "")
+
+    def stream(self) -> Iterator[bytes]:
+        """
+        Gera o arquivo em partes de até `batch_size` linhas. Usa uma sessão própria, pois a
+        resposta continua sendo enviada depois que a requisição (e sua sessão) terminou.
+        """
+        chunks = self._encoded_chunks()
+        if not self.gzip:
+            yield from chunks
+            return
+        # wbits=31: formato gzip (cabeçalho e CRC), legível por gunzip e pelo módulo gzip
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def _encoded_chunks(self) -> Iterator[bytes]:
+        session = SessionLocal()
+        exported = 0
+        try:
+            rows = NewsRepository(session=session).iter_rows(self.fields, batch_size=self.batch_size, **self.filters)
+            # CSV passa pelo módulo csv (texto); NDJSON já sai em bytes do codificador JSON
+            buffer = io.StringIO() if self.fmt == "csv" else io.BytesIO()
+            writer = csv.writer(buffer) if self.fmt == "csv" else None
+            if writer is not None:
+                writer.writerow(self.fields)
+            pending = 0
+            for row in rows:
+                values = [_cell(value) for value in row]
+                if writer is not None:
+                    writer.writerow(values)
+                else:
+                    buffer.write(dumps(dict(zip(self.fields, values))))
+                    buffer.write(b"\n")
+                pending += 1
+                if pending >= self.batch_size:
+                    exported += pending
+                    pending = 0
+                    yield _drain(buffer)
+            exported += pending
+            if buffer.tell():
+                yield _drain(buffer)
+            logger.info("Exportação %s concluída: %d notícias", self.fmt, exported)
+        finally:
+            session.close()
+
+
+def _drain(buffer) -> bytes:
+    """
+    Retorna o conteúdo acumulado em bytes e esvazia o buffer.
+    """
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data.encode("utf-8") if isinstance(data, str) else data
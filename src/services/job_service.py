@@ -0,0 +1,315 @@
+"""
+Execução em segundo plano dos processamentos disparados pela API.
+
+Cada disparo vira um Job com id, estado e o tempo gasto em cada etapa (stage()).
+Os jobs têm nome, e há no máximo um job ativo (na fila ou rodando) por nome
+(single-flight): um disparo enquanto outro está em andamento se anexa a ele e
+recebe o mesmo id, em vez de processar e gravar os mesmos itens de novo.
+O estado fica na tabela background_jobs, então isso vale entre todos os workers.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+from core.db import session_scope
+from core.job_repository import JobRepository
+from models.models import JobRecord
+from config.config import Config
+from utils.utils import utcnow
+import logging
+
+logger = logging.getLogger(__name__)
+
+_current_job: ContextVar[Optional["Job"]] = ContextVar("current_job", default=None)
+
+
+@dataclass
+class Job:
+    QUEUED = JobRecord.QUEUED
+    RUNNING = JobRecord.RUNNING
+    SUCCEEDED = JobRecord.SUCCEEDED
+    FAILED = JobRecord.FAILED
+
+    name: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    created_at: datetime = field(default_factory=utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Segundos gastos em cada etapa, na ordem em que foram executadas
+    stages: Dict[str, float] = field(default_factory=dict)
+    # Disparos que se anexaram a este job em vez de iniciar outro
+    attached: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (self.QUEUED, self.RUNNING)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Aguarda o fim do job; retorna False se o tempo acabar antes.
+        """
+        return self._done.wait(timeout)
+
+    @classmethod
+    def from_record(cls, record: JobRecord) -> "Job":
+        """
+        Cópia do estado gravado no banco (job de outro processo ou já descartado da memória).
+        """
+        job = cls(
+            name=record.name, id=record.id, status=record.status, created_at=record.created_at,
+            started_at=record.started_at, finished_at=record.finished_at, stages=dict(record.stages or {}),
+            attached=record.attached, result=record.result, error=record.error,
+        )
+        if not job.active:
+            job._done.set()
+        return job
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = None
+        if self.started_at is not None:
+            duration = ((self.finished_at or utcnow()) - self.started_at).total_seconds()
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration": duration,
+            "stages": dict(self.stages),
+            "attached": self.attached,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def record_stage(name: str, seconds: float):
+    """
+    Soma `seconds` ao tempo da etapa no job em execução na thread atual (se houver).
+    """
+    job = _current_job.get()
+    if job is not None:
+        job.stages[name] = job.stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Mede o tempo de uma etapa do job em execução na thread atual; fora de um job, não faz nada.
+    Uma etapa repetida acumula o tempo.
+    """
+    if _current_job.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+class JobManager:
+    """
+    Executa os jobs deste processo e guarda o estado de todos no banco (core/job_repository.py):
+    com vários workers (gunicorn), um disparo feito em qualquer um deles se anexa ao job já
+    ativo em outro, e /api/system/jobs/<id> responde em todos. O processo que roda um job
+    renova a sua reserva periodicamente; se ele morrer, o job é marcado como falho quando a
+    reserva vence e o nome fica livre para um novo disparo.
+    """
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        history_size: Optional[int] = None,
+        repository: Optional[JobRepository] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        self.max_workers = max(1, max_workers or Config.JOB_WORKERS)
+        self.history_size = history_size or Config.JOB_HISTORY_SIZE
+        self.repo = repository or JobRepository()
+        self.lease_seconds = lease_seconds or Config.JOB_LEASE_SECONDS
+        # Jobs executados por este processo (o estado vivo, com etapas e wait())
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def submit(self, name: str, func: Callable[[], Any]) -> Tuple[Job, bool]:
+        """
+        Enfileira `func` como o job `name` e retorna (job, criado). Se já houver um job
+        ativo com esse nome, neste ou em outro processo, retorna esse job com criado=False
+        e `func` não é executada.
+        """
+        with self._lock:
+            running = self._active.get(name)
+            if running is not None:
+                running.attached += 1
+                self.repo.attach(name)
+                logger.info("Job %s (%s) já em andamento; disparo anexado", running.id, name)
+                return running, False
+            job = Job(name=name)
+            while not self.repo.create(job.id, name, job.status, job.created_at, self._lease_until()):
+                record = self.repo.attach(name)
+                if record is not None:
+                    logger.info("Job %s (%s) já em andamento em outro processo; disparo anexado", record.id, name)
+                    return Job.from_record(record), False
+                # O job do outro processo terminou entre a inserção e a anexação: tenta de novo
+            self._active[name] = job
+            self._jobs[job.id] = job
+            self._evict_finished()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+                self._stopping.clear()
+                self._heartbeat = threading.Thread(target=self._renew_leases, name="job-heartbeat", daemon=True)
+                self._heartbeat.start()
+            self._executor.submit(self._run, job, func)
+        logger.info("Job %s (%s) enfileirado", job.id, name)
+        return job, True
+
+    def run(self, name: str, func: Callable[[], Any]) -> Any:
+        """
+        Como submit, mas aguarda o fim do job (o próprio ou o que já estava em andamento)
+        e retorna o resultado; levanta RuntimeError se ele falhou.
+        """
+        job, _ = self.submit(name, func)
+        job = self.wait(job)
+        if job.status == Job.FAILED:
+            raise RuntimeError(f"Job {job.id} ({name}) falhou: {job.error}")
+        return job.result
+
+    def wait(self, job: Job, timeout: Optional[float] = None) -> Job:
+        """
+        Aguarda o fim do job e retorna o seu estado mais recente. Jobs de outro processo
+        são consultados no banco a cada Config.JOB_POLL_INTERVAL segundos.
+        """
+        with self._lock:
+            local = self._jobs.get(job.id) is job
+        if local:
+            job.wait(timeout)
+            return job
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while job.active:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            time.sleep(Config.JOB_POLL_INTERVAL if remaining is None else min(Config.JOB_POLL_INTERVAL, remaining))
+            refreshed = self.get(job.id)
+            if refreshed is None:
+                raise RuntimeError(f"Job {job.id} ({job.name}) não encontrado")
+            job = refreshed
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            local = self._jobs.get(job_id)
+        record = self.repo.get(job_id)
+        if local is not None:
+            if record is not None:
+                # Disparos anexados por outros processos só são contados no banco
+                local.attached = max(local.attached, record.attached)
+            return local
+        if record is None:
+            return None
+        if record.active_name is not None and record.lease_until is not None and record.lease_until < utcnow():
+            self.repo.release_expired(record.name)
+            record = self.repo.get(job_id)
+        return Job.from_record(record) if record is not None else None
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            heartbeat, self._heartbeat = self._heartbeat, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        self._stopping.set()
+        if heartbeat is not None and wait:
+            heartbeat.join()
+
+    def _lease_until(self):
+        return utcnow() + timedelta(seconds=self.lease_seconds)
+
+    def _renew_leases(self):
+        # Renova a reserva (e grava as etapas) dos jobs ativos deste processo a cada terço do prazo
+        while not self._stopping.wait(self.lease_seconds / 3):
+            with self._lock:
+                stages = {job.id: dict(job.stages) for job in self._active.values()}
+            try:
+                self.repo.renew(stages, self._lease_until())
+            except Exception:
+                logger.exception("Falha ao renovar a reserva dos jobs")
+
+    def _save(self, job: Job, release: bool = False):
+        values = {
+            "status": job.status,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "stages": dict(job.stages),
+        }
+        if release:
+            values.update(result=job.result, error=job.error)
+        try:
+            self.repo.save(job.id, values, release=release)
+        except Exception:
+            # O job continua consultável neste processo; nos demais, a reserva vence e ele aparece como falho
+            logger.exception("Falha ao gravar o estado do job %s (%s)", job.id, job.name)
+
+    def _run(self, job: Job, func: Callable[[], Any]):
+        token = _current_job.set(job)
+        job.started_at = utcnow()
+        job.status = Job.RUNNING
+        self._save(job)
+        try:
+            # Cada job usa uma sessão própria, descartada ao final
+            with session_scope():
+                job.result = func()
+            job.status = Job.SUCCEEDED
+        except Exception as e:
+            logger.exception("Job %s (%s) falhou", job.id, job.name)
+            job.error = str(e)
+            job.status = Job.FAILED
+        finally:
+            job.finished_at = utcnow()
+            _current_job.reset(token)
+            self._save(job, release=True)
+            with self._lock:
+                if self._active.get(job.name) is job:
+                    del self._active[job.name]
+            job._done.set()
+            logger.info("Job %s (%s) terminou: %s em %s", job.id, job.name, job.status, job.stages)
+
+    def _evict_finished(self):
+        # Mantém os últimos `history_size` jobs; os ativos nunca são descartados
+        excess = len(self._jobs) - self.history_size
+        for job_id in [job_id for job_id, job in self._jobs.items() if not job.active][:max(0, excess)]:
+            del self._jobs[job_id]
+        self.repo.prune(self.history_size)
+
+
+_default_manager: Optional[JobManager] = None
+_default_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """
+    Retorna o gerenciador de jobs compartilhado do processo, criando-o na primeira chamada.
+    """
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = JobManager()
+        return _default_manager
@@ -3,12 +3,19 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from core.news_repository import NewsRepository
+from core.unit_of_work import UnitOfWork
+from services.job_service import record_stage, stage
+from services.outbox_worker import OutboxDeliveryWorker
+from services.pipeline import Pipeline, Stage
 from clients.news_fetcher import RssNewsFetcher, HtmlListFetcher
 from clients.recife_portal_fetcher import RecifePortalFetcher
 from clients.gemini_client import GeminiClient
 from clients.external_client import ExternalClient
-from typing import Optional, Tuple
+from clients.resilience import CircuitOpenError, RateLimitExceeded
+from typing import List, Optional, Tuple
+from config.config import Config
 from utils.utils import safe_truncate
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,61 +26,269 @@ class NewsService:
         repository: Optional[NewsRepository] = None,
         fetcher: Optional[RecifePortalFetcher] = None,
         gemini: Optional[GeminiClient] = None,
-        external: Optional[ExternalClient] = None
+        external: Optional[ExternalClient] = None,
+        outbox_worker=None,
+        unit_of_work=UnitOfWork
     ):
         self.repo = repository or NewsRepository()
         self.fetcher = fetcher or RecifePortalFetcher()
         self.gemini = gemini or GeminiClient()
         self.external = external or ExternalClient()
+        # Optional OutboxDeliveryWorker, woken up right after a delivery is enqueued
+        self.outbox_worker = outbox_worker
+        # Factory for the transaction that persists each run (see core/unit_of_work.py)
+        self.unit_of_work = unit_of_work
+
+    def find_existing(self, title: str, url: Optional[str]):
+        """
+        Retorna a notícia já armazenada para o item da listagem, se houver.
+        A busca é pela URL de origem (indexada); sem URL, compara o título.
+        """
+        if url:
+            return self.repo.get_by_source_url(url)
+        return self.repo.get_by_source_title(title)
+
+    def process_new_items(self, max_items: Optional[int] = None) -> dict:
+        """
+        Processes every new listing item through a staged pipeline (services/pipeline.py):
+        fetch -> dedupe -> order -> reformulate -> persist -> deliver, connected by bounded queues.
+        Order is the only barrier: it waits for the listing scan to reach a stored item (no
+        remote calls yet) and releases the new items oldest first. Reformulation then goes
+        GEMINI_BATCH_SIZE titles per Gemini call, with several batches in flight; each batch is
+        persisted with one commit as soon as every older item is stored, so ids stay
+        chronological, and its deliveries start right away (failures are left to the outbox
+        worker's retries). Returns the items and per-stage stats (throughput, queue depth);
+        a failure reading the listing or persisting is raised after the pipeline drains.
+        """
+        max_items = max_items or Config.INGEST_MAX_NEW_ITEMS
+        # Position in the listing (0 = newest) of the first stored item found by dedupe
+        known = {"position": None}
+        known_lock = threading.Lock()
+        # Reformulated items waiting for an older batch to be stored, by sequence (0 = oldest)
+        waiting = {}
+        stored = {"next": 0}
+        deliverer = self.outbox_worker or OutboxDeliveryWorker(external=self.external)
+
+        def fetch():
+            for position, item in enumerate(self.fetcher.iter_latest_items()):
+                # The listing is ordered by date: past a stored item, everything is stored too
+                if position >= max_items or known["position"] is not None:
+                    return
+                yield position, item
+
+        def dedupe(entry):
+            position, (title, url, author) = entry
+            if self.find_existing(title, url) is None:
+                return entry
+            with known_lock:
+                if known["position"] is None or position < known["position"]:
+                    known["position"] = position
+            return None
+
+        def order(entries):
+            # Items older than a stored one were read ahead of the stop
+            cutoff = known["position"]
+            entries = [entry for entry in entries if cutoff is None or entry[0] < cutoff]
+            entries.sort(key=lambda entry: entry[0], reverse=True)
+            return [(sequence, item) for sequence, (_, item) in enumerate(entries)]
+
+        def reformulate(entries):
+            questions = self._reformulate_many([title for _, (title, _, _) in entries])
+            return [
+                (sequence, (title, url, author, question))
+                for (sequence, (title, url, author)), question in zip(entries, questions)
+            ]
+
+        def persist(entries):
+            # Single worker: stores the longest run of consecutive sequences available
+            waiting.update(entries)
+            ready = []
+            while stored["next"] in waiting:
+                ready.append(waiting.pop(stored["next"]))
+                stored["next"] += 1
+            return self._persist(ready, wake_worker=False)
+
+        def deliver(result):
+            external = result.get("external_response") or {}
+            if external.get("status") == "queued":
+                response = deliverer.deliver(external["outbox_id"])
+                if response is not None:
+                    result["external_response"] = {"status": "sent", "response": response}
+            return result
+
+        pipeline = Pipeline(
+            [
+                Stage("dedupe", dedupe, workers=Config.PIPELINE_DEDUPE_WORKERS),
+                Stage("order", order, batch=True),
+                Stage("reformulate", reformulate, workers=Config.PIPELINE_REFORMULATE_WORKERS,
+                      batch_size=Config.GEMINI_BATCH_SIZE, batch_wait=Config.PIPELINE_BATCH_WAIT),
+                Stage("persist", persist, batch_size=Config.GEMINI_BATCH_SIZE, batch_wait=Config.PIPELINE_BATCH_WAIT),
+                Stage("deliver", deliver, workers=Config.PIPELINE_DELIVER_WORKERS),
+            ],
+            queue_size=Config.PIPELINE_QUEUE_SIZE,
+        )
+        try:
+            # A listing or persist failure is raised here, so the job fails and the scheduler backs off
+            results = sorted(pipeline.run(fetch()), key=lambda result: result["news_id"] or 0)
+        finally:
+            stats = pipeline.stats()
+            for name, stage_stats in stats.items():
+                record_stage(name, stage_stats["seconds"])
+        processed = sum(1 for result in results if result.get("status") != "unchanged")
+        logger.info("Pipeline: %d novas notícias; etapas: %s", processed, stats)
+        return {"processed": processed, "items": results, "stats": stats}
+
+    def reformulate_pending(self, limit: Optional[int] = None, deliver: bool = False) -> dict:
+        """
+        Reformulates stored items that still have no question (e.g. rows from the backfill),
+        oldest first. Historical rows are not sent downstream unless `deliver` is set, in
+        which case their deliveries are enqueued in the same commit.
+        Titles Gemini could not reformulate (budget exhausted, circuit open) are left
+        untouched for a later call instead of being stored with a local fallback.
+        Returns how many were reformulated and how many are still pending.
+        """
+        limit = limit or Config.INGEST_MAX_NEW_ITEMS
+        rows = self.repo.list_without_question(limit)
+        questions = self.gemini.reformulate_many([row.source_title for row in rows], max_chars=96) if rows else []
+        resolved = [(row, question) for row, question in zip(rows, questions) if question is not None]
+
+        deliver = deliver and bool(self.external.base_url)
+        reformulated = 0
+        if resolved:
+            with self.unit_of_work() as uow:
+                for row, question in resolved:
+                    if not uow.news.set_question_title(row.id, question):
+                        continue
+                    reformulated += 1
+                    if deliver:
+                        uow.news.enqueue_delivery(
+                            row.id, self._delivery_payload(row.id, row.source_title, row.source_url, row.author, question)
+                        )
+                uow.commit()
+            if deliver and reformulated and self.outbox_worker is not None:
+                self.outbox_worker.wake()
+
+        remaining = self.repo.count_without_question()
+        logger.info("Reformulação pendente: %d notícias reformuladas, %d restantes", reformulated, remaining)
+        return {"reformulated": reformulated, "remaining": remaining}
 
     def process_latest_first_item(self) -> dict:
         """
         1. Fetch list of latest items
-        2. Read first item
+        2. Read first item (skipped if already stored)
         3. Store source item
         4. Ask Gemini to reformulate to question <=96 chars
-        5. Send to external API and save response
-        Returns dict with operation result.
+        5. Store item and enqueue delivery to the external API in one transaction
+           (sent by the outbox worker)
+        Returns dict with operation result. When run as a job, each step's
+        duration is recorded (see services/job_service.py).
         """
-        items = self.fetcher.fetch_latest_list()
-        if not items:
+        with stage("fetch"):
+            first = next(iter(self.fetcher.iter_latest_items()), None)
+        if first is None:
             raise RuntimeError("Nenhum item encontrado no portal de notícias")
 
-        title, url, author = items[0]
+        title, url, author = first
         logger.info("Found latest item: %s (Autor: %s)", title, author)
 
-        # Save source
-        news = self.repo.create(source_title=title, source_url=url, author=author)
+        with stage("dedupe"):
+            existing = self.find_existing(title, url)
+        if existing is not None:
+            logger.info("Latest item already stored (id=%s); nothing to do", existing.id)
+            return {
+                "news_id": existing.id,
+                "question_title": existing.question_title,
+                "external_response": None,
+                "status": "unchanged"
+            }
+        with stage("reformulate"):
+            question = self._reformulate(title)
+        with stage("persist"):
+            return self._persist([(title, url, author, question)])[0]
 
+    def _reformulate(self, title: str) -> str:
         try:
-            question = self.gemini.reformulate_to_question(title, max_chars=96)
+            return self.gemini.reformulate_to_question(title, max_chars=96)
+        except (CircuitOpenError, RateLimitExceeded) as e:
+            logger.warning("Gemini indisponível (%s); usando pergunta local", e)
+            return self._fallback_question(title)
         except Exception as e:
             logger.exception("Erro ao chamar Gemini: %s", e)
-            question = safe_truncate(title, 96)
-            # ensure it's a question
-            if not question.endswith("?"):
-                question = question.rstrip(".!;:,") + "?"
-        # update item
-        news = self.repo.update(news, question_title=question)
-
-        # send to external API
-        payload = {
-            "texto": news.question_title,  # Campo que a API externa espera
-            "id": news.id,
-            "source_title": news.source_title,
-            "question_title": news.question_title,
-            "source_url": news.source_url,
-            "author": news.author
-        }
+            return self._fallback_question(title)
+
+    def _reformulate_many(self, titles: List[str]) -> List[str]:
+        """
+        Reformulates all titles with batched Gemini calls; titles Gemini could not
+        reformulate (see GeminiClient.reformulate_many) fall back to local truncation.
+        """
+        if not titles:
+            return []
         try:
-            external_resp = self.external.send_question(payload)
+            questions = self.gemini.reformulate_many(titles, max_chars=96)
         except Exception as e:
-            logger.exception("Erro ao enviar para API externa: %s", e)
-            external_resp = {"error": str(e)}
+            logger.exception("Erro ao chamar Gemini em lote: %s", e)
+            questions = [None] * len(titles)
+        return [
+            question if question is not None else self._fallback_question(title)
+            for title, question in zip(titles, questions)
+        ]
+
+    @staticmethod
+    def _fallback_question(title: str) -> str:
+        question = safe_truncate(title, 96)
+        # ensure it's a question
+        if not question.endswith("?"):
+            question = question.rstrip(".!;:,") + "?"
+        return question
 
-        news = self.repo.update(news, external_response=str(external_resp))
+    @staticmethod
+    def _delivery_payload(news_id: int, title: str, url: Optional[str], author: Optional[str], question: str) -> dict:
+        # payload for the external API
         return {
-            "news_id": news.id,
-            "question_title": news.question_title,
-            "external_response": external_resp
+            "texto": question,  # Campo que a API externa espera
+            "id": news_id,
+            "source_title": title,
+            "question_title": question,
+            "source_url": url,
+            "author": author
         }
+
+    def _persist(self, items: List[Tuple[str, Optional[str], Optional[str], str]], wake_worker: bool = True) -> List[dict]:
+        """
+        Stores already reformulated items (title, url, author, question) and their
+        deliveries with a single commit. Remote calls must be done before this point,
+        so the write transaction stays short and no partially filled row is ever visible.
+        With wake_worker=False the caller delivers the messages itself (see process_new_items).
+        """
+        if not items:
+            return []
+        deliver = bool(self.external.base_url)
+        results = []
+        with self.unit_of_work() as uow:
+            for title, url, author, question in items:
+                news_id = uow.news.insert_if_absent(source_title=title, source_url=url, author=author, question_title=question)
+                if news_id is None:
+                    # Stored concurrently by another run: the unique url_key rejected the insert
+                    existing = uow.news.get_by_source_url(url)
+                    logger.info("Item already stored (id=%s); skipping", existing.id if existing else None)
+                    results.append({
+                        "news_id": existing.id if existing else None,
+                        "question_title": existing.question_title if existing else None,
+                        "external_response": None,
+                        "status": "unchanged"
+                    })
+                    continue
+                external_resp = {"status": "skipped", "reason": "EXTERNAL_API_URL não configurada"}
+                if deliver:
+                    message = uow.news.enqueue_delivery(news_id, self._delivery_payload(news_id, title, url, author, question))
+                    external_resp = {"status": "queued", "outbox_id": message.id}
+                results.append({
+                    "news_id": news_id,
+                    "question_title": question,
+                    "external_response": external_resp
+                })
+            uow.commit()
+
+        if deliver and wake_worker and self.outbox_worker is not None:
+            self.outbox_worker.wake()
+        return results
@@ -0,0 +1,159 @@
+"""
+Worker de entrega do outbox para a API externa.
+Roda em uma thread em segundo plano, reserva mensagens vencidas em lotes e as envia
+com um pool limitado de threads. Falhas são repetidas com backoff exponencial e jitter;
+o id da notícia vai como chave de idempotência, então repetições não duplicam o registro remoto.
+Uma recusa da API (4xx, DeliveryRejected) não é repetida: a mensagem vai direto para DEAD.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Dict, Optional
+from core.outbox_repository import OutboxRepository
+from clients.external_client import DeliveryRejected, ExternalClient
+from config.config import Config
+from utils.utils import utcnow
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDeliveryWorker:
+    def __init__(
+        self,
+        external: Optional[ExternalClient] = None,
+        max_workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.external = external or ExternalClient()
+        self.max_workers = max(1, max_workers or Config.OUTBOX_WORKERS)
+        self.batch_size = batch_size or Config.OUTBOX_BATCH_SIZE
+        self.poll_interval = poll_interval or Config.OUTBOX_POLL_INTERVAL
+        self.max_attempts = max_attempts or Config.OUTBOX_MAX_ATTEMPTS
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def idempotency_key(news_id: int) -> str:
+        return f"news-{news_id}"
+
+    def retry_delay(self, attempts: int) -> float:
+        """
+        Backoff exponencial com jitter ("equal jitter") a partir da tentativa já feita.
+        """
+        ceiling = min(Config.OUTBOX_BACKOFF_MAX, Config.OUTBOX_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="outbox-send")
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+        logger.info("Outbox worker iniciado (%d envios simultâneos)", self.max_workers)
+
+    def wake(self):
+        """
+        Antecipa a próxima varredura (ex.: logo após gravar uma nova mensagem).
+        """
+        self._wake.set()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delivered = self.drain_once()
+            except Exception:
+                logger.exception("Erro no worker do outbox")
+                delivered = 0
+            # Lote cheio: provavelmente há mais mensagens prontas, então não espera
+            if delivered < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def drain_once(self) -> int:
+        """
+        Reserva um lote de mensagens vencidas e as entrega. Retorna quantas foram processadas.
+        """
+        repo = OutboxRepository()
+        try:
+            messages = repo.claim_due(self.batch_size, Config.OUTBOX_LEASE_SECONDS)
+            if not messages:
+                return 0
+            executor = self._executor or ThreadPoolExecutor(max_workers=self.max_workers)
+            try:
+                futures = {
+                    executor.submit(self._send, message.news_id, message.payload): message
+                    for message in messages
+                }
+                for future in as_completed(futures):
+                    message = futures[future]
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        self._record_failure(repo, message, e)
+                    else:
+                        repo.mark_sent(message, response)
+            finally:
+                if executor is not self._executor:
+                    executor.shutdown(wait=True)
+            return len(messages)
+        finally:
+            repo.close()
+
+    def deliver(self, message_id: int) -> Optional[Dict]:
+        """
+        Entrega imediata de uma mensagem recém-gravada, fora da varredura (etapa "deliver"
+        do pipeline). Retorna a resposta da API externa, ou None se outro consumidor já
+        reservou a mensagem ou se o envio falhou; a falha segue o backoff normal do outbox.
+        Usa a sessão da thread atual, que deve ser descartada por quem chama.
+        """
+        repo = OutboxRepository()
+        message = repo.claim(message_id, Config.OUTBOX_LEASE_SECONDS)
+        if message is None:
+            return None
+        try:
+            response = self._send(message.news_id, message.payload)
+        except Exception as e:
+            self._record_failure(repo, message, e)
+            return None
+        repo.mark_sent(message, response)
+        return response
+
+    def _send(self, news_id: int, payload: str) -> Dict:
+        return self.external.send_question(json.loads(payload), idempotency_key=self.idempotency_key(news_id))
+
+    def _record_failure(self, repo: OutboxRepository, message, exc: Exception):
+        attempts = message.attempts + 1
+        error = str(exc)
+        if isinstance(exc, DeliveryRejected):
+            logger.error("Entrega da notícia %s recusada pela API externa: %s", message.news_id, error)
+            repo.mark_failed(message, error, retry_at=None)
+            return
+        if attempts >= self.max_attempts:
+            logger.error("Entrega da notícia %s abandonada após %d tentativas: %s", message.news_id, attempts, error)
+            repo.mark_failed(message, error, retry_at=None)
+            return
+        delay = self.retry_delay(attempts)
+        logger.warning("Falha ao entregar notícia %s (tentativa %d): %s; nova tentativa em %.0fs",
+                       message.news_id, attempts, error, delay)
+        repo.mark_failed(message, error, retry_at=utcnow() + timedelta(seconds=delay))
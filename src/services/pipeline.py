@@ -0,0 +1,258 @@
+"""
+Pipeline em etapas ligadas por filas limitadas, cada etapa com seu próprio número de
+threads: as latências das etapas lentas (Gemini, API externa) se sobrepõem em vez de
+se somarem, e a fila cheia segura a etapa anterior (backpressure).
+
+Cada etapa recebe um item e retorna o item da próxima etapa, ou None para descartá-lo.
+Uma etapa `batch` é uma barreira: recebe de uma vez a lista de todos os itens da etapa
+anterior e retorna a lista de saída (ex.: ordenação). Uma etapa com `batch_size` recebe
+micro-lotes de até batch_size itens, na ordem da fila, e retorna a lista de saída de cada
+um (ex.: uma chamada ao Gemini por lote); o lote fecha quando enche, quando a etapa
+anterior termina ou `batch_wait` segundos após o primeiro item, e as threads da etapa
+processam lotes diferentes ao mesmo tempo.
+Um erro em um item é registrado na estatística da etapa e só descarta aquele item;
+um erro na leitura da origem ou em uma etapa em lote é levantado por Pipeline.run, depois
+que os itens já recebidos passaram pelas etapas, para que o job que roda o pipeline falhe.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from core.db import session_scope
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    batch: bool = False
+    batch_size: int = 0
+    batch_wait: float = 0.0
+    # Estatísticas preenchidas durante a execução
+    received: int = 0
+    emitted: int = 0
+    dropped: int = 0
+    failed: int = 0
+    max_queue_depth: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    # Uma thread por vez monta o seu micro-lote, para que os lotes saiam cheios e em ordem
+    _collect_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def stats(self) -> Dict[str, Any]:
+        seconds = (self.finished_at or time.perf_counter()) - self.started_at if self.started_at else 0.0
+        return {
+            "workers": self.workers,
+            "received": self.received,
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "seconds": round(seconds, 4),
+            "throughput": round(self.received / seconds, 2) if seconds > 0 else None,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], queue_size: int = 100, source_name: str = "fetch"):
+        if not stages:
+            raise ValueError("O pipeline precisa de ao menos uma etapa")
+        self.stages = stages
+        self.queue_size = queue_size
+        # A leitura da origem também aparece nas estatísticas, como uma etapa de uma thread
+        self.source = Stage(name=source_name, func=lambda item: item)
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._results: List[Any] = []
+        self._results_lock = threading.Lock()
+        # Primeiro erro da origem ou de uma etapa em lote, levantado ao final de run()
+        self._error: Optional[BaseException] = None
+
+    def run(self, source: Iterable[Any]) -> List[Any]:
+        """
+        Passa todos os itens de `source` pelas etapas e retorna as saídas da última
+        (na ordem em que terminaram). Bloqueia até o fim; se a origem ou uma etapa em lote
+        falhou, levanta o erro (as estatísticas continuam disponíveis em stats()).
+        """
+        threads = [threading.Thread(target=self._read_source, args=(source,), name=f"pipeline-{self.source.name}")]
+        for index, stage in enumerate(self.stages):
+            count = 1 if stage.batch else max(1, stage.workers)
+            stage.workers = count
+            remaining = [count]
+            for n in range(count):
+                threads.append(threading.Thread(
+                    target=self._work, args=(index, remaining), name=f"pipeline-{stage.name}-{n}",
+                ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._results
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.stats() for stage in [self.source, *self.stages]}
+
+    def _put(self, index: int, item: Any):
+        if index == len(self.stages):
+            with self._results_lock:
+                self._results.append(item)
+            return
+        target = self._queues[index]
+        target.put(item)
+        stage = self.stages[index]
+        depth = target.qsize()
+        if depth > stage.max_queue_depth:
+            with stage._lock:
+                stage.max_queue_depth = max(stage.max_queue_depth, depth)
+
+    def _finish(self, index: int):
+        # Um marcador de fim para cada thread da etapa seguinte
+        if index < len(self.stages):
+            for _ in range(self.stages[index].workers):
+                self._queues[index].put(_DONE)
+
+    def _fail(self, error: BaseException):
+        with self._results_lock:
+            if self._error is None:
+                self._error = error
+
+    def _read_source(self, source: Iterable[Any]):
+        stage = self.source
+        stage.started_at = time.perf_counter()
+        try:
+            for item in source:
+                stage.received += 1
+                stage.emitted += 1
+                self._put(0, item)
+        except Exception as e:
+            stage.failed += 1
+            logger.exception("Erro na etapa %s do pipeline", stage.name)
+            self._fail(e)
+        finally:
+            stage.finished_at = time.perf_counter()
+            self._finish(0)
+
+    def _work(self, index: int, remaining: List[int]):
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        try:
+            # Cada thread usa a sua sessão, descartada ao final
+            with session_scope():
+                if stage.batch:
+                    self._run_batch(index, stage, inbox)
+                elif stage.batch_size > 0:
+                    self._run_micro_batches(index, stage, inbox)
+                else:
+                    self._run_items(index, stage, inbox)
+        finally:
+            with stage._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+                if last and stage.started_at is not None:
+                    stage.finished_at = time.perf_counter()
+            if last:
+                self._finish(index + 1)
+
+    def _run_items(self, index: int, stage: Stage, inbox: queue.Queue):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            with stage._lock:
+                # O tempo da etapa conta a partir do primeiro item, sem a espera inicial
+                if stage.started_at is None:
+                    stage.started_at = time.perf_counter()
+                stage.received += 1
+            try:
+                output = stage.func(item)
+            except Exception:
+                logger.exception("Erro na etapa %s do pipeline", stage.name)
+                with stage._lock:
+                    stage.failed += 1
+                continue
+            with stage._lock:
+                if output is None:
+                    stage.dropped += 1
+                else:
+                    stage.emitted += 1
+            if output is not None:
+                self._put(index + 1, output)
+
+    def _run_batch(self, index: int, stage: Stage, inbox: queue.Queue):
+        items = []
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            items.append(item)
+        stage.received = len(items)
+        stage.started_at = time.perf_counter()
+        try:
+            outputs = stage.func(items) if items else []
+        except Exception as e:
+            logger.exception("Erro na etapa %s do pipeline", stage.name)
+            stage.failed = len(items)
+            self._fail(e)
+            return
+        stage.emitted = len(outputs)
+        stage.dropped = len(items) - len(outputs)
+        for output in outputs:
+            self._put(index + 1, output)
+
+    def _collect(self, stage: Stage, inbox: queue.Queue):
+        # Retorna (lote, fim): o lote fecha cheio, no fim da etapa anterior ou após batch_wait
+        items = []
+        deadline = None
+        while len(items) < stage.batch_size:
+            timeout = None if deadline is None else deadline - time.perf_counter()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                item = inbox.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return items, True
+            items.append(item)
+            if deadline is None:
+                deadline = time.perf_counter() + stage.batch_wait
+        return items, False
+
+    def _run_micro_batches(self, index: int, stage: Stage, inbox: queue.Queue):
+        done = False
+        while not done:
+            with stage._collect_lock:
+                items, done = self._collect(stage, inbox)
+            if not items:
+                continue
+            with stage._lock:
+                if stage.started_at is None:
+                    stage.started_at = time.perf_counter()
+                stage.received += len(items)
+            try:
+                outputs = stage.func(items)
+            except Exception as e:
+                # Como na etapa batch, os itens do lote se perdem: o erro é levantado por run()
+                logger.exception("Erro na etapa %s do pipeline", stage.name)
+                with stage._lock:
+                    stage.failed += len(items)
+                self._fail(e)
+                continue
+            with stage._lock:
+                stage.emitted += len(outputs)
+                stage.dropped += len(items) - len(outputs)
+            for output in outputs:
+                self._put(index + 1, output)
@@ -1,24 +1,170 @@
+"""
+Agendador da coleta de notícias com intervalo adaptativo.
+
+Cada coleta agenda a próxima (DateTrigger): se encontrou notícias novas, volta ao
+intervalo mínimo; se o portal não mudou (ou a coleta falhou), o intervalo cresce
+exponencialmente até o máximo. O horário sorteado recebe jitter e, se cair nas horas
+de silêncio, é adiado para o fim delas.
+
+O job fica em um job store persistente (tabela apscheduler_jobs no banco da aplicação),
+junto com o intervalo atual: após um reinício, a coleta perdida roda uma única vez
+(coalesce) e o backoff continua de onde parou.
+"""
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+import random
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Optional, Tuple
+from zoneinfo import ZoneInfo
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
 from config.config import Config
+from core.db import engine, session_scope
 import logging
 
 logger = logging.getLogger(__name__)
 
+POLL_JOB_ID = "news_poll"
+
+# O job store guarda só a referência textual do job; ele encontra o serviço em execução aqui
+_active_service: Optional["SchedulerService"] = None
+
+
+def poll_news(interval: float):
+    """
+    Job de coleta registrado no job store (precisa ser uma função de módulo).
+    `interval` é o intervalo, em segundos, que levou até esta execução.
+    """
+    if _active_service is None:
+        logger.warning("Coleta agendada sem SchedulerService ativo; ignorada")
+        return
+    _active_service.poll(interval)
+
+
+def parse_quiet_hours(value: Optional[str]) -> Optional[Tuple[time, time]]:
+    """
+    "22:00-06:00" -> (22:00, 06:00). A janela pode atravessar a meia-noite; vazio = sem silêncio.
+    """
+    if not value or not value.strip():
+        return None
+    start, end = (time.fromisoformat(part.strip()) for part in value.split("-", 1))
+    return start, end
+
+
 class SchedulerService:
-    def __init__(self):
-        self.scheduler = BackgroundScheduler(timezone=Config.SCHEDULER_TIMEZONE)
+    def __init__(
+        self,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        backoff_factor: Optional[float] = None,
+        jitter: Optional[float] = None,
+        quiet_hours: Optional[str] = None,
+        jobstore_url: Optional[str] = None,
+    ):
+        self.min_interval = min_interval or Config.SCHEDULER_POLL_MIN_INTERVAL
+        self.max_interval = max(self.min_interval, max_interval or Config.SCHEDULER_POLL_MAX_INTERVAL)
+        self.backoff_factor = backoff_factor or Config.SCHEDULER_POLL_BACKOFF_FACTOR
+        self.jitter = Config.SCHEDULER_POLL_JITTER if jitter is None else jitter
+        self.quiet_hours = parse_quiet_hours(Config.SCHEDULER_QUIET_HOURS if quiet_hours is None else quiet_hours)
+        self.timezone = ZoneInfo(Config.SCHEDULER_TIMEZONE)
+        jobstore_url = jobstore_url or Config.SCHEDULER_JOBSTORE_URL
+        # Sem URL própria, usa o engine (e o pool) da aplicação
+        jobstore = SQLAlchemyJobStore(url=jobstore_url) if jobstore_url else SQLAlchemyJobStore(engine=engine)
+        self.scheduler = BackgroundScheduler(
+            timezone=self.timezone,
+            jobstores={"default": jobstore},
+            job_defaults={
+                # Execuções perdidas (processo parado) viram uma só, rodada ao reiniciar
+                "coalesce": True,
+                "misfire_grace_time": Config.SCHEDULER_MISFIRE_GRACE_SECONDS or None,
+                "max_instances": 1,
+            },
+        )
+        self._func: Optional[Callable[[], Any]] = None
 
-    def start_weekly_monday_9am(self, func):
-        # Monday at 9:00
-        trigger = CronTrigger(day_of_week='mon', hour=9, minute=0)
-        self.scheduler.add_job(func, trigger, id="monday_9am_job", replace_existing=True)
+    def start_adaptive_polling(self, func: Callable[[], Any]):
+        """
+        Inicia o agendador chamando `func` (ex.: NewsService.process_new_items, que
+        retorna {"processed": n}) no intervalo adaptativo. Um job já persistido é mantido.
+        """
+        global _active_service
+        self._func = func
+        _active_service = self
         self.scheduler.start()
-        logger.info("Scheduler started: job scheduled every Monday at 9:00 (%s)", Config.SCHEDULER_TIMEZONE)
+        job = self.scheduler.get_job(POLL_JOB_ID)
+        if job is None:
+            self._schedule(self.min_interval, delay=0)
+        else:
+            logger.info("Coleta retomada do job store: próxima em %s", job.next_run_time)
+        logger.info(
+            "Scheduler started: polling every %.0fs to %.0fs (%s)",
+            self.min_interval, self.max_interval, Config.SCHEDULER_TIMEZONE,
+        )
+
+    def poll(self, interval: float):
+        """
+        Executa uma coleta e agenda a próxima conforme o resultado.
+        """
+        found = False
+        try:
+            # Cada execução usa uma sessão própria, descartada ao final
+            with session_scope():
+                result = self._func()
+            found = bool(isinstance(result, dict) and result.get("processed"))
+        except Exception:
+            logger.exception("Coleta agendada falhou")
+        next_interval = self.next_interval(interval, found)
+        self._schedule(next_interval, delay=next_interval)
+
+    def next_interval(self, interval: float, found: bool) -> float:
+        if found:
+            return self.min_interval
+        return min(self.max_interval, max(self.min_interval, interval * self.backoff_factor))
+
+    def next_run_time(self, delay: float, now: Optional[datetime] = None) -> datetime:
+        """
+        Momento da próxima coleta: agora + delay com jitter (± fração), fora das horas de silêncio.
+        """
+        now = now or datetime.now(self.timezone)
+        if delay and self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return self._after_quiet_hours(now + timedelta(seconds=max(0.0, delay)))
+
+    def _after_quiet_hours(self, moment: datetime) -> datetime:
+        if self.quiet_hours is None:
+            return moment
+        start, end = self.quiet_hours
+        current = moment.time()
+        if start <= end:
+            quiet = start <= current < end
+        else:
+            quiet = current >= start or current < end
+        if not quiet:
+            return moment
+        resume = moment.replace(hour=end.hour, minute=end.minute, second=0, microsecond=0)
+        if resume <= moment:
+            resume += timedelta(days=1)
+        return resume
+
+    def _schedule(self, interval: float, delay: float):
+        # Chamado de dentro do próprio job: o agendador só remove o job disparado (DateTrigger
+        # sem próxima execução) segurando o lock dos job stores, que add_job também usa,
+        # então o job substituto nunca é removido por engano
+        run_at = self.next_run_time(delay)
+        self.scheduler.add_job(
+            poll_news,
+            DateTrigger(run_date=run_at),
+            id=POLL_JOB_ID,
+            kwargs={"interval": interval},
+            replace_existing=True,
+        )
+        logger.info("Próxima coleta em %s (intervalo %.0fs)", run_at.isoformat(timespec="seconds"), interval)
 
     def shutdown(self):
+        global _active_service
         self.scheduler.shutdown(wait=False)
+        if _active_service is self:
+            _active_service = None
@@ -0,0 +1,32 @@
+"""
+Codificação JSON das respostas da API e da exportação. Usa orjson quando instalado
+(serializa datetime em ISO 8601 nativamente) e, sem ele, o módulo json com a mesma
+saída compacta em UTF-8.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Objeto do tipo {type(value).__name__} não é serializável em JSON")
+
+
+def dumps(value: Any) -> bytes:
+    """
+    JSON compacto (sem espaços) em bytes UTF-8, com caracteres não ASCII preservados.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
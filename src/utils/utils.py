@@ -1,3 +1,10 @@
+import hashlib
+import unicodedata
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
 def safe_truncate(text: str, max_chars: int) -> str:
     if len(text) <= max_chars:
         return text
@@ -5,3 +12,55 @@ def safe_truncate(text: str, max_chars: int) -> str:
     if " " in short:
         short = short.rsplit(" ", 1)[0]
     return short
+
+
+def utcnow() -> datetime:
+    """
+    Data/hora atual em UTC, sem fuso (formato das colunas DateTime sem timezone).
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def normalize_title(text: str) -> str:
+    """
+    Normaliza um título para comparação: Unicode NFKC, caixa e espaços.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def title_hash(text: str) -> str:
+    """
+    Hash (sha256 hex) do título normalizado, usado para reconhecer o mesmo conteúdo.
+    """
+    return hashlib.sha256(normalize_title(text).encode("utf-8")).hexdigest()
+
+
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
+    """
+    Forma canônica de uma URL para a chave de unicidade das notícias:
+    esquema https, host em minúsculas sem "www." e sem porta padrão, sem fragmento,
+    sem barra final, sem parâmetros de rastreamento e com a query ordenada.
+    """
+    if not url or not url.strip():
+        return None
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme == "http":
+        scheme = "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host
+    if parts.port and parts.port != _DEFAULT_PORTS.get(parts.scheme.lower()):
+        netloc = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PARAMS)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
@@ -0,0 +1,15 @@
+"""
+Configuração comum dos testes: banco SQLite temporário, cache HTTP desativado e
+cache do Gemini em diretório temporário.
+As variáveis precisam ser definidas antes de importar config.config.
+"""
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+_db_dir = tempfile.mkdtemp(prefix="leitura_portal_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["HTTP_CACHE_ENABLED"] = "false"
+os.environ["GEMINI_CACHE_PATH"] = os.path.join(_db_dir, "gemini_cache.sqlite3")
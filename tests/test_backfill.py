@@ -0,0 +1,118 @@
+"""
+Testes da carga histórica (backfill) com páginas simuladas e banco SQLite temporário.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+from core.db import Base, ScopedSession, engine, init_db
+from core.news_repository import NewsRepository
+from models.models import OutboxMessage
+from services.backfill_service import BackfillService
+from services.news_service import NewsService
+
+PORTAL_URL = "https://www.recife.pe.leg.br/comunicacao/noticias"
+
+
+class FakePagedFetcher:
+    def __init__(self, pages, fail_on=None):
+        self.portal_url = PORTAL_URL
+        self.pages = pages
+        self.fail_on = fail_on
+        self.requested = []
+
+    def fetch_listing_page(self, page):
+        self.requested.append(page)
+        if page == self.fail_on:
+            raise RuntimeError("Falha ao conectar com o portal")
+        return self.pages[page] if page < len(self.pages) else []
+
+
+def make_pages(count, per_page=3):
+    return [
+        [(f"Notícia {p}-{i}", f"{PORTAL_URL}/{p}/{i}", "Câmara Municipal do Recife") for i in range(per_page)]
+        for p in range(count)
+    ]
+
+
+@pytest.fixture
+def repo():
+    init_db()
+    yield NewsRepository()
+    ScopedSession.remove()
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_backfill_inserts_all_pages_in_batches(repo, tmp_path):
+    service = BackfillService(
+        repository=repo, fetcher=FakePagedFetcher(make_pages(5)), batch_size=4, concurrency=2,
+        checkpoint_path=str(tmp_path / "checkpoint.json"),
+    )
+    result = service.run()
+
+    assert result["done"] is True
+    assert result["inserted"] == 15
+    # Arquivo lido do fim para o início: os ids seguem a ordem cronológica da listagem
+    assert [it.source_title for it in repo.list()] == [f"Notícia {p}-{i}" for p in range(5) for i in range(3)]
+
+
+def test_backfill_resumes_from_checkpoint_without_duplicates(repo, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.json")
+    pages = make_pages(6)
+
+    crashing = BackfillService(
+        repository=repo, fetcher=FakePagedFetcher(pages, fail_on=3), batch_size=6, concurrency=1,
+        checkpoint_path=checkpoint,
+    )
+    with pytest.raises(RuntimeError):
+        crashing.run()
+    # Páginas 5 e 4 gravadas; a retomada começa na 3, sem procurar o fim do arquivo de novo
+    assert crashing.load_checkpoint()["next_page"] == 3
+
+    fetcher = FakePagedFetcher(pages)
+    result = BackfillService(
+        repository=repo, fetcher=fetcher, batch_size=6, concurrency=1, checkpoint_path=checkpoint,
+    ).run()
+
+    assert fetcher.requested[0] == 3
+    assert result["done"] is True
+    assert len(repo.list()) == 18
+
+
+class FlakyGemini:
+    """Reformula só os títulos de `allowed`; os demais ficam sem resposta (cota esgotada)."""
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+
+    def reformulate_many(self, titles, max_chars=96):
+        return [f"Você acompanha: {title}?" if title in self.allowed else None for title in titles]
+
+
+class FakeExternal:
+    base_url = "https://external.example.com/receive"
+
+
+def test_backfilled_rows_are_reformulated_on_request(repo, tmp_path):
+    BackfillService(
+        repository=repo, fetcher=FakePagedFetcher(make_pages(2)), batch_size=10,
+        checkpoint_path=str(tmp_path / "checkpoint.json"),
+    ).run()
+    assert all(it.question_title is None for it in repo.list())
+
+    service = NewsService(repository=repo, fetcher=FakePagedFetcher([]), external=FakeExternal(),
+                          gemini=FlakyGemini({"Notícia 1-2", "Notícia 1-1"}))
+    result = service.reformulate_pending(limit=4)
+
+    # Sem resposta do Gemini, a notícia continua pendente em vez de receber a pergunta local
+    assert result == {"reformulated": 2, "remaining": 4}
+    questions = {it.source_title: it.question_title for it in repo.list()}
+    assert questions["Notícia 1-2"] == "Você acompanha: Notícia 1-2?"
+    assert questions["Notícia 1-0"] is None
+    # O arquivo histórico não é reenviado à API externa por padrão
+    assert ScopedSession().query(OutboxMessage).count() == 0
+
+    service.gemini = FlakyGemini({f"Notícia {p}-{i}" for p in range(2) for i in range(3)})
+    assert service.reformulate_pending(deliver=True) == {"reformulated": 4, "remaining": 0}
+    assert ScopedSession().query(OutboxMessage).count() == 4
@@ -0,0 +1,104 @@
+"""
+Testes do gerenciamento de sessões por thread (ScopedSession / session_scope)
+e dos perfis de armazenamento do engine.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import threading
+import pytest
+from core.db import (
+    Base, ScopedSession, create_db_engine, engine, init_db, normalize_database_url,
+    session_scope, with_session_scope,
+)
+from core.news_repository import NewsRepository
+
+
+@pytest.fixture
+def repo():
+    init_db()
+    yield NewsRepository()
+    ScopedSession.remove()
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_each_thread_gets_its_own_session(repo):
+    sessions = {}
+
+    def worker(name):
+        with session_scope() as session:
+            sessions[name] = session
+            repo.create(source_title=f"Notícia {name}", source_url=f"https://exemplo.com/{name}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(s) for s in sessions.values()}) == 4
+    assert ScopedSession() not in sessions.values()
+    assert len(repo.list()) == 4
+
+
+def test_session_scope_discards_the_thread_session(repo):
+    with session_scope() as first:
+        assert ScopedSession() is first
+    assert ScopedSession() is not first
+
+
+def test_with_session_scope_removes_session_after_job(repo):
+    seen = []
+
+    @with_session_scope
+    def job():
+        seen.append(ScopedSession())
+        return repo.create(source_title="Agendada").id
+
+    assert job() == 1
+    assert ScopedSession() is not seen[0]
+    assert repo.get(1).source_title == "Agendada"
+
+
+def test_shared_repository_is_safe_across_threads(repo):
+    errors = []
+
+    def worker(offset):
+        try:
+            with session_scope():
+                for i in range(10):
+                    repo.create(source_title=f"T{offset}-{i}", source_url=f"https://exemplo.com/{offset}/{i}")
+                    repo.get_by_source_url(f"https://exemplo.com/{offset}/{i}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(repo.list(limit=100)) == 40
+
+
+def test_tuned_sqlite_profile_sets_pragmas(tmp_path):
+    tuned = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile="tuned")
+    default = create_db_engine(f"sqlite:///{tmp_path / 'default.db'}", profile="default")
+    try:
+        with tuned.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        with default.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+    finally:
+        tuned.dispose()
+        default.dispose()
+
+
+def test_database_url_profile_selection():
+    assert normalize_database_url("postgres://u:p@db/news") == "postgresql://u:p@db/news"
+    with pytest.raises(ValueError):
+        create_db_engine("sqlite://", profile="turbo")
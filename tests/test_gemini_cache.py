@@ -0,0 +1,164 @@
+"""
+Testes do cache de perguntas do Gemini (sem acesso à rede).
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import time
+import pytest
+import requests
+from clients.gemini_cache import ReformulationCache
+from clients.gemini_client import PROMPT_VERSION, GeminiClient
+from clients.resilience import RateLimitExceeded
+
+
+class CountingGemini(GeminiClient):
+    def __init__(self, cache):
+        super().__init__(api_key="teste", cache=cache)
+        self.remote_calls = 0
+
+    def _reformulate_remote(self, text, max_chars):
+        self.remote_calls += 1
+        return f"Você concorda com {text.strip()}?"
+
+
+def test_normalized_titles_hit_the_cache(tmp_path):
+    client = CountingGemini(ReformulationCache(str(tmp_path / "cache.sqlite3")))
+
+    first = client.reformulate_to_question("Câmara aprova  orçamento", max_chars=96)
+    second = client.reformulate_to_question("  CÂMARA aprova orçamento ", max_chars=96)
+
+    assert first == second
+    assert client.remote_calls == 1
+    assert client.cache.stats()["hits"] == 1
+
+
+def test_max_chars_is_part_of_the_key(tmp_path):
+    client = CountingGemini(ReformulationCache(str(tmp_path / "cache.sqlite3")))
+    client.reformulate_to_question("Câmara aprova orçamento", max_chars=96)
+    client.reformulate_to_question("Câmara aprova orçamento", max_chars=64)
+    assert client.remote_calls == 2
+
+
+def test_entries_survive_restart_and_lru_evicts(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ReformulationCache(path, max_entries=2)
+    cache.put("a", "A?")
+    cache.put("b", "B?")
+    cache.get("a")
+    cache.put("c", "C?")  # remove "b", o menos usado recentemente
+
+    reopened = ReformulationCache(path, max_entries=2)
+    assert reopened.get("a") == "A?"
+    assert reopened.get("b") is None
+    assert reopened.get("c") == "C?"
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = ReformulationCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0.01)
+    cache.put("a", "A?")
+    time.sleep(0.05)
+    assert cache.get("a") is None
+
+
+class ScriptedGemini(GeminiClient):
+    """Devolve respostas pré-definidas para generateContent, sem acessar a rede."""
+
+    def __init__(self, cache, outputs):
+        super().__init__(api_key="teste", cache=cache)
+        self.outputs = list(outputs)
+        self.prompts = []
+
+    def _generate(self, prompt, max_output_tokens, response_mime_type=None):
+        self.prompts.append(prompt)
+        return self.outputs.pop(0)
+
+
+def test_reformulate_many_uses_one_call_per_batch(tmp_path):
+    batch = '[{"id": 1, "pergunta": "Você apoia a obra A"}, {"id": 2, "pergunta": "Você apoia a obra B?"}]'
+    client = ScriptedGemini(ReformulationCache(str(tmp_path / "cache.sqlite3")), [batch])
+
+    questions = client.reformulate_many(["Obra A", "Obra B", "Obra A"], max_chars=96)
+
+    assert questions == ["Você apoia a obra A?", "Você apoia a obra B?", "Você apoia a obra A?"]
+    assert len(client.prompts) == 1
+    # Resultados do lote também alimentam o cache
+    assert client.reformulate_to_question("Obra B", max_chars=96) == "Você apoia a obra B?"
+
+
+def test_malformed_batch_falls_back_to_single_calls(tmp_path):
+    client = ScriptedGemini(
+        ReformulationCache(str(tmp_path / "cache.sqlite3")),
+        ['[{"id": 1, "pergunta": "só uma"}]', "Você apoia a obra A", "Você apoia a obra B"],
+    )
+
+    questions = client.reformulate_many(["Obra A", "Obra B"], max_chars=96)
+
+    assert questions == ["Você apoia a obra A?", "Você apoia a obra B?"]
+    assert len(client.prompts) == 3
+
+
+def test_failed_batch_call_is_not_repeated_per_item(tmp_path):
+    class FailingGemini(ScriptedGemini):
+        def _generate(self, prompt, max_output_tokens, response_mime_type=None):
+            self.prompts.append(prompt)
+            raise requests.HTTPError("503 Service Unavailable")
+
+    client = FailingGemini(ReformulationCache(str(tmp_path / "cache.sqlite3")), [])
+
+    questions = client.reformulate_many(["Obra A", "Obra B", "Obra C"], max_chars=96, batch_size=3)
+
+    # Uma chamada com erro HTTP não vira três chamadas item a item contra a mesma falha
+    assert questions == [None, None, None]
+    assert len(client.prompts) == 1
+
+
+def test_empty_answers_are_not_cached(tmp_path):
+    client = ScriptedGemini(ReformulationCache(str(tmp_path / "cache.sqlite3")), ["", "Você apoia a obra A"])
+
+    with pytest.raises(ValueError):
+        client.reformulate_to_question("Obra A", max_chars=96)
+    assert client.reformulate_to_question("Obra A", max_chars=96) == "Você apoia a obra A?"
+    assert len(client.prompts) == 2
+
+
+def test_cache_can_be_disabled():
+    assert GeminiClient(api_key="teste", cache=None).cache is None
+
+
+def test_failed_chunk_keeps_resolved_questions(tmp_path):
+    cache = ReformulationCache(str(tmp_path / "cache.sqlite3"))
+    cache.put(cache.make_key("Obra C", 96, PROMPT_VERSION), "Você apoia a obra C?")
+
+    class ThrottledGemini(ScriptedGemini):
+        def _generate(self, prompt, max_output_tokens, response_mime_type=None):
+            if not self.outputs:
+                raise RateLimitExceeded("sem orçamento")
+            return super()._generate(prompt, max_output_tokens, response_mime_type)
+
+    batch = '[{"id": 1, "pergunta": "Você apoia a obra A"}, {"id": 2, "pergunta": "Você apoia a obra B"}]'
+    client = ThrottledGemini(cache, [batch])
+
+    questions = client.reformulate_many(["Obra A", "Obra B", "Obra C", "Obra D", "Obra E"], max_chars=96, batch_size=2)
+
+    assert questions == ["Você apoia a obra A?", "Você apoia a obra B?", "Você apoia a obra C?", None, None]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requer fork()")
+def test_forked_worker_opens_its_own_connection(tmp_path):
+    # Como no gunicorn com preload_app: o cache nasce no mestre e é herdado pelos workers
+    cache = ReformulationCache(str(tmp_path / "cache.sqlite3"))
+    inherited = cache._conn
+    pid = os.fork()
+    if pid == 0:
+        try:
+            cache.put("filho", "Pergunta do worker?")
+            os._exit(0 if cache._conn is not inherited else 1)
+        except BaseException:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.WEXITSTATUS(status) == 0
+    assert cache._conn is inherited
+    assert cache.get("filho") == "Pergunta do worker?"
@@ -0,0 +1,81 @@
+"""
+Testes do transporte HTTP compartilhado (novas tentativas e estatísticas por host).
+Não acessa a rede: as respostas da sessão são simuladas.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import io
+import pytest
+import requests
+from src.clients.http_transport import HttpTransport
+
+
+def make_response(status_code, headers=None):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp.raw = io.BytesIO(b"")
+    resp.headers.update(headers or {})
+    return resp
+
+
+def test_retries_on_503_then_succeeds(monkeypatch):
+    statuses = [503, 429, 200]
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
+    monkeypatch.setattr(requests.Session, "request", lambda self, method, url, **kw: make_response(statuses.pop(0)))
+
+    transport = HttpTransport(max_retries=3, backoff_factor=0.1, backoff_max=1)
+    resp = transport.get("https://portal.example.com/noticias")
+
+    assert resp.status_code == 200
+    assert len(sleeps) == 2
+    assert all(0 <= s <= 1 for s in sleeps)
+    stats = transport.stats()["portal.example.com"]
+    assert stats["requests"] == 3
+    assert stats["retries"] == 2
+    assert stats["last_status"] == 200
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda s: None)
+    monkeypatch.setattr(requests.Session, "request", lambda self, method, url, **kw: make_response(502))
+
+    transport = HttpTransport(max_retries=2)
+    resp = transport.get("https://portal.example.com/noticias")
+
+    assert resp.status_code == 502
+    assert transport.stats()["portal.example.com"]["requests"] == 3
+
+
+def test_connection_errors_are_raised_after_retries(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda s: None)
+
+    def refuse(self, method, url, **kw):
+        raise requests.ConnectionError("recusada")
+
+    monkeypatch.setattr(requests.Session, "request", refuse)
+
+    transport = HttpTransport(max_retries=1)
+    with pytest.raises(requests.ConnectionError):
+        transport.get("https://api.example.com/receive")
+    assert transport.stats()["api.example.com"]["errors"] == 2
+
+
+def test_post_is_only_retried_when_asked(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda s: None)
+    monkeypatch.setattr(requests.Session, "request", lambda self, method, url, **kw: make_response(503))
+
+    transport = HttpTransport(max_retries=3)
+    assert transport.post("https://api.example.com/receive").status_code == 503
+    assert transport.stats()["api.example.com"]["requests"] == 1
+
+    transport.post("https://api.example.com/receive", max_retries=1)
+    assert transport.stats()["api.example.com"]["requests"] == 3
+
+
+def test_reuses_one_session_per_host():
+    transport = HttpTransport()
+    assert transport._session_for("a.example.com") is transport._session_for("a.example.com")
+    assert transport._session_for("a.example.com") is not transport._session_for("b.example.com")
@@ -0,0 +1,151 @@
+"""
+Testes dos jobs em segundo plano (single-flight, etapas) e dos endpoints de disparo e estado.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import threading
+import time
+import pytest
+from flask import Flask
+from api import news_controller
+from api.news_controller import api
+from core.db import Base, engine, init_db
+from core.job_repository import JobRepository
+from services import job_service
+from services.job_service import Job, JobManager, stage
+from utils.utils import utcnow
+
+
+@pytest.fixture
+def manager():
+    init_db()
+    manager = JobManager(max_workers=2, history_size=3)
+    yield manager
+    manager.shutdown()
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_concurrent_submits_attach_to_the_running_job(manager):
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {"processed": 1}
+
+    first, created = manager.submit("ingest", work)
+    second, created_again = manager.submit("ingest", work)
+    assert created and not created_again
+    assert second is first and first.attached == 1
+
+    release.set()
+    assert first.wait(5)
+    assert calls == [1]
+    assert first.status == Job.SUCCEEDED and first.result == {"processed": 1}
+
+    third, created = manager.submit("ingest", work)
+    assert created and third.id != first.id
+    assert third.wait(5)
+
+
+def test_job_records_stage_timings_and_errors(manager):
+    def work():
+        with stage("fetch"):
+            pass
+        with stage("persist"):
+            raise RuntimeError("banco indisponível")
+
+    job, _ = manager.submit("ingest", work)
+    assert job.wait(5)
+
+    data = job.to_dict()
+    assert data["status"] == Job.FAILED and data["error"] == "banco indisponível"
+    assert list(data["stages"]) == ["fetch", "persist"]
+    assert data["duration"] >= 0 and data["finished_at"] is not None
+
+
+def test_finished_jobs_are_evicted_beyond_history_size(manager):
+    jobs = []
+    for n in range(5):
+        job, _ = manager.submit(f"job-{n}", lambda: None)
+        job.wait(5)
+        jobs.append(job)
+    assert manager.get(jobs[0].id) is None
+    assert manager.get(jobs[-1].id) is jobs[-1]
+
+
+def test_trigger_returns_202_and_job_status(manager, monkeypatch):
+    monkeypatch.setattr(job_service, "_default_manager", manager)
+    release = threading.Event()
+
+    def process():
+        release.wait(5)
+        return {"news_id": 1, "status": "unchanged"}
+
+    monkeypatch.setattr(news_controller.service, "process_new_items", process)
+    app = Flask(__name__)
+    api.init_app(app)
+    client = app.test_client()
+
+    first = client.post("/api/system/trigger")
+    second = client.post("/api/system/trigger")
+    assert first.status_code == second.status_code == 202
+    job_id = first.get_json()["id"]
+    assert second.get_json()["id"] == job_id
+    assert first.headers["Location"].endswith(f"/api/system/jobs/{job_id}")
+
+    release.set()
+    manager.get(job_id).wait(5)
+    status = client.get(f"/api/system/jobs/{job_id}").get_json()
+    assert status["status"] == "succeeded" and status["attached"] == 1
+    assert status["result"] == {"news_id": 1, "status": "unchanged"}
+    assert client.get("/api/system/jobs/desconhecido").status_code == 404
+
+
+def test_other_workers_see_and_attach_to_the_running_job(manager, monkeypatch):
+    # Outro worker do gunicorn: mesmo banco, memória própria
+    other = JobManager(max_workers=1, history_size=3)
+    monkeypatch.setattr(job_service.Config, "JOB_POLL_INTERVAL", 0.05)
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        with stage("fetch"):
+            release.wait(5)
+        return {"processed": 2}
+
+    job, created = manager.submit("ingest", work)
+    remote, created_elsewhere = other.submit("ingest", work)
+    assert created and not created_elsewhere
+    assert remote.id == job.id and remote.active
+    assert other.get(job.id).status in (Job.QUEUED, Job.RUNNING)
+
+    waiter = threading.Thread(target=lambda: calls.append(other.run("ingest", work)))
+    waiter.start()
+    while JobRepository().get(job.id).attached < 2:
+        time.sleep(0.01)
+    release.set()
+    waiter.join(5)
+
+    assert calls == [1, {"processed": 2}]
+    status = other.get(job.id).to_dict()
+    assert status["status"] == Job.SUCCEEDED and status["result"] == {"processed": 2}
+    assert status["attached"] == 2 and "fetch" in status["stages"]
+    assert manager.get(job.id).attached == 2
+    other.shutdown()
+
+
+def test_job_of_a_dead_worker_expires_and_frees_the_name(manager):
+    # Job deixado ativo por um processo que morreu sem renovar a reserva
+    JobRepository().create("abandonado", "ingest", Job.RUNNING, utcnow(), utcnow())
+
+    status = manager.get("abandonado").to_dict()
+    assert status["status"] == Job.FAILED and status["error"]
+
+    job, created = manager.submit("ingest", lambda: {"processed": 0})
+    assert created and job.id != "abandonado"
+    assert manager.wait(job, 5).status == Job.SUCCEEDED
@@ -0,0 +1,24 @@
+"""
+Testes da eleição do líder por lock de arquivo (um lease por processo/arquivo aberto).
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+from core import leader_lease
+from core.leader_lease import LeaderLease
+
+
+@pytest.mark.skipif(leader_lease.fcntl is None, reason="flock indisponível nesta plataforma")
+def test_only_one_lease_is_held_until_released(tmp_path):
+    path = str(tmp_path / "scheduler.lock")
+    leader, follower = LeaderLease(path), LeaderLease(path)
+
+    assert leader.acquire() and leader.acquire()
+    assert not follower.acquire() and not follower.held
+    assert open(path).read().strip() == str(os.getpid())
+
+    leader.release()
+    assert follower.acquire() and follower.held
+    follower.release()
@@ -0,0 +1,102 @@
+"""
+Testes do cache condicional (ETag / Last-Modified) da listagem do portal da Câmara.
+Não acessa a rede: as respostas HTTP são simuladas.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import requests
+from src.clients.recife_portal_fetcher import RecifePortalFetcher
+from src.clients.response_cache import ResponseCache
+
+PORTAL_URL = "https://www.recife.pe.leg.br/comunicacao/noticias"
+
+SAMPLE_HTML = """
+<html><body>
+  <article class="news-item">
+    <h4 class="title"><a href="/comunicacao/noticias/2025/10/primeira">Primeira notícia</a></h4>
+  </article>
+  <article class="news-item">
+    <h4 class="title"><a href="https://www.recife.pe.leg.br/comunicacao/noticias/2025/10/segunda">Segunda notícia</a></h4>
+  </article>
+</body></html>
+"""
+
+
+class FakeTransport:
+    def __init__(self, handler):
+        self.get = handler
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+def test_not_modified_returns_cached_items(tmp_path, monkeypatch):
+    calls = []
+    responses = [
+        FakeResponse(200, SAMPLE_HTML, {"ETag": '"v1"', "Last-Modified": "Mon, 20 Oct 2025 10:00:00 GMT"}),
+        FakeResponse(304),
+    ]
+
+    def fake_get(url, headers=None, timeout=None):
+        calls.append(dict(headers or {}))
+        return responses.pop(0)
+
+    fetcher = RecifePortalFetcher(
+        portal_url=PORTAL_URL, cache=ResponseCache(str(tmp_path)), http=FakeTransport(fake_get)
+    )
+
+    first = fetcher.fetch_latest_list()
+    assert first[0] == (
+        "Primeira notícia",
+        "https://www.recife.pe.leg.br/comunicacao/noticias/2025/10/primeira",
+        "Câmara Municipal do Recife",
+    )
+    assert calls[0] == {}
+
+    # Na segunda chamada o HTML não deve ser analisado novamente
+    monkeypatch.setattr(fetcher, "_iter_listing", lambda html: (_ for _ in ()).throw(AssertionError("parse")))
+    second = fetcher.fetch_latest_list()
+    assert second == first
+    assert calls[1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 20 Oct 2025 10:00:00 GMT"}
+
+
+def test_response_without_validators_is_not_cached(tmp_path):
+    calls = []
+
+    def fake_get(url, headers=None, timeout=None):
+        calls.append(dict(headers or {}))
+        return FakeResponse(200, SAMPLE_HTML)
+
+    fetcher = RecifePortalFetcher(
+        portal_url=PORTAL_URL, cache=ResponseCache(str(tmp_path)), http=FakeTransport(fake_get)
+    )
+
+    fetcher.fetch_latest_list()
+    fetcher.fetch_latest_list()
+    assert calls == [{}, {}]
+
+
+def test_partial_iteration_keeps_body_for_next_304(tmp_path):
+    responses = [FakeResponse(200, SAMPLE_HTML, {"ETag": '"v1"'}), FakeResponse(304)]
+    fetcher = RecifePortalFetcher(
+        portal_url=PORTAL_URL,
+        cache=ResponseCache(str(tmp_path)),
+        http=FakeTransport(lambda url, headers=None, timeout=None: responses.pop(0)),
+    )
+
+    # Interrompe no primeiro item: a listagem não foi analisada por completo
+    first = next(iter(fetcher.iter_latest_items()))
+    assert first[0] == "Primeira notícia"
+
+    items = fetcher.fetch_latest_list()
+    assert [title for title, _, _ in items] == ["Primeira notícia", "Segunda notícia"]
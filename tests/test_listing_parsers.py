@@ -0,0 +1,46 @@
+"""
+Testes dos backends de análise da listagem, usando uma página salva do portal da Câmara.
+Backends opcionais não instalados são ignorados.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+from src.clients.listing_parsers import PARSERS, SoupListingParser, get_listing_parser
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "camara_listing.html")
+
+
+def load_fixture():
+    with open(FIXTURE, encoding="utf-8") as fh:
+        return fh.read()
+
+
+def available_parsers():
+    parsers = []
+    for parser_cls in PARSERS.values():
+        try:
+            parsers.append(parser_cls())
+        except ImportError:
+            continue
+    return parsers
+
+
+@pytest.mark.parametrize("parser", available_parsers(), ids=lambda p: p.name)
+def test_backends_agree_with_html_parser(parser):
+    html = load_fixture()
+    expected = list(SoupListingParser().iter_articles(html))
+    assert len(expected) == 20
+    assert list(parser.iter_articles(html)) == expected
+
+
+def test_only_news_items_are_extracted():
+    items = list(SoupListingParser().iter_articles(load_fixture()))
+    assert not any(href.startswith("/banners/") for _, href in items)
+    # Títulos com marcação interna são concatenados como no get_text(strip=True)
+    assert all(title and "<" not in title for title, _ in items)
+
+
+def test_unknown_backend_falls_back_to_html_parser():
+    assert isinstance(get_listing_parser("inexistente"), SoupListingParser)
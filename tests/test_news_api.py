@@ -0,0 +1,357 @@
+"""
+Testes dos endpoints de notícias com o cliente de teste do Flask e banco SQLite temporário.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import csv
+import gzip
+import io
+import json
+import pytest
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+from core.db import Base, ScopedSession, engine, init_db
+from core.news_repository import NewsRepository
+from core.table_version import news_version
+from flask_restx import marshal
+from api.news_controller import api, news_model, news_to_dict
+from api.read_cache import response_cache
+from config.config import Config
+
+AUTHOR = "Câmara Municipal do Recife"
+
+
+@pytest.fixture
+def client():
+    init_db()
+    app = Flask(__name__)
+    api.init_app(app)
+    app.teardown_appcontext(lambda exc=None: ScopedSession.remove())
+    response_cache.clear()
+    yield app.test_client()
+    ScopedSession.remove()
+    Base.metadata.drop_all(bind=engine)
+
+
+def seed(count, author=AUTHOR):
+    NewsRepository().upsert_many(
+        {"source_title": f"Notícia {n}", "source_url": f"https://exemplo.com/{author}/{n}", "author": author}
+        for n in range(count)
+    )
+
+
+def test_list_pages_with_cursor(client):
+    seed(5)
+
+    first = client.get("/api/news/?limit=2")
+    assert [it["id"] for it in first.get_json()] == [5, 4]
+    cursor = first.headers["X-Next-After-Id"]
+
+    second = client.get(f"/api/news/?limit=2&after_id={cursor}")
+    assert [it["id"] for it in second.get_json()] == [3, 2]
+
+    last = client.get(f"/api/news/?limit=2&after_id={second.headers['X-Next-After-Id']}")
+    assert [it["id"] for it in last.get_json()] == [1]
+    assert "X-Next-After-Id" not in last.headers
+
+
+def test_list_filters_by_author_and_date_range(client):
+    seed(3, author="Secretaria A")
+    seed(2, author="Secretaria B")
+
+    response = client.get("/api/news/", query_string={"author": "Secretaria B"})
+    assert [it["author"] for it in response.get_json()] == ["Secretaria B"] * 2
+
+    assert client.get("/api/news/?fetched_from=2000-01-01T00:00:00Z&fetched_to=2000-01-02T00:00:00Z").get_json() == []
+    assert len(client.get("/api/news/?fetched_from=2000-01-01T00:00:00Z").get_json()) == 5
+
+
+def test_filtered_pages_are_index_range_reads(client):
+    seed(30, author="Secretaria A")
+    seed(30, author="Secretaria B")
+    repo = NewsRepository()
+    statements = []
+    listener = lambda conn, cursor, statement, params, context, many: statements.append((statement, params))
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        pages, cursor = [], None
+        while True:
+            page = repo.list_rows(["id"], limit=7, author="Secretaria B", after_id=cursor,
+                                  fetched_from=datetime(2000, 1, 1))
+            if not page:
+                break
+            pages.extend(row.id for row in page)
+            cursor = page[-1].id
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert pages == list(range(60, 30, -1))
+    with engine.connect() as conn:
+        plan = " ".join(row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statements[-1][0], statements[-1][1]))
+    assert "ix_news_items_author_fetched_at_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_list_rejects_invalid_limit(client):
+    assert client.get("/api/news/?limit=0").status_code == 400
+    assert client.get("/api/news/?limit=100000").status_code == 400
+
+
+def test_bulk_import_ndjson_reports_errors_per_line(client):
+    body = "\n".join([
+        '{"source_title": "Notícia 1", "source_url": "https://exemplo.com/1"}',
+        '',
+        '{"source_title": "Notícia 2", "source_url": "https://exemplo.com/2", "author": "Secretaria A"}',
+        '{"source_title": "Sem URL válida", "source_url": "não é url"}',
+        '{"source_title": ',
+        '{"source_title": "Notícia 1 de novo", "source_url": "https://www.exemplo.com/1/"}',
+        '[1, 2]',
+    ])
+    response = client.post("/api/news/bulk", data=body.encode("utf-8"), content_type="application/x-ndjson")
+
+    result = response.get_json()
+    assert response.status_code == 200
+    assert (result["received"], result["created"], result["duplicates"], result["failed"]) == (6, 2, 1, 3)
+    assert [error["line"] for error in result["errors"]] == [4, 5, 7]
+    assert len(NewsRepository().list()) == 2
+
+
+def test_bulk_import_streams_json_array_in_chunks(client):
+    items = [{"source_title": f"Notícia {n}", "source_url": f"https://exemplo.com/{n}"} for n in range(2500)]
+    items[10] = {"source_url": "https://exemplo.com/sem-titulo"}
+    body = json.dumps(items, ensure_ascii=False).encode("utf-8")
+
+    result = client.post("/api/news/bulk", data=body, content_type="application/json").get_json()
+
+    assert (result["received"], result["created"], result["failed"]) == (2500, 2499, 1)
+    assert result["errors"][0]["line"] == 11
+    assert "aborted" not in result
+
+
+def test_bulk_import_keeps_records_before_a_malformed_array(client):
+    body = '[{"source_title": "Notícia 1"}, {"source_title": "Notícia 2"} {"source_title": "x"}]'.encode("utf-8")
+
+    result = client.post("/api/news/bulk", data=body, content_type="application/json").get_json()
+
+    assert result["created"] == 2
+    assert "aborted" in result
+
+
+def test_search_ignores_accents_and_ranks_titles_first(client):
+    repo = NewsRepository()
+    repo.create(source_title="Câmara aprova orçamento da saúde", source_url="https://exemplo.com/1")
+    other = repo.create(source_title="Sessão sobre mobilidade", source_url="https://exemplo.com/2")
+    repo.update(other, question_title="Você apoia mais orçamento para ônibus?")
+    repo.create(source_title="Audiência pública sobre educação", source_url="https://exemplo.com/3")
+
+    results = client.get("/api/news/search", query_string={"q": "orcamento"}).get_json()
+    assert [it["id"] for it in results] == [1, 2]
+
+    assert [it["id"] for it in client.get("/api/news/search?q=CAMARA saude").get_json()] == [1]
+    assert [it["id"] for it in client.get("/api/news/search?q=educa").get_json()] == [3]
+    assert client.get("/api/news/search?q=orcamento&limit=1&offset=1").get_json()[0]["id"] == 2
+
+
+def test_search_index_follows_updates_and_deletes(client):
+    repo = NewsRepository()
+    item = repo.create(source_title="Notícia antiga", source_url="https://exemplo.com/1")
+    repo.update(item, question_title="Você concorda com a reforma?")
+    assert len(client.get("/api/news/search?q=reforma").get_json()) == 1
+
+    repo.delete(repo.get(item.id))
+    assert client.get("/api/news/search?q=reforma").get_json() == []
+    assert client.get('/api/news/search?q="*:').get_json() == []
+
+
+def test_list_returns_only_requested_fields(client):
+    seed(2)
+
+    response = client.get("/api/news/?fields=id,question_title")
+    assert response.get_json() == [{"id": 2, "question_title": None}, {"id": 1, "question_title": None}]
+    assert client.get("/api/news/?fields=id,senha").status_code == 400
+
+
+def test_external_response_is_stored_as_compressed_json(client):
+    repo = NewsRepository()
+    item = repo.create(source_title="Notícia", source_url="https://exemplo.com/1")
+    big = {"status": "ok", "texto": "resposta " * 500}
+    repo.update(item, external_response=big)
+
+    raw = repo._session.execute(text("SELECT external_response FROM news_items")).scalar()
+    assert raw.startswith("z:") and len(raw) < len(json.dumps(big))
+    ScopedSession.remove()
+
+    assert NewsRepository().get(item.id, fields=["id", "external_response"]).external_response == big
+    assert json.loads(client.get(f"/api/news/{item.id}").get_json()["external_response"]) == big
+
+
+def test_legacy_text_external_response_is_returned_as_is(client):
+    repo = NewsRepository()
+    item = repo.create(source_title="Notícia", source_url="https://exemplo.com/1")
+    repo._session.execute(text("UPDATE news_items SET external_response = :value"), {"value": "{'ok': True}"})
+    repo._session.commit()
+
+    assert client.get(f"/api/news/{item.id}").get_json()["external_response"] == "{'ok': True}"
+
+
+def test_repeated_reads_are_served_without_queries(client, monkeypatch):
+    monkeypatch.setattr(news_version, "ttl", 60)
+    seed(3)
+    first = client.get("/api/news/?limit=2")
+    etag = first.headers["ETag"]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        again = client.get("/api/news/?limit=2")
+        not_modified = client.get("/api/news/?limit=2", headers={"If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert statements == []
+    assert again.data == first.data and again.headers["X-Next-After-Id"] == "2"
+    assert not_modified.status_code == 304 and not_modified.data == b""
+
+
+def test_writes_change_the_etag_and_refresh_the_cache(client, monkeypatch):
+    monkeypatch.setattr(news_version, "ttl", 60)
+    seed(1)
+    before = client.get("/api/news/1")
+
+    NewsRepository().update(NewsRepository().get(1), question_title="Nova pergunta?")
+
+    after = client.get("/api/news/1", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert after.get_json()["question_title"] == "Nova pergunta?"
+    assert client.get("/api/news/99").status_code == 404
+
+
+def test_version_is_bumped_once_after_the_write_commits(client):
+    seed(1)
+    version = news_version.current()
+
+    events = []
+
+    def on_statement(conn, cursor, statement, *args):
+        events.append(statement.split()[0] + (" table_versions" if "table_versions" in statement else ""))
+
+    on_commit = lambda conn: events.append("COMMIT")
+    event.listen(engine, "before_cursor_execute", on_statement)
+    event.listen(engine, "commit", on_commit)
+    try:
+        NewsRepository().create_many([{"source_title": f"Lote {n}"} for n in range(3)])
+        with pytest.raises(IntegrityError):
+            NewsRepository().create(source_title="Repetida", source_url=f"https://exemplo.com/{AUTHOR}/0")
+    finally:
+        event.remove(engine, "before_cursor_execute", on_statement)
+        event.remove(engine, "commit", on_commit)
+
+    # A linha do contador fica fora da transação da escrita (não trava escritores concorrentes),
+    # é incrementada uma vez por commit, e uma escrita desfeita não a altera
+    assert events[:3] == ["INSERT", "COMMIT", "UPDATE table_versions"]
+    assert events.count("UPDATE table_versions") == 1
+    assert news_version.current() == version + 1
+
+
+def test_savepoint_rollback_keeps_the_pending_bump(client):
+    seed(1)
+    version = news_version.current()
+    repo = NewsRepository()
+
+    assert repo.set_question_title(1, "Você concorda?")
+    repo._session.begin_nested().rollback()
+    repo._session.commit()
+
+    assert news_version.current() == version + 1
+
+
+def test_version_read_racing_an_invalidation_is_not_cached(client, monkeypatch):
+    monkeypatch.setattr(news_version, "ttl", 60)
+    news_version.invalidate()
+    reads = []
+
+    def commit_during_read(conn, cursor, statement, *args):
+        if "table_versions" in statement:
+            reads.append(statement)
+            if len(reads) == 1:
+                # Escrita confirmada depois da leitura e antes de ela chegar ao cache
+                news_version.invalidate()
+
+    event.listen(engine, "after_cursor_execute", commit_during_read)
+    try:
+        news_version.current()
+        news_version.current()
+        news_version.current()
+    finally:
+        event.remove(engine, "after_cursor_execute", commit_during_read)
+
+    # A leitura que perdeu a corrida não foi guardada; a seguinte foi
+    assert len(reads) == 2
+
+
+def test_export_streams_ndjson_oldest_first(client):
+    seed(3, author="Secretaria A")
+    seed(2, author="Secretaria B")
+
+    response = client.get("/api/news/export?author=Secretaria A&fields=id,author")
+
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.data.decode("utf-8").splitlines()]
+    assert lines == [{"id": n, "author": "Secretaria A"} for n in (1, 2, 3)]
+
+
+def test_export_csv_with_gzip(client):
+    seed(2500)
+
+    response = client.get("/api/news/export?format=csv&gzip=true&fields=id,source_title")
+
+    assert response.headers["Content-Disposition"] == 'attachment; filename="news.csv.gz"'
+    rows = list(csv.reader(io.StringIO(gzip.decompress(response.data).decode("utf-8"))))
+    assert rows[0] == ["id", "source_title"]
+    assert len(rows) == 2501 and rows[-1] == ["2500", "Notícia 2499"]
+
+
+def test_row_serialization_matches_the_marshalled_model(client):
+    repo = NewsRepository()
+    item = repo.create(source_title="Notícia", source_url="https://exemplo.com/1", author=AUTHOR)
+    repo.update(item, question_title="Você sabia?", external_response={"ok": True, "texto": "ação"})
+    expected = marshal(news_to_dict(repo.get(item.id)), news_model)
+
+    assert client.get(f"/api/news/{item.id}").get_json() == expected
+    assert client.get("/api/news/").get_json() == [expected]
+
+
+def test_reads_are_compressed_per_accept_encoding(client):
+    seed(50)
+    plain = client.get("/api/news/")
+
+    compressed = client.get("/api/news/", headers={"Accept-Encoding": "gzip, deflate"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+    not_modified = client.get("/api/news/", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]})
+    assert not_modified.status_code == 304
+
+    refused = client.get("/api/news/", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in refused.headers and refused.data == plain.data
+    # Corpos pequenos não compensam a compressão
+    assert "Content-Encoding" not in client.get("/api/news/1", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_reads_without_cache_use_the_same_serialization(client, monkeypatch):
+    seed(2)
+    cached = client.get("/api/news/")
+    monkeypatch.setattr(Config, "RESPONSE_CACHE_ENABLED", False)
+
+    uncached = client.get("/api/news/")
+    assert uncached.data == cached.data and "ETag" not in uncached.headers
+    assert client.get("/api/news/99").status_code == 404
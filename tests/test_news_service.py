@@ -0,0 +1,349 @@
+"""
+Testes do NewsService com banco SQLite temporário e clientes externos simulados.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import json as jsonlib
+import time
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from core.db import Base, ScopedSession, engine, init_db
+from core.news_repository import NewsRepository
+from core.unit_of_work import UnitOfWork
+from models.models import NewsItem, OutboxMessage
+from clients import gemini_client
+from clients.gemini_client import GeminiClient
+from services.job_service import JobManager
+from services.news_service import NewsService
+from config.config import Config
+
+AUTHOR = "Câmara Municipal do Recife"
+
+
+class FakeFetcher:
+    def __init__(self, items):
+        self.items = items
+        self.consumed = 0
+
+    def iter_latest_items(self):
+        for item in self.items:
+            self.consumed += 1
+            yield item
+
+
+class FakeGemini:
+    def __init__(self):
+        self.calls = []
+
+    def reformulate_to_question(self, text, max_chars=96):
+        self.calls.append(text)
+        return f"Você apoia: {text}?"[:max_chars]
+
+    def reformulate_many(self, titles, max_chars=96):
+        return [self.reformulate_to_question(title, max_chars) for title in titles]
+
+
+class FakeExternal:
+    base_url = "https://external.example.com/receive"
+
+    def __init__(self):
+        self.payloads = []
+
+    def send_question(self, payload, idempotency_key=None):
+        self.payloads.append(payload)
+        return {"ok": True}
+
+
+def listing(*numbers):
+    return [(f"Notícia {n}", f"https://www.recife.pe.leg.br/noticias/{n}", AUTHOR) for n in numbers]
+
+
+@pytest.fixture
+def repo():
+    init_db()
+    yield NewsRepository()
+    ScopedSession.remove()
+    Base.metadata.drop_all(bind=engine)
+
+
+def make_service(repo, items):
+    return NewsService(repository=repo, fetcher=FakeFetcher(items), gemini=FakeGemini(), external=FakeExternal())
+
+
+def test_run_stops_at_first_known_url(repo):
+    make_service(repo, listing(3, 2, 1)).process_new_items()
+
+    service = make_service(repo, listing(5, 4, 3, 2, 1))
+    result = service.process_new_items()
+
+    assert result["processed"] == 2
+    assert sorted(service.gemini.calls) == ["Notícia 4", "Notícia 5"]
+    assert [it.source_title for it in repo.list()] == ["Notícia 5", "Notícia 4", "Notícia 3", "Notícia 2", "Notícia 1"]
+
+
+def test_latest_item_is_not_processed_twice(repo):
+    first = make_service(repo, listing(1)).process_latest_first_item()
+
+    service = make_service(repo, listing(1))
+    again = service.process_latest_first_item()
+
+    assert again["status"] == "unchanged"
+    assert again["news_id"] == first["news_id"]
+    assert service.gemini.calls == []
+    assert service.external.payloads == []
+    assert len(repo.list()) == 1
+
+
+def test_run_is_persisted_with_a_single_commit(repo):
+    commits = []
+    listener = lambda session: commits.append(session)
+    event.listen(Session, "after_commit", listener)
+    try:
+        # Sem API externa configurada: nenhuma entrega, só a gravação do lote
+        service = make_service(repo, listing(3, 2, 1))
+        service.external.base_url = ""
+        result = service.process_new_items()
+    finally:
+        event.remove(Session, "after_commit", listener)
+
+    assert result["processed"] == 3
+    assert len(commits) == 1
+    assert [r["external_response"]["status"] for r in result["items"]] == ["skipped"] * 3
+    assert [it.question_title for it in repo.list()] == [f"Você apoia: Notícia {n}?" for n in (3, 2, 1)]
+
+
+def test_unit_of_work_without_commit_leaves_no_partial_rows(repo):
+    with pytest.raises(RuntimeError):
+        with UnitOfWork() as uow:
+            news_id = uow.news.insert_if_absent(source_title="Parcial", question_title="Parcial?")
+            uow.news.enqueue_delivery(news_id, {"id": news_id})
+            raise RuntimeError("falha antes do commit")
+
+    assert repo.list() == []
+    assert repo._session.query(OutboxMessage).count() == 0
+
+
+@pytest.mark.parametrize("dialect", ["sqlite", "portable"])
+def test_upsert_many_skips_known_and_equivalent_urls(repo, monkeypatch, dialect):
+    if dialect == "portable":
+        # Banco sem ON CONFLICT: inserção linha a linha em SAVEPOINT
+        monkeypatch.setattr(NewsRepository, "_dialect", lambda self: "mssql")
+    url = "https://www.recife.pe.leg.br/noticias/1"
+    assert repo.upsert_many([{"source_title": "Notícia 1", "source_url": url, "author": AUTHOR}]) == 1
+
+    inserted = repo.upsert_many([
+        {"source_title": "Notícia 1", "source_url": "http://recife.pe.leg.br/noticias/1/?utm_source=x#topo"},
+        {"source_title": "Notícia 2", "source_url": "https://www.recife.pe.leg.br/noticias/2"},
+        {"source_title": "Notícia 2 (repetida)", "source_url": "https://www.recife.pe.leg.br/noticias/2/"},
+    ])
+
+    assert inserted == 1
+    assert [it.source_title for it in repo.list()] == ["Notícia 2", "Notícia 1"]
+    assert repo.get_by_source_url("https://recife.pe.leg.br/noticias/1/").source_url == url
+
+    with UnitOfWork() as uow:
+        assert uow.news.insert_if_absent(source_title="Notícia 1", source_url=url) is None
+        assert uow.news.insert_if_absent(source_title="Notícia 3", source_url=url.replace("/1", "/3")) is not None
+        uow.commit()
+    assert len(repo.list()) == 3
+
+
+def test_search_falls_back_to_like_on_other_databases(repo, monkeypatch):
+    monkeypatch.setattr(NewsRepository, "_dialect", lambda self: "mssql")
+    repo.create_many([
+        {"source_title": "Câmara aprova orçamento", "question_title": "Você apoia o 100% do plano?"},
+        {"source_title": "Sessão sobre saúde", "question_title": "Você acompanha o orçamento?"},
+        {"source_title": "Câmara debate orçamento da saúde"},
+    ])
+
+    assert [it.source_title for it in repo.search("ORçamento")] == [
+        "Câmara debate orçamento da saúde", "Câmara aprova orçamento", "Sessão sobre saúde",
+    ]
+    assert [it.source_title for it in repo.search("saúde câmara")] == ["Câmara debate orçamento da saúde"]
+    assert [it.source_title for it in repo.search("100%")] == ["Câmara aprova orçamento"]
+    assert repo.search("  ") == []
+
+
+def test_full_length_question_fits_the_column(repo):
+    # Postgres impõe o tamanho do VARCHAR; as perguntas do Gemini têm até 96 caracteres
+    question = "Você apoia a ampliação dos horários de atendimento das unidades de saúde da zona sul, no Recife?"
+    assert len(question) == 96
+    assert NewsItem.__table__.c.question_title.type.length >= 96
+
+    result = make_service(repo, [])._persist([("Notícia longa", listing(1)[0][1], AUTHOR, question)])
+
+    assert repo.get(result[0]["news_id"]).question_title == question
+
+
+def test_create_rejects_duplicate_url(repo):
+    repo.create(source_title="Notícia 1", source_url="https://www.recife.pe.leg.br/noticias/1")
+    with pytest.raises(IntegrityError):
+        repo.create(source_title="Outra", source_url="https://WWW.recife.pe.leg.br/noticias/1/")
+    assert len(repo.list()) == 1
+
+
+def test_concurrent_duplicate_is_reported_unchanged(repo):
+    make_service(repo, listing(1)).process_new_items()
+
+    service = make_service(repo, listing(1))
+    # Simula outra execução que gravou o item entre a leitura da listagem e o insert
+    result = service._persist([("Notícia 1", listing(1)[0][1], AUTHOR, "Pergunta?")])
+
+    assert result[0]["status"] == "unchanged"
+    assert len(repo.list()) == 1
+    assert repo._session.query(OutboxMessage).count() == 1
+
+
+class SlowGemini(FakeGemini):
+    """Uma chamada por lote: 0,2s, ou `slow` segundos para o lote com o título `slow_title`."""
+
+    def __init__(self, slow_title=None, slow=0.2):
+        super().__init__()
+        self.slow_title = slow_title
+        self.slow = slow
+        self.finished_at = []
+
+    def reformulate_many(self, titles, max_chars=96):
+        time.sleep(self.slow if self.slow_title in titles else 0.2)
+        questions = super().reformulate_many(titles, max_chars)
+        self.finished_at.append(time.perf_counter())
+        return questions
+
+
+class SlowExternal(FakeExternal):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.started_at = []
+
+    def send_question(self, payload, idempotency_key=None):
+        self.started_at.append(time.perf_counter())
+        time.sleep(0.2)
+        if self.fail:
+            raise RuntimeError("API externa indisponível")
+        return super().send_question(payload, idempotency_key)
+
+
+def test_pipeline_processes_every_new_item_oldest_first(repo):
+    make_service(repo, listing(3, 2, 1)).process_new_items()
+
+    service = make_service(repo, listing(8, 7, 6, 5, 4, 3, 2, 1))
+    result = service.process_new_items()
+
+    assert result["processed"] == 5
+    assert sorted(service.gemini.calls) == [f"Notícia {n}" for n in (4, 5, 6, 7, 8)]
+    assert [it.source_title for it in repo.list()] == [f"Notícia {n}" for n in (8, 7, 6, 5, 4, 3, 2, 1)]
+    assert [r["external_response"]["status"] for r in result["items"]] == ["sent"] * 5
+    # 3 da primeira execução + 5 desta
+    assert repo._session.query(OutboxMessage).filter(OutboxMessage.status == OutboxMessage.SENT).count() == 8
+    assert result["stats"]["dedupe"]["dropped"] >= 1 and result["stats"]["persist"]["emitted"] == 5
+
+
+def test_pipeline_overlaps_slow_calls(repo):
+    # Número padrão de threads por etapa; o lote das notícias mais recentes demora mais no Gemini
+    gemini, external = SlowGemini(slow_title="Notícia 20", slow=0.8), SlowExternal()
+    service = NewsService(repository=repo, fetcher=FakeFetcher(listing(*range(20, 0, -1))),
+                          gemini=gemini, external=external)
+
+    started = time.perf_counter()
+    result = service.process_new_items()
+    elapsed = time.perf_counter() - started
+
+    assert result["processed"] == 20
+    # Em sequência seriam 0,2 + 0,8 + 20 x 0,2 = 5s
+    assert elapsed < 2.0
+    # O lote mais antigo é gravado e entregue enquanto o Gemini ainda responde o outro
+    assert min(external.started_at) < max(gemini.finished_at) - 0.3
+    assert [it.source_title for it in repo.list(limit=20)] == [f"Notícia {n}" for n in range(20, 0, -1)]
+    assert set(result["stats"]) == {"fetch", "dedupe", "order", "reformulate", "persist", "deliver"}
+    assert result["stats"]["reformulate"]["throughput"] > 20
+
+
+class StubGeminiTransport:
+    """generateContent simulado: responde o lote de títulos do prompt em JSON."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, url, json=None, **kwargs):
+        self.calls += 1
+        titles = json["contents"][0]["parts"][0]["text"].split("Títulos:\n", 1)[1].splitlines()
+        answers = [
+            {"id": int(number), "pergunta": f"Você acompanha {title}?"}
+            for number, title in (line.split(". ", 1) for line in titles)
+        ]
+        return StubResponse({"candidates": [{"content": {"parts": [{"text": jsonlib.dumps(answers)}]}}]})
+
+
+class StubResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+def test_pipeline_reformulates_within_the_gemini_rate_limit(repo, monkeypatch):
+    # Limitador e circuit breaker reais, com a cota padrão (rajada de 5 chamadas)
+    monkeypatch.setattr(gemini_client, "_rate_limiter", None)
+    monkeypatch.setattr(gemini_client, "_circuit_breaker", None)
+    transport = StubGeminiTransport()
+    gemini = GeminiClient(api_key="teste", http=transport, cache=None)
+    service = NewsService(repository=repo, fetcher=FakeFetcher(listing(*range(20, 0, -1))),
+                          gemini=gemini, external=FakeExternal())
+
+    result = service.process_new_items()
+
+    assert result["processed"] == 20
+    # Uma chamada por lote de GEMINI_BATCH_SIZE títulos; nenhum título caiu na pergunta local
+    assert transport.calls == 20 // Config.GEMINI_BATCH_SIZE
+    assert all(item.question_title.startswith("Você acompanha") for item in repo.list(limit=20))
+
+
+def test_pipeline_leaves_failed_deliveries_to_the_outbox_worker(repo):
+    service = NewsService(repository=repo, fetcher=FakeFetcher(listing(2, 1)),
+                          gemini=FakeGemini(), external=SlowExternal(fail=True))
+
+    result = service.process_new_items()
+
+    assert [r["external_response"]["status"] for r in result["items"]] == ["queued"] * 2
+    messages = repo._session.query(OutboxMessage).all()
+    assert [(m.status, m.attempts) for m in messages] == [(OutboxMessage.PENDING, 1)] * 2
+
+
+class BrokenFetcher(FakeFetcher):
+    def iter_latest_items(self):
+        yield from self.items
+        raise RuntimeError("Falha ao conectar com o portal")
+
+
+def test_pipeline_raises_listing_failures(repo):
+    service = NewsService(repository=repo, fetcher=BrokenFetcher(listing(2, 1)),
+                          gemini=FakeGemini(), external=FakeExternal())
+
+    with pytest.raises(RuntimeError, match="portal"):
+        service.process_new_items()
+    # Os itens lidos antes da falha foram gravados
+    assert len(repo.list()) == 2
+
+
+def test_pipeline_raises_persist_failures(repo, monkeypatch):
+    service = make_service(repo, listing(2, 1))
+
+    def broken_persist(items, wake_worker=True):
+        raise RuntimeError("banco indisponível")
+
+    monkeypatch.setattr(service, "_persist", broken_persist)
+    job = JobManager(max_workers=1)
+    try:
+        with pytest.raises(RuntimeError, match="banco indisponível"):
+            job.run("process_new_items", service.process_new_items)
+    finally:
+        job.shutdown()
@@ -0,0 +1,111 @@
+"""
+Testes do outbox de entregas para a API externa (banco SQLite temporário, API simulada).
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+import requests
+from clients.external_client import ExternalClient
+from core.db import Base, ScopedSession, engine, init_db
+from core.news_repository import NewsRepository
+from core.outbox_repository import OutboxRepository
+from core.unit_of_work import UnitOfWork
+from models.models import OutboxMessage
+from services.outbox_worker import OutboxDeliveryWorker
+
+
+class FlakyExternal:
+    base_url = "https://external.example.com/receive"
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    def send_question(self, payload, idempotency_key=None):
+        self.calls.append(idempotency_key)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("API externa indisponível")
+        return {"recebido": payload["id"]}
+
+
+@pytest.fixture
+def repo():
+    init_db()
+    yield NewsRepository()
+    ScopedSession.remove()
+    Base.metadata.drop_all(bind=engine)
+
+
+def enqueue(repo, title="Notícia"):
+    with UnitOfWork() as uow:
+        news_id = uow.news.insert_if_absent(source_title=title, source_url=f"https://exemplo.com/{title}", question_title="Pergunta?")
+        uow.news.enqueue_delivery(news_id, {"texto": "Pergunta?", "id": news_id})
+        uow.commit()
+    return news_id
+
+
+def test_enqueue_is_written_with_the_news_update(repo):
+    news_id = enqueue(repo)
+    assert OutboxRepository().counts_by_status() == {OutboxMessage.PENDING: 1}
+    assert repo.get(news_id).question_title == "Pergunta?"
+
+
+def test_worker_delivers_with_idempotency_key(repo):
+    news_id = enqueue(repo)
+    external = FlakyExternal()
+
+    # drain_once descarta a sessão da thread ao terminar, como faz na thread do worker
+    assert OutboxDeliveryWorker(external=external, max_workers=2).drain_once() == 1
+
+    assert external.calls == [f"news-{news_id}"]
+    assert OutboxRepository().counts_by_status() == {OutboxMessage.SENT: 1}
+    stored = NewsRepository().get(news_id)
+    assert stored.external_response == {"recebido": news_id}
+
+
+def test_failed_delivery_is_rescheduled_then_abandoned(repo):
+    enqueue(repo)
+    worker = OutboxDeliveryWorker(external=FlakyExternal(failures=5), max_attempts=2)
+
+    worker.drain_once()
+    outbox = OutboxRepository()
+    assert outbox.counts_by_status() == {OutboxMessage.PENDING: 1}
+    # Ainda em backoff: nada a entregar agora
+    assert worker.drain_once() == 0
+
+    message = outbox._session.query(OutboxMessage).one()
+    message.next_attempt_at = message.created_at.replace(tzinfo=None)
+    outbox._session.commit()
+    worker.drain_once()
+    assert OutboxRepository().counts_by_status() == {OutboxMessage.DEAD: 1}
+
+
+class StatusTransport:
+    """Transporte simulado que responde sempre com o mesmo status."""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def post(self, url, **kwargs):
+        resp = requests.Response()
+        resp.status_code = self.status_code
+        resp._content = b'{"erro": "payload invalido"}'
+        return resp
+
+
+@pytest.mark.parametrize("status_code, expected", [
+    (422, OutboxMessage.DEAD),
+    (401, OutboxMessage.DEAD),
+    (503, OutboxMessage.PENDING),
+    (429, OutboxMessage.PENDING),
+])
+def test_non_2xx_responses_are_not_marked_sent(repo, status_code, expected):
+    enqueue(repo)
+    external = ExternalClient(base_url="https://external.example.com/receive", http=StatusTransport(status_code))
+
+    OutboxDeliveryWorker(external=external).drain_once()
+
+    assert OutboxRepository().counts_by_status() == {expected: 1}
@@ -0,0 +1,69 @@
+"""
+Testes da extração de detalhes das notícias do portal da Câmara.
+Não acessa a rede: as páginas são servidas por um transporte simulado.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+from bs4 import BeautifulSoup
+from src.clients.recife_portal_fetcher import RecifePortalFetcher
+
+DETAIL_HTML = """
+<html><body>
+  <span class="date">20/10/2025</span>
+  <div class="summary">Resumo curto</div>
+  <p class="publication-date">21/10/2025 10h</p>
+  <div class="news-content">Conteúdo completo da notícia</div>
+</body></html>
+"""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.status_code = 200
+        self.text = text
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class SlowTransport:
+    """Responde após um atraso e registra o pico de requisições simultâneas."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return FakeResponse(DETAIL_HTML)
+
+
+def test_extract_details_respects_selector_priority():
+    fetcher = RecifePortalFetcher(cache=None, http=SlowTransport())
+    details = fetcher._extract_details(BeautifulSoup(DETAIL_HTML, "html.parser"))
+    # .publication-date tem prioridade sobre .date, mesmo aparecendo depois no documento
+    assert details == {"date": "21/10/2025 10h", "content": "Conteúdo completo da notícia"}
+
+
+def test_fetch_details_many_caps_concurrency_per_host():
+    transport = SlowTransport()
+    fetcher = RecifePortalFetcher(cache=None, http=transport)
+    urls = [f"https://www.recife.pe.leg.br/noticia/{i}" for i in range(8)]
+
+    results = dict(fetcher.fetch_details_many(urls, max_workers=8, per_host_limit=2, politeness_delay=0))
+
+    assert set(results) == set(urls)
+    assert all(d["date"] == "21/10/2025 10h" for d in results.values())
+    assert transport.peak <= 2
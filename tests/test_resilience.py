@@ -0,0 +1,142 @@
+"""
+Testes do limitador token bucket, do circuit breaker e da proteção do cliente Gemini.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import time
+import pytest
+import requests
+from clients.gemini_client import GeminiClient
+from config.config import Config
+from clients.resilience import CircuitBreaker, CircuitOpenError, RateLimitExceeded, TokenBucket
+
+
+def test_token_bucket_limits_bursts():
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    assert bucket.acquire()
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=1.5)
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request()          # requisição de teste (half-open)
+    assert not breaker.allow_request()      # só uma por vez
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class FailingTransport:
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        raise requests.ConnectTimeout("timeout")
+
+
+def make_client(transport, breaker=None, bucket=None):
+    return GeminiClient(
+        api_key="teste",
+        http=transport,
+        breaker=breaker or CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        rate_limiter=bucket or TokenBucket(rate=100, capacity=100),
+    )
+
+
+def test_open_breaker_fails_fast_without_network(monkeypatch):
+    monkeypatch.setattr(Config, "GEMINI_MAX_RETRIES", 0)
+    transport = FailingTransport()
+    bucket = TokenBucket(rate=0.001, capacity=5)
+    client = make_client(transport, bucket=bucket)
+    client.cache = None
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectTimeout):
+            client.reformulate_to_question("Câmara aprova orçamento")
+    with pytest.raises(CircuitOpenError):
+        client.reformulate_to_question("Câmara aprova orçamento")
+
+    assert transport.calls == 2
+    # O circuito aberto é verificado antes do limitador: nenhum token é gasto sem requisição
+    assert round(bucket.available()) == 3
+    assert client.status()["degraded"] is True
+
+
+class StatusResponse:
+    def __init__(self, status):
+        self.status_code = status
+        self.headers = {"Retry-After": "0"}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+    def json(self):
+        return {"candidates": [{"content": {"parts": [{"text": "Você apoia o orçamento"}]}}]}
+
+
+class ScriptedTransport:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.kwargs = []
+
+    def post(self, url, **kwargs):
+        self.kwargs.append(kwargs)
+        return StatusResponse(self.statuses.pop(0))
+
+
+def test_each_retry_takes_its_own_token(monkeypatch):
+    monkeypatch.setattr(Config, "GEMINI_MAX_RETRIES", 2)
+    transport = ScriptedTransport([503, 429, 200])
+    bucket = TokenBucket(rate=0.001, capacity=3)
+    client = make_client(transport, breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60), bucket=bucket)
+    client.cache = None
+
+    assert client.reformulate_to_question("Câmara aprova orçamento") == "Você apoia o orçamento?"
+    # Três requisições HTTP, três tokens; o transporte não repete por conta própria
+    assert len(transport.kwargs) == 3 and all(kwargs["max_retries"] == 0 for kwargs in transport.kwargs)
+    assert bucket.available() < 1
+
+    # Sem token para a nova tentativa, ela não é enviada
+    transport.statuses = [503, 200]
+    client.rate_limiter = TokenBucket(rate=0.001, capacity=1)
+    with pytest.raises(RateLimitExceeded):
+        client.reformulate_to_question("Câmara aprova a LOA")
+    assert len(transport.kwargs) == 4
+
+
+def test_exhausted_budget_raises_rate_limit():
+    client = make_client(FailingTransport(), bucket=TokenBucket(rate=0.001, capacity=0))
+    client.cache = None
+    with pytest.raises(RateLimitExceeded):
+        client.reformulate_to_question("Câmara aprova orçamento")
+
+
+def test_rate_limited_trial_does_not_wedge_half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    bucket = TokenBucket(rate=0.001, capacity=0)
+    client = make_client(FailingTransport(), breaker=breaker, bucket=bucket)
+    client.cache = None
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    with pytest.raises(RateLimitExceeded):
+        client.reformulate_to_question("Câmara aprova orçamento")
+
+    # O teste do half-open continua disponível para a próxima chamada com orçamento
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    client.rate_limiter = TokenBucket(rate=100, capacity=100)
+    with pytest.raises(requests.ConnectTimeout):
+        client.reformulate_to_question("Câmara aprova orçamento")
+    assert breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,84 @@
+"""
+Testes do agendador adaptativo: backoff, jitter, horas de silêncio e job store persistente.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from services.scheduler_service import POLL_JOB_ID, SchedulerService
+
+TZ = ZoneInfo("America/Sao_Paulo")
+
+
+def make_service(tmp_path, **kwargs):
+    options = {"min_interval": 60, "max_interval": 600, "backoff_factor": 2, "jitter": 0, "quiet_hours": ""}
+    options.update(kwargs)
+    return SchedulerService(jobstore_url=f"sqlite:///{tmp_path / 'jobs.db'}", **options)
+
+
+def wait_for_job(service, interval, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = service.scheduler.get_job(POLL_JOB_ID)
+        if (job is not None and job.kwargs["interval"] == interval) or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_interval_backs_off_until_new_items_are_found(tmp_path):
+    service = make_service(tmp_path)
+    intervals = [60]
+    for _ in range(5):
+        intervals.append(service.next_interval(intervals[-1], found=False))
+    assert intervals == [60, 120, 240, 480, 600, 600]
+    assert service.next_interval(600, found=True) == 60
+
+
+def test_jitter_stays_within_the_configured_fraction(tmp_path):
+    service = make_service(tmp_path, jitter=0.1)
+    now = datetime(2026, 3, 2, 12, 0, tzinfo=TZ)
+    for _ in range(50):
+        delay = (service.next_run_time(100, now=now) - now).total_seconds()
+        assert 90 <= delay <= 110
+
+
+def test_runs_falling_in_quiet_hours_are_postponed(tmp_path):
+    service = make_service(tmp_path, quiet_hours="22:00-06:00")
+    evening = datetime(2026, 3, 2, 21, 50, tzinfo=TZ)
+
+    assert service.next_run_time(300, now=evening) == evening + timedelta(minutes=5)
+    assert service.next_run_time(1200, now=evening) == datetime(2026, 3, 3, 6, 0, tzinfo=TZ)
+    assert service.next_run_time(0, now=datetime(2026, 3, 3, 2, 0, tzinfo=TZ)) == datetime(2026, 3, 3, 6, 0, tzinfo=TZ)
+
+    daytime = make_service(tmp_path, quiet_hours="12:00-13:30")
+    assert daytime.next_run_time(600, now=datetime(2026, 3, 2, 11, 55, tzinfo=TZ)) == datetime(2026, 3, 2, 13, 30, tzinfo=TZ)
+
+
+def test_poll_reschedules_itself_and_survives_a_restart(tmp_path):
+    polled = threading.Event()
+
+    def process():
+        polled.set()
+        return {"processed": 0, "items": []}
+
+    service = make_service(tmp_path)
+    service.start_adaptive_polling(process)
+    try:
+        assert polled.wait(5)
+        # Sem notícias novas: a próxima coleta é reagendada com o intervalo dobrado
+        job = wait_for_job(service, interval=120)
+        next_run = job.next_run_time
+    finally:
+        service.shutdown()
+
+    restarted = make_service(tmp_path)
+    restarted.start_adaptive_polling(process)
+    try:
+        job = restarted.scheduler.get_job(POLL_JOB_ID)
+        assert job.kwargs["interval"] == 120 and job.next_run_time == next_run
+    finally:
+        restarted.shutdown()
@@ -0,0 +1,18 @@
+"""
+Ponto de entrada WSGI para produção, com vários processos:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+A aplicação é criada uma vez no processo mestre (preload_app) e herdada pelos workers.
+O agendador e o worker do outbox não são iniciados aqui: gunicorn.conf.py os inicia
+depois do fork, só no worker que obtiver a liderança. Para desenvolvimento, use main.py.
+"""
+import sys
+import os
+
+# Adiciona o diretório src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from app.app import create_app
+
+app = create_app(start_background=False)